@@ -0,0 +1,583 @@
+#!/usr/bin/env python3
+"""
+In-process reverse call graph built from a SCIP index.
+
+The SCIP index is loaded once and every function reference is attributed to the
+function whose body contains it. The resulting caller adjacency answers
+depth-limited caller queries for any number of sink symbols, which replaces one
+`cargo run --bin generate_function_subgraph_dot` subprocess per symbol.
+
+Nodes are the integer symbol IDs of the index's `SymbolCatalog` and the adjacency
+is held in compressed sparse row arrays, so traversals never touch symbol strings;
+these are only looked up again when a graph is rendered.
+
+The DOT output follows the conventions of the Rust generator:
+- libsignal functions are white nodes in light blue file clusters
+- other functions (curve25519-dalek, ed25519-dalek, ...) are light gray nodes
+- the sink symbol the graph was generated for is green
+
+In compact mode nodes get short numeric IDs, with the symbol in a `symbol`
+attribute, and the function bodies are replaced by a `body` attribute that refers
+to a shared body store (`function_bodies.json`, body ID -> text) instead of being
+repeated as tooltips in every graph.
+"""
+
+import hashlib
+import json
+import os
+import re
+from array import array
+from collections import defaultdict, deque
+from pathlib import Path
+
+from curve25519_usage.definition_index import DocumentDefinitions
+from curve25519_usage.scip_index import load_index
+from curve25519_usage.symbol_catalog import SymbolCatalog, parse_symbol
+
+# Documents under these prefixes belong to the libsignal workspace
+LIBSIGNAL_PATH_PREFIXES = ("rust/",)
+
+# Maximum number of characters of a function body shown as a node tooltip
+TOOLTIP_MAX_CHARS = 200
+
+# Shared store of the function bodies referenced by compact graphs
+BODY_STORE_FILE = "function_bodies.json"
+
+SYMBOL_ATTRIBUTE = re.compile(r'\bsymbol="((?:[^"\\]|\\.)*)"')
+
+
+def is_function_symbol(symbol):
+    """Check if a SCIP symbol refers to a function or method."""
+    return symbol.endswith("().")
+
+
+def symbol_display_name(symbol):
+    """Get the short function name of a SCIP symbol, e.g. 'from_hash'."""
+    return parse_symbol(symbol).name
+
+
+def _csr(num_nodes, packed_edges):
+    """
+    Build compressed sparse rows from sorted, de-duplicated (row << 32 | column) keys.
+
+    Returns (offsets, indices): the columns of row n are indices[offsets[n]:offsets[n + 1]].
+    """
+    offsets = array("I", bytes(4 * (num_nodes + 1)))
+    indices = array("I", (key & 0xFFFFFFFF for key in packed_edges))
+    for key in packed_edges:
+        offsets[(key >> 32) + 1] += 1
+    for n in range(num_nodes):
+        offsets[n + 1] += offsets[n]
+    return offsets, indices
+
+
+class CallGraph:
+    """
+    Caller/callee adjacency over interned SCIP function symbol IDs.
+
+    The adjacency is stored in compressed sparse row form: for node n, its callers
+    are `caller_indices[caller_offsets[n]:caller_offsets[n + 1]]`, and likewise for
+    callees. Definitions are stored as a document index and a line per node. The
+    graph is immutable; build it with `CallGraphBuilder`, `from_edges` or
+    `from_index`.
+    """
+
+    def __init__(
+        self,
+        catalog,
+        caller_csr,
+        callee_csr,
+        definition_documents,
+        definition_lines,
+        documents,
+        libsignal_prefixes=LIBSIGNAL_PATH_PREFIXES,
+    ):
+        self.libsignal_prefixes = tuple(libsignal_prefixes)
+        self.catalog = catalog
+        self.num_nodes = len(definition_documents)
+        self.caller_offsets, self.caller_indices = caller_csr
+        self.callee_offsets, self.callee_indices = callee_csr
+        # Per node: index into `documents`, or -1 if not defined; and the line
+        self.definition_documents = definition_documents
+        self.definition_lines = definition_lines
+        self.documents = documents
+        self.libsignal_documents = [path.startswith(self.libsignal_prefixes) for path in documents]
+        self.source_root = None
+
+    @classmethod
+    def from_edges(cls, catalog, edges, definitions=(), libsignal_prefixes=LIBSIGNAL_PATH_PREFIXES):
+        """
+        Build a graph from (caller, callee) node pairs and (node, relative_path, line)
+        definition triples.
+        """
+        builder = CallGraphBuilder(catalog, libsignal_prefixes)
+        for node, relative_path, line in definitions:
+            builder.add_definition(node, relative_path, line)
+        for caller, callee in edges:
+            builder.add_edge(caller, callee)
+        return builder.build()
+
+    @classmethod
+    def from_index(cls, index, libsignal_prefixes=LIBSIGNAL_PATH_PREFIXES):
+        """Build the call graph of a `ScipIndex`; see `build_call_graph`."""
+        return build_call_graph(index, libsignal_prefixes)
+
+    def id(self, symbol):
+        """Get the node ID of a symbol string, or None if it is not in the catalog."""
+        return self.catalog.id(symbol)
+
+    def symbol(self, node):
+        """Get the symbol string of a node ID."""
+        return self.catalog.symbol(node)
+
+    def callers(self, node):
+        """Get the callers of a node as an array of node IDs."""
+        if node >= self.num_nodes:
+            return ()
+        return self.caller_indices[self.caller_offsets[node] : self.caller_offsets[node + 1]]
+
+    def callees(self, node):
+        """Get the callees of a node as an array of node IDs."""
+        if node >= self.num_nodes:
+            return ()
+        return self.callee_indices[self.callee_offsets[node] : self.callee_offsets[node + 1]]
+
+    def definition(self, node):
+        """Get the (relative_path, line) where a node is defined, or None."""
+        if node >= self.num_nodes or self.definition_documents[node] < 0:
+            return None
+        return self.documents[self.definition_documents[node]], self.definition_lines[node]
+
+    def is_libsignal(self, node):
+        """Check if a node is defined inside the libsignal workspace."""
+        if node >= self.num_nodes:
+            return False
+        document = self.definition_documents[node]
+        return document >= 0 and self.libsignal_documents[document]
+
+    def nodes(self):
+        """Get the IDs of all functions that are defined or referenced in the graph."""
+        return {
+            node
+            for node in range(self.num_nodes)
+            if self.definition_documents[node] >= 0
+            or self.caller_offsets[node] != self.caller_offsets[node + 1]
+            or self.callee_offsets[node] != self.callee_offsets[node + 1]
+        }
+
+    def symbols(self):
+        """Get the symbol strings of all functions in the graph."""
+        return {self.catalog.symbol(node) for node in self.nodes()}
+
+
+class CallGraphBuilder:
+    """Collect definitions and edges, then compact them into a `CallGraph`."""
+
+    def __init__(self, catalog=None, libsignal_prefixes=LIBSIGNAL_PATH_PREFIXES):
+        self.catalog = catalog if catalog is not None else SymbolCatalog()
+        self.libsignal_prefixes = libsignal_prefixes
+        self.edges = set()  # caller << 32 | callee
+        self.definitions = {}  # node -> (document index, line)
+        self.documents = []
+        self._document_ids = {}
+
+    def add_definition(self, node, relative_path, line):
+        """Record where a node is defined, keeping the first definition."""
+        if node not in self.definitions:
+            document = self._document_ids.get(relative_path)
+            if document is None:
+                document = self._document_ids[relative_path] = len(self.documents)
+                self.documents.append(relative_path)
+            self.definitions[node] = (document, line)
+
+    def add_edge(self, caller, callee):
+        """Record that `caller` calls `callee`."""
+        self.edges.add(caller << 32 | callee)
+
+    def build(self):
+        """Get the finished, immutable graph."""
+        num_nodes = len(self.catalog)
+        callee_csr = _csr(num_nodes, sorted(self.edges))
+        caller_csr = _csr(
+            num_nodes, sorted((key & 0xFFFFFFFF) << 32 | key >> 32 for key in self.edges)
+        )
+
+        definition_documents = array("i", [-1]) * num_nodes
+        definition_lines = array("i", bytes(4 * num_nodes))
+        for node, (document, line) in self.definitions.items():
+            definition_documents[node] = document
+            definition_lines[node] = line
+        return CallGraph(
+            self.catalog,
+            caller_csr,
+            callee_csr,
+            definition_documents,
+            definition_lines,
+            self.documents,
+            self.libsignal_prefixes,
+        )
+
+
+def build_call_graph(index, libsignal_prefixes=LIBSIGNAL_PATH_PREFIXES):
+    """
+    Build a call graph from a `ScipIndex`.
+
+    Each reference to a function symbol is attributed to the innermost function
+    definition enclosing it in the same document (see `definition_index`).
+    """
+    builder = CallGraphBuilder(index.catalog, libsignal_prefixes)
+    symbols = index.symbols
+    callable_ids = {}
+
+    def is_callable(symbol_id):
+        result = callable_ids.get(symbol_id)
+        if result is None:
+            result = callable_ids[symbol_id] = is_function_symbol(symbols[symbol_id])
+        return result
+
+    for doc in index.documents:
+        definitions = DocumentDefinitions(doc, is_callable)
+        for span in definitions.spans:
+            builder.add_definition(span.symbol_id, doc.relative_path, span.line)
+
+        for occ in doc.iter_references():
+            node = occ.symbol_id
+            if not is_callable(node):
+                continue
+            caller = definitions.enclosing_symbol(occ.start_line, occ.start_char)
+            if caller is not None and caller != node:
+                builder.add_edge(caller, node)
+
+    graph = builder.build()
+    graph.source_root = index.project_root
+    return graph
+
+
+def load_call_graph(scip_json_path, libsignal_prefixes=LIBSIGNAL_PATH_PREFIXES):
+    """Load a SCIP index (through its snapshot cache) and build its call graph."""
+    return build_call_graph(load_index(scip_json_path), libsignal_prefixes)
+
+
+def caller_distances(graph, sink, max_depth=None):
+    """
+    Get the minimum caller distance of every node that can reach the node `sink`.
+
+    A single breadth-first traversal over the callers; the sink has distance 0 and
+    a direct caller distance 1. With `max_depth`, nodes farther away are not visited.
+    """
+    distances = {sink: 0}
+    frontier = deque([sink])
+    while frontier:
+        node = frontier.popleft()
+        distance = distances[node]
+        if max_depth is not None and distance >= max_depth:
+            continue
+        for caller in graph.callers(node):
+            if caller not in distances:
+                distances[caller] = distance + 1
+                frontier.append(caller)
+    return distances
+
+
+def libsignal_distances(graph, max_depth=None):
+    """
+    Get the minimum call distance from any libsignal function to every node it reaches.
+
+    A single multi-source breadth-first traversal over the callees; libsignal nodes
+    have distance 0. A node's libsignal-filtered caller subgraph at depth d can only
+    be non-empty if its distance is at most d, so this decides reachability for all
+    sinks at once.
+    """
+    distances = {node: 0 for node in range(graph.num_nodes) if graph.is_libsignal(node)}
+    frontier = deque(distances)
+    while frontier:
+        node = frontier.popleft()
+        distance = distances[node]
+        if max_depth is not None and distance >= max_depth:
+            continue
+        for callee in graph.callees(node):
+            if callee not in distances:
+                distances[callee] = distance + 1
+                frontier.append(callee)
+    return distances
+
+
+def distance_subgraph(graph, distances, depth=None):
+    """
+    Cut the caller subgraph at `depth` from precomputed caller distances.
+
+    Returns (nodes, edges) where edges are (caller, callee) node pairs; any depth up
+    to the one the distances were computed for can be cut from the same traversal.
+    """
+    if depth is None:
+        nodes = set(distances)
+        callees = nodes
+    else:
+        nodes = {node for node, distance in distances.items() if distance <= depth}
+        callees = [node for node in nodes if distances[node] < depth]
+    edges = {(caller, callee) for callee in callees for caller in graph.callers(callee)}
+    return nodes, edges
+
+
+def caller_closure(graph, sink, depth):
+    """
+    Collect the callers of the node `sink` up to `depth` levels.
+
+    Returns (nodes, edges) where edges are (caller, callee) node pairs.
+    """
+    return distance_subgraph(graph, caller_distances(graph, sink, depth), depth)
+
+
+def filter_libsignal_paths(graph, nodes, edges):
+    """Keep only the nodes and edges on paths that start at a libsignal function."""
+    successors = defaultdict(list)
+    for caller, callee in edges:
+        successors[caller].append(callee)
+
+    kept = {node for node in nodes if graph.is_libsignal(node)}
+    stack = list(kept)
+    while stack:
+        node = stack.pop()
+        for callee in successors.get(node, ()):
+            if callee not in kept:
+                kept.add(callee)
+                stack.append(callee)
+
+    kept_edges = {(caller, callee) for caller, callee in edges if caller in kept and callee in kept}
+    return kept, kept_edges
+
+
+def function_subgraph(graph, sink, depth, filter_non_libsignal=True, distances=None):
+    """
+    Get the depth-limited caller subgraph of the node `sink`, optionally libsignal-filtered.
+
+    `distances` from `caller_distances` (computed for at least `depth`) avoid a
+    new traversal when several depths are cut for the same sink.
+    """
+    if distances is None:
+        distances = caller_distances(graph, sink, depth)
+    nodes, edges = distance_subgraph(graph, distances, depth)
+    if filter_non_libsignal:
+        nodes, edges = filter_libsignal_paths(graph, nodes, edges)
+    return nodes, edges
+
+
+def cut_subgraphs(graph, symbols, depth, subgraphs=None):
+    """
+    Get {symbol: (nodes, edges)} of the `function_subgraph` of every symbol in
+    `symbols` that is in the call graph, reusing the ones already in `subgraphs`.
+    """
+    cut = {}
+    for symbol in symbols:
+        if subgraphs is not None and symbol in subgraphs:
+            cut[symbol] = subgraphs[symbol]
+            continue
+        sink = graph.id(symbol)
+        if sink is not None:
+            cut[symbol] = function_subgraph(graph, sink, depth)
+    return cut
+
+
+def saturation_depth(graph, distances):
+    """
+    Get the smallest depth from which the libsignal-filtered subgraph stops growing.
+
+    `distances` must come from an unbounded `caller_distances` traversal. Returns 0
+    if no libsignal function reaches the sink at any depth.
+    """
+    _, edges = filter_libsignal_paths(graph, *distance_subgraph(graph, distances))
+    # An edge is part of the subgraph once its callee is closer than the depth
+    return max((distances[callee] + 1 for _, callee in edges), default=0)
+
+
+class SourceReader:
+    """Read function bodies from the source tree the SCIP index was generated from."""
+
+    def __init__(self, source_root):
+        self.source_root = Path(source_root) if source_root else None
+        self._lines = {}
+
+    def lines(self, relative_path):
+        """Get the lines of a source file, or an empty list if it is not available."""
+        if relative_path not in self._lines:
+            lines = []
+            if self.source_root is not None:
+                try:
+                    with open(self.source_root / relative_path, "r", errors="replace") as f:
+                        lines = f.read().split("\n")
+                except OSError:
+                    pass
+            self._lines[relative_path] = lines
+        return self._lines[relative_path]
+
+    def function_body(self, relative_path, line):
+        """Get the text of the function starting at `line`, up to its closing brace."""
+        lines = self.lines(relative_path)
+        body = []
+        balance = 0
+        opened = False
+        for text in lines[line:]:
+            body.append(text)
+            balance += text.count("{") - text.count("}")
+            opened = opened or "{" in text
+            if (opened and balance <= 0) or (not opened and text.rstrip().endswith(";")):
+                break
+        return "\n".join(body)
+
+
+def dot_escape(text):
+    """Escape text for a double-quoted DOT string."""
+    return text.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def tooltip_text(body):
+    """Format a function body as a single-line DOT tooltip."""
+    text = body.replace("\n", " ")
+    if len(text) > TOOLTIP_MAX_CHARS:
+        text = text[:TOOLTIP_MAX_CHARS] + "..."
+    return dot_escape(text)
+
+
+def body_id(body):
+    """Get the content-derived ID of a function body in the body store."""
+    return hashlib.sha256(body.encode()).hexdigest()[:16]
+
+
+def render_dot(graph, sink, nodes, edges, sources=None, compact=False):
+    """
+    Render a subgraph of node IDs as DOT text in the format of the Rust generator.
+
+    With `compact`, nodes are numbered in symbol order and function bodies are
+    referenced by body ID instead of being embedded as tooltips.
+    """
+    sources = sources or SourceReader(None)
+    symbol = graph.catalog.symbol
+
+    ordered = sorted(nodes, key=symbol)
+    if compact:
+        dot_ids = {node: str(i) for i, node in enumerate(ordered)}
+    else:
+        dot_ids = {node: f'"{symbol(node)}"' for node in ordered}
+
+    clusters = defaultdict(list)
+    for node in ordered:
+        location = graph.definition(node)
+        clusters[location[0] if location else None].append(node)
+
+    lines = [
+        "digraph function_subgraph {",
+        "  rankdir=LR;",
+        "  node [shape=box, style=filled, fontname=Helvetica];",
+        "  edge [color=gray];",
+        "",
+    ]
+
+    def node_line(node, indent):
+        libsignal = graph.is_libsignal(node)
+        attributes = [f'label="{graph.catalog.record(node).name}"']
+        location = graph.definition(node)
+        if location:
+            body = sources.function_body(*location)
+            if body and compact:
+                attributes.append(f'body="{body_id(body)}"')
+            elif body:
+                attributes.append(f'tooltip="{tooltip_text(body)}"')
+        if node == sink:
+            attributes.append("fillcolor=green")
+        elif libsignal:
+            attributes.append("fillcolor=white")
+        else:
+            attributes.append("fillcolor=lightgray")
+        attributes.append('style="filled"' if libsignal else 'style="filled,dotted"')
+        if compact:
+            attributes.append(f'symbol="{dot_escape(symbol(node))}"')
+        return f"{indent}{dot_ids[node]} [{', '.join(attributes)}]"
+
+    cluster_index = 0
+    for relative_path in sorted(path for path in clusters if path is not None):
+        members = clusters[relative_path]
+        libsignal = relative_path.startswith(graph.libsignal_prefixes)
+        lines.append(f"  subgraph cluster_{cluster_index} {{")
+        lines.append(f'    label = "{Path(relative_path).name}";')
+        lines.append("    style=filled;")
+        if libsignal:
+            lines.append("    color=lightblue;")
+        else:
+            lines.append("    color=lightgrey;")
+            lines.append('    style="filled,dotted";')
+        lines.append("    fontname=Helvetica;")
+        for node in members:
+            lines.append(node_line(node, "    "))
+        lines.append("  }")
+        cluster_index += 1
+
+    for node in clusters.get(None, []):
+        lines.append(node_line(node, "  "))
+
+    lines.append("")
+    for caller, callee in sorted(edges, key=lambda edge: (symbol(edge[0]), symbol(edge[1]))):
+        caller_lib = graph.is_libsignal(caller)
+        callee_lib = graph.is_libsignal(callee)
+        if caller_lib and callee_lib:
+            style = "color=blue, style=dashed"
+        elif caller_lib:
+            style = "color=blue"
+        else:
+            style = "color=gray, style=dashed"
+        lines.append(f"  {dot_ids[caller]} -> {dot_ids[callee]} [{style}]")
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def compact_graph_symbols(text):
+    """Get the symbols of the nodes of a compact DOT graph."""
+    return [
+        match.group(1).replace('\\"', '"').replace("\\\\", "\\")
+        for match in SYMBOL_ATTRIBUTE.finditer(text)
+    ]
+
+
+def write_body_store(path, graph, symbols, sources):
+    """
+    Write the body store for compact graphs: body ID -> function body text of
+    every symbol in `symbols` whose source is available.
+    """
+    bodies = {}
+    for symbol in symbols:
+        node = graph.id(symbol)
+        location = graph.definition(node) if node is not None else None
+        body = sources.function_body(*location) if location else None
+        if body:
+            bodies[body_id(body)] = body
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(dict(sorted(bodies.items())), f, indent=2)
+    os.replace(tmp_path, path)
+    return bodies
+
+
+def write_function_graph(
+    graph, symbol, output_file, depth, sources=None, distances=None, compact=False, subgraphs=None
+):
+    """
+    Generate the graph for one symbol and write it to `output_file`.
+
+    Returns a result tuple in the same shape as the subprocess generator:
+    (symbol, success, info, error_msg). With a `subgraphs` dict, the (nodes, edges)
+    cut for the symbol is also stored in it under `symbol`.
+    """
+    try:
+        sink = graph.id(symbol)
+        if sink is None:
+            return (symbol, False, "empty graph", None)
+        nodes, edges = function_subgraph(graph, sink, depth, distances=distances)
+        if subgraphs is not None:
+            subgraphs[symbol] = (nodes, edges)
+        if not edges:
+            return (symbol, False, "empty graph", None)
+        with open(output_file, "w") as f:
+            f.write(render_dot(graph, sink, nodes, edges, sources, compact))
+        return (symbol, True, str(output_file), None)
+    except Exception as e:
+        return (symbol, False, f"exception: {str(e)}", str(e))
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+SQLite database of the call graph and of the generated per-sink graphs.
+
+Next to the DOT files, the generator writes `callgraph.sqlite` with:
+
+    nodes(id, symbol, name, crate, file, line, kind, role)
+        every function of the call graph; role is 'libsignal' (white nodes) or
+        'dependency' (light gray nodes)
+    edges(caller, callee)
+        every call of the call graph
+    graphs(sink, name, depth)
+        one row per generated graph, with the DOT file (or archive member) name
+    graph_nodes(sink, node), graph_edges(sink, caller, callee)
+        the nodes and edges of each sink's graph
+
+so that the graph of a sink, its grey nodes or an ad-hoc question over all graphs
+is one query instead of a scan of the DOT text. The sink of a graph is the green
+node; `role` gives the colour of every other node.
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+from pathlib import Path
+
+from curve25519_usage.callgraph import cut_subgraphs
+
+DB_FILE = "callgraph.sqlite"
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE nodes (
+    id INTEGER PRIMARY KEY,
+    symbol TEXT NOT NULL UNIQUE,
+    name TEXT,
+    crate TEXT,
+    file TEXT,
+    line INTEGER,
+    kind TEXT,
+    role TEXT NOT NULL
+);
+CREATE TABLE edges (
+    caller INTEGER NOT NULL,
+    callee INTEGER NOT NULL,
+    PRIMARY KEY (caller, callee)
+) WITHOUT ROWID;
+CREATE INDEX edges_callee ON edges (callee, caller);
+CREATE TABLE graphs (
+    sink INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    depth INTEGER NOT NULL
+);
+CREATE TABLE graph_nodes (
+    sink INTEGER NOT NULL,
+    node INTEGER NOT NULL,
+    PRIMARY KEY (sink, node)
+) WITHOUT ROWID;
+CREATE INDEX graph_nodes_node ON graph_nodes (node, sink);
+CREATE TABLE graph_edges (
+    sink INTEGER NOT NULL,
+    caller INTEGER NOT NULL,
+    callee INTEGER NOT NULL,
+    PRIMARY KEY (sink, caller, callee)
+) WITHOUT ROWID;
+CREATE INDEX graph_edges_caller ON graph_edges (caller, callee);
+CREATE INDEX graph_edges_callee ON graph_edges (callee, caller);
+"""
+
+# Non-sink curve25519-dalek nodes of each graph: the grey nodes of its DOT file
+GREY_NODES_QUERY = """
+SELECT graphs.name, nodes.symbol
+FROM graphs
+JOIN graph_nodes ON graph_nodes.sink = graphs.sink
+JOIN nodes ON nodes.id = graph_nodes.node
+WHERE graph_nodes.node != graphs.sink
+  AND nodes.role = 'dependency'
+  AND instr(nodes.symbol, 'curve25519-dalek') > 0
+ORDER BY graphs.name, nodes.symbol
+"""
+
+
+def node_rows(graph):
+    """Get a `nodes` table row for every function of a call graph."""
+    for node in sorted(graph.nodes()):
+        record = graph.catalog.record(node)
+        location = graph.definition(node)
+        yield (
+            node,
+            record.symbol,
+            record.name,
+            record.crate,
+            location[0] if location else None,
+            location[1] if location else None,
+            record.kind,
+            "libsignal" if graph.is_libsignal(node) else "dependency",
+        )
+
+
+def edge_rows(graph):
+    """Get an `edges` table row for every call of a call graph."""
+    for caller in range(graph.num_nodes):
+        for callee in graph.callees(caller):
+            yield caller, callee
+
+
+def write_database(path, graph, graphs, depth, subgraphs=None):
+    """
+    Write the call graph database atomically.
+
+    `graphs` maps the symbol of every generated graph to its DOT file name; the
+    membership of each graph is cut from the call graph the same way the graph
+    itself was, unless `subgraphs` (see `callgraph.cut_subgraphs`) already holds it.
+    Returns the number of graphs written.
+    """
+    subgraphs = cut_subgraphs(graph, graphs, depth, subgraphs)
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    if tmp_path.exists():
+        tmp_path.unlink()
+    connection = sqlite3.connect(tmp_path)
+    try:
+        connection.execute("PRAGMA journal_mode = OFF")
+        connection.execute("PRAGMA synchronous = OFF")
+        connection.executescript(SCHEMA)
+        connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        connection.executemany(
+            "INSERT INTO nodes VALUES (?, ?, ?, ?, ?, ?, ?, ?)", node_rows(graph)
+        )
+        connection.executemany("INSERT INTO edges VALUES (?, ?)", edge_rows(graph))
+
+        count = 0
+        for symbol, name in sorted(graphs.items()):
+            if symbol not in subgraphs:
+                continue
+            sink = graph.id(symbol)
+            nodes, edges = subgraphs[symbol]
+            connection.execute("INSERT INTO graphs VALUES (?, ?, ?)", (sink, name, depth))
+            connection.executemany(
+                "INSERT INTO graph_nodes VALUES (?, ?)", ((sink, node) for node in nodes)
+            )
+            connection.executemany(
+                "INSERT INTO graph_edges VALUES (?, ?, ?)",
+                ((sink, caller, callee) for caller, callee in edges),
+            )
+            count += 1
+        connection.commit()
+    finally:
+        connection.close()
+    os.replace(tmp_path, path)
+    return count
+
+
+class CallGraphDatabase:
+    """Read-only queries over a call graph database."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        if not self.path.is_file():
+            raise FileNotFoundError(f"call graph database not found: {self.path}")
+        self.connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self.connection.close()
+            raise ValueError(f"unsupported call graph database version {version}: {self.path}")
+
+    def query(self, sql, parameters=()):
+        """Run an SQL query and get all rows."""
+        return self.connection.execute(sql, parameters).fetchall()
+
+    def graph_names(self):
+        """Get the DOT file names of all graphs, sorted."""
+        return [name for (name,) in self.query("SELECT name FROM graphs ORDER BY name")]
+
+    def sink_symbols(self):
+        """Get {graph name: sink symbol} for all graphs."""
+        return dict(
+            self.query("SELECT graphs.name, nodes.symbol FROM graphs JOIN nodes ON nodes.id = sink")
+        )
+
+    def graph(self, symbol):
+        """Get the (node symbols, (caller, callee) symbol pairs) of a sink's graph."""
+        nodes = self.query(
+            "SELECT n.symbol FROM graph_nodes JOIN nodes n ON n.id = graph_nodes.node "
+            "JOIN nodes s ON s.id = graph_nodes.sink WHERE s.symbol = ?",
+            (symbol,),
+        )
+        edges = self.query(
+            "SELECT a.symbol, b.symbol FROM graph_edges "
+            "JOIN nodes s ON s.id = graph_edges.sink "
+            "JOIN nodes a ON a.id = graph_edges.caller "
+            "JOIN nodes b ON b.id = graph_edges.callee WHERE s.symbol = ?",
+            (symbol,),
+        )
+        return {node for (node,) in nodes}, set(edges)
+
+    def grey_nodes(self):
+        """Get {graph name: sorted grey node symbols} for all graphs."""
+        grey = {name: [] for name in self.graph_names()}
+        for name, symbol in self.query(GREY_NODES_QUERY):
+            grey[name].append(symbol)
+        return grey
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run an SQL query on a call graph database")
+    parser.add_argument("database", type=Path, help=f"Path to {DB_FILE}")
+    parser.add_argument("sql", help="SQL query, e.g. 'SELECT count(*) FROM graphs'")
+    args = parser.parse_args(argv)
+
+    try:
+        with CallGraphDatabase(args.database) as database:
+            rows = database.query(args.sql)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"Error: {e}")
+        return 1
+    for row in rows:
+        print("\t".join("" if value is None else str(value) for value in row))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Interval index of the definitions of SCIP documents.
+
+Every consumer that attributes a reference occurrence to "the function it is in"
+(the call graph builder, the CSV and link generation, link validation) asks the
+same question: which definition encloses this position? `DocumentDefinitions`
+answers it for one document with a binary search over the definition spans.
+
+A definition's span is its `enclosing_range` (the whole item, body included)
+when the indexer recorded one. Otherwise it runs from the definition occurrence
+to the start of the next definition in the document, which attributes a
+reference to the closest definition before it. Spans from enclosing ranges may
+nest, e.g. a function defined inside another one; the innermost span wins.
+
+`DefinitionIndex` keeps the per-document indexes of a whole SCIP index and the
+spans of every symbol. It is a `ScipVisitor`, so it can be filled during a
+shared `scan_index` traversal.
+"""
+
+import bisect
+from collections import defaultdict, namedtuple
+
+from curve25519_usage.scip_scan import ScipVisitor
+
+# One definition of `symbol_id` in the document at `relative_path`. `line` is the
+# line of the definition occurrence (the name), which links point at; `start` and
+# `end` are the (line, char) bounds of the span, `end` exclusive and None when the
+# span runs to the end of the document
+DefinitionSpan = namedtuple("DefinitionSpan", "symbol_id relative_path line start end")
+
+_END_OF_DOCUMENT = (float("inf"), 0)
+
+
+class DocumentDefinitions:
+    """Definition spans of one SCIP document, with enclosing-definition lookups."""
+
+    def __init__(self, doc, wanted=None):
+        """
+        Index the definitions of `doc`, or only those whose symbol ID passes
+        `wanted(symbol_id)`.
+        """
+        self.relative_path = doc.relative_path
+        definitions = []
+        for occ, extent in zip(doc.iter_definitions(), doc.iter_enclosing_ranges()):
+            if wanted is None or wanted(occ.symbol_id):
+                definitions.append((occ, extent))
+
+        # Spans without an enclosing range end where the next definition starts
+        next_starts = sorted((occ.start_line, occ.start_char) for occ, _ in definitions)
+        self.spans = []  # in document occurrence order
+        for occ, extent in definitions:
+            if extent is not None:
+                start, end = extent[:2], extent[2:]
+            else:
+                start = (occ.start_line, occ.start_char)
+                i = bisect.bisect_right(next_starts, start)
+                end = next_starts[i] if i < len(next_starts) else None
+            self.spans.append(
+                DefinitionSpan(occ.symbol_id, self.relative_path, occ.start_line, start, end)
+            )
+
+        # Outer spans before the spans nested in them, then the parent of every
+        # span: the closest span that is still open where it starts
+        self._ordered = sorted(
+            self.spans, key=lambda span: (span.start, _negated(span.end or _END_OF_DOCUMENT))
+        )
+        self._starts = [span.start for span in self._ordered]
+        self._ends = [span.end or _END_OF_DOCUMENT for span in self._ordered]
+        self._parents = []
+        open_spans = []
+        for i, start in enumerate(self._starts):
+            while open_spans and self._ends[open_spans[-1]] <= start:
+                open_spans.pop()
+            self._parents.append(open_spans[-1] if open_spans else -1)
+            open_spans.append(i)
+
+    def enclosing(self, line, char):
+        """Get the innermost `DefinitionSpan` containing a position, or None."""
+        position = (line, char)
+        i = bisect.bisect_right(self._starts, position) - 1
+        while i >= 0:
+            if position < self._ends[i]:
+                return self._ordered[i]
+            i = self._parents[i]
+        return None
+
+    def enclosing_symbol(self, line, char):
+        """Get the symbol ID of the innermost definition containing a position, or None."""
+        span = self.enclosing(line, char)
+        return span.symbol_id if span is not None else None
+
+
+def _negated(position):
+    return (-position[0], -position[1])
+
+
+class DefinitionIndex(ScipVisitor):
+    """
+    Definition spans of all visited documents: enclosing-definition lookups by
+    document path and the spans of every symbol ID.
+    """
+
+    def __init__(self, wanted=None, path_prefixes=None):
+        self.wanted = wanted
+        self.path_prefixes = path_prefixes
+        self.documents = {}  # relative path -> DocumentDefinitions
+        self._spans = defaultdict(list)
+
+    @classmethod
+    def from_index(cls, index, wanted=None, path_prefixes=None):
+        """Index the definitions of the documents of a `ScipIndex`."""
+        definition_index = cls(wanted, path_prefixes)
+        for doc in index.iter_documents(path_prefixes):
+            definition_index.visit_document(index, doc)
+        return definition_index
+
+    def visit_document(self, index, doc):
+        definitions = DocumentDefinitions(doc, self.wanted)
+        self.documents[doc.relative_path] = definitions
+        for span in definitions.spans:
+            self._spans[span.symbol_id].append(span)
+
+    def enclosing_symbol(self, relative_path, line, char):
+        """Get the symbol ID of the innermost definition containing a position, or None."""
+        definitions = self.documents.get(relative_path)
+        return definitions.enclosing_symbol(line, char) if definitions is not None else None
+
+    def spans(self, symbol_id):
+        """Get the `DefinitionSpan`s of a symbol ID, in document scan order."""
+        return self._spans.get(symbol_id, [])
+
+    def definition(self, symbol_id):
+        """Get the first `DefinitionSpan` of a symbol ID, or None."""
+        spans = self._spans.get(symbol_id)
+        return spans[0] if spans else None
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+All-depths sweep of the curve25519-dalek caller graphs.
+
+For every function symbol a single unbounded breadth-first traversal records the
+minimum caller distance of each node. From that one result the sweep:
+- reports the smallest depth at which the symbol's libsignal-filtered graph stops
+  growing (its saturation depth), and the smallest depth at which no graph grows
+- optionally writes the graphs for one or several `--depths` at once, with the
+  same file names and content as `generate-curve25519-graphs-parallel --depth N`
+
+This replaces rerunning the whole generation for every candidate depth.
+"""
+
+import argparse
+import json
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+from curve25519_usage.callgraph import (
+    LIBSIGNAL_PATH_PREFIXES,
+    SourceReader,
+    build_call_graph,
+    caller_distances,
+    saturation_depth,
+    write_function_graph,
+)
+from curve25519_usage.generate_curve25519_graphs_parallel import (
+    graph_output_file,
+    index_function_symbols,
+    summarize_results,
+)
+from curve25519_usage.scip_index import load_index
+
+SWEEP_REPORT_FILE = "depth_sweep.json"
+
+
+def get_project_root():
+    """Get the project root directory."""
+    current = Path(__file__).resolve().parent
+    return current.parent.parent
+
+
+def parse_depths(text):
+    """Parse a comma-separated list of depths, e.g. '15,20,25'."""
+    try:
+        depths = sorted({int(part) for part in text.split(",") if part.strip()})
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid depth list: {text}")
+    if not depths or depths[0] < 1:
+        raise argparse.ArgumentTypeError(f"depths must be positive integers: {text}")
+    return depths
+
+
+def sweep_symbols(graph, symbols, output_path=None, depths=(), sources=None):
+    """
+    Run one traversal per symbol and cut the graphs for all `depths` from it.
+
+    Returns (saturation, results): saturation maps each symbol to its saturation
+    and maximum caller distance; results maps each depth to the list of result
+    tuples in the same shape as `generate_single_graph`.
+    """
+    saturation = {}
+    results = {depth: [] for depth in depths}
+    for symbol in symbols:
+        sink = graph.id(symbol)
+        distances = caller_distances(graph, sink) if sink is not None else {}
+        saturation[symbol] = {
+            "saturation_depth": saturation_depth(graph, distances) if distances else 0,
+            "max_caller_distance": max(distances.values(), default=0),
+        }
+        for depth in depths:
+            output_file = graph_output_file(output_path, symbol, depth)
+            results[depth].append(
+                write_function_graph(graph, symbol, output_file, depth, sources, distances)
+            )
+    return saturation, results
+
+
+def main(argv=None):
+    project_root = get_project_root()
+    parser = argparse.ArgumentParser(
+        description="Find where caller graphs stop growing and write graphs for many depths"
+    )
+    parser.add_argument(
+        "--scip-json",
+        type=Path,
+        default=project_root / "data" / "index_scip_libsignal_deps.json",
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=Path,
+        default=project_root / "outputs" / "curve25519-dalek_public_apis_graphs_sweep",
+    )
+    parser.add_argument(
+        "--depths",
+        type=parse_depths,
+        default=[],
+        help="Comma-separated depths to write graphs for, e.g. 15,20 (default: report only)",
+    )
+    parser.add_argument("--source-root", type=Path, default=None)
+    parser.add_argument("--libsignal-prefix", action="append", dest="libsignal_prefixes")
+    args = parser.parse_args(argv)
+
+    if not args.scip_json.exists():
+        print(f"Error: SCIP JSON not found at {args.scip_json}")
+        return 1
+
+    start_time = time.time()
+    print("Building call graph from SCIP index...")
+    index = load_index(args.scip_json)
+    graph = build_call_graph(index, args.libsignal_prefixes or LIBSIGNAL_PATH_PREFIXES)
+    symbols = index_function_symbols(index)
+    print(f"Found {len(symbols)} function symbols")
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    sources = SourceReader(args.source_root or graph.source_root)
+    saturation, results = sweep_symbols(graph, symbols, args.output_dir, args.depths, sources)
+    elapsed_total = time.time() - start_time
+
+    depths = [entry["saturation_depth"] for entry in saturation.values()]
+    complete_depth = max(depths, default=0)
+    histogram = Counter(depth for depth in depths if depth > 0)
+
+    print(f"\n{'=' * 50}")
+    print("Saturation depths (symbols with a non-empty graph):")
+    for depth in sorted(histogram):
+        print(f"  - depth {depth}: {histogram[depth]}")
+    print(f"\nNo graph grows beyond depth {complete_depth}")
+
+    report = {
+        "complete_depth": complete_depth,
+        "saturation_histogram": {str(depth): histogram[depth] for depth in sorted(histogram)},
+        "symbols": saturation,
+        "depths": {},
+        "elapsed_seconds": elapsed_total,
+    }
+    for depth in args.depths:
+        summary = summarize_results(symbols, results[depth])
+        report["depths"][str(depth)] = summary
+        print(f"  Depth {depth}: {summary['generated_graphs']} non-empty graphs")
+
+    # With a single depth the output directory is a regular graph directory
+    if len(args.depths) == 1:
+        summary = dict(report["depths"][str(args.depths[0])], elapsed_seconds=elapsed_total)
+        with open(args.output_dir / "processing_results.json", "w") as f:
+            json.dump(summary, f, indent=2)
+
+    with open(args.output_dir / SWEEP_REPORT_FILE, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nTime elapsed: {elapsed_total:.1f}s")
+    print(f"Report saved to: {args.output_dir / SWEEP_REPORT_FILE}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
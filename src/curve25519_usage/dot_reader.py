@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Streaming reader for the DOT graphs written by the generators.
+
+`read_dot(lines)` takes any iterable of lines (an open file, an archive member
+stream, ...) and yields a `DotNode` per node statement and a `DotEdge` per edge,
+one line at a time. Only the statement being parsed is held in memory, so graph
+size does not matter, and quoting is handled properly: quoted IDs, escaped
+quotes, `]`, `;` or `->` inside quoted attribute values, quoted strings and
+attribute lists spanning several lines, and nested `subgraph cluster_* { ... }`
+blocks.
+
+Supported is the DOT subset the generators and Graphviz tools commonly emit:
+`graph`/`digraph` headers, node, edge and default attribute statements,
+`key=value` graph attributes, subgraphs, HTML-like IDs (`label=<<b>x</b>>`, read
+as the markup between the outer angle brackets), `//` and `#` line comments.
+Ports and subgraphs as edge operands are not.
+
+The generators write one statement per line, so a line that holds exactly one
+simple statement (a node, an edge, `key=value`, `subgraph name {` or `}`) is
+parsed with a single regular expression; only other lines go through the
+tokenizer.
+"""
+
+import re
+from collections import deque, namedtuple
+
+# A node statement; `attributes` maps names to unescaped values and `subgraph` is
+# the name of the innermost enclosing subgraph, e.g. 'cluster_0', or None
+DotNode = namedtuple("DotNode", "id attributes subgraph")
+# One edge of an edge statement; `a -> b -> c` yields two
+DotEdge = namedtuple("DotEdge", "source target attributes subgraph")
+
+# Token kinds
+QUOTED = "quoted"
+HTML = "html"
+NAME = "name"
+EDGE_OPERATOR = "edge_operator"
+PUNCTUATION = "punctuation"
+# A whole line holding one simple statement, parsed ahead of the tokenizer
+_LINE = "line"
+
+KEYWORDS = {"node", "edge", "graph", "digraph", "subgraph", "strict"}
+
+_TOKEN = re.compile(
+    r"""
+    [ \t\r\n\f\v]+
+    | (?P<comment>//.*)
+    | "(?P<quoted>[^"\\]*(?:\\.[^"\\]*)*)"
+    | (?P<open>"[^"\\]*(?:\\.[^"\\]*)*\\?)\Z
+    | (?P<edge_operator>->|--)
+    | (?P<name>[A-Za-z_\x80-\U0010ffff][A-Za-z0-9_\x80-\U0010ffff]*
+        | -?(?:\.[0-9]+|[0-9]+(?:\.[0-9]*)?))
+    | (?P<punctuation>[\[\]{};,=:])
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+# The rest of a quoted string continued from the previous line
+_QUOTED_REST = re.compile(r'(?P<quoted>[^"\\]*(?:\\.[^"\\]*)*)"', re.DOTALL)
+_ESCAPE = re.compile(r'\\(["\\])|\\\r?\n')
+_ANGLE = re.compile(r"[<>]")
+
+_ID = r'"[^"\\]*(?:\\.[^"\\]*)*"|[A-Za-z_][A-Za-z0-9_]*|-?(?:\.[0-9]+|[0-9]+(?:\.[0-9]*)?)'
+_ATTRIBUTE = re.compile(rf"([A-Za-z_][A-Za-z0-9_]*)[ \t]*=[ \t]*({_ID})(?![A-Za-z0-9_.])")
+_SIMPLE_STATEMENT = re.compile(
+    rf"""[ \t]*(?P<source>{_ID})
+    (?:[ \t]*->[ \t]*(?P<target>{_ID}))?
+    (?:[ \t]*\[(?P<attributes>[ \t]*(?:{_ATTRIBUTE.pattern}[ \t]*[,;]?[ \t]*)*)\])?
+    [ \t]*;?[ \t]*\r?\n?\Z""",
+    re.VERBOSE,
+)
+_LINE_END = r"[ \t]*;?[ \t]*\r?\n?\Z"
+_CLOSE = re.compile(r"[ \t]*\}" + _LINE_END)
+_ASSIGNMENT = re.compile(rf"[ \t]*(?:{_ID})[ \t]*=[ \t]*(?:{_ID}){_LINE_END}")
+_SUBGRAPH = re.compile(rf"[ \t]*subgraph[ \t]+({_ID})[ \t]*\{{[ \t]*\r?\n?\Z")
+
+
+class DotSyntaxError(ValueError):
+    """The DOT input is not in the supported subset."""
+
+
+def unescape(text):
+    """Undo the escaping of a quoted DOT string: `\\"`, `\\\\` and line continuations."""
+    if "\\" not in text:
+        return text
+    return _ESCAPE.sub(lambda match: match.group(1) or "", text)
+
+
+def _html_end(text, depth, start=0):
+    """
+    Scan `text` from `start` inside an HTML-like ID open `depth` angle brackets deep.
+
+    Returns (end, depth): `end` is the index after the closing '>', or None if the
+    ID is still open at the end of `text` with `depth` brackets.
+    """
+    for match in _ANGLE.finditer(text, start):
+        depth += 1 if match.group() == "<" else -1
+        if depth == 0:
+            return match.end(), 0
+    return None, depth
+
+
+def _unquote(text):
+    if not text.startswith('"'):
+        return text
+    return unescape(text[1:-1])
+
+
+def _parse_line(line):
+    """
+    Parse a line that holds exactly one simple statement, or get None.
+
+    Returns (kind, value): ("statement", (chain, attributes)) for a node or edge,
+    ("subgraph", name) for a `subgraph name {` line, ("close", None) for `}`, and
+    ("ignored", None) for a `key=value` attribute or default attribute statement.
+    """
+    match = _SIMPLE_STATEMENT.match(line)
+    if match is not None:
+        source = match.group("source")
+        keyword = source.lower()
+        if keyword in KEYWORDS:
+            if keyword in ("node", "edge", "graph") and match.group("attributes") is not None:
+                return "ignored", None
+            return None
+        chain = [_unquote(source)]
+        if match.group("target") is not None:
+            chain.append(_unquote(match.group("target")))
+        attributes = {}
+        if match.group("attributes"):
+            for name, value in _ATTRIBUTE.findall(match.group("attributes")):
+                attributes[name] = _unquote(value)
+        return "statement", (chain, attributes)
+    if _CLOSE.match(line):
+        return "close", None
+    if _ASSIGNMENT.match(line):
+        return "ignored", None
+    match = _SUBGRAPH.match(line)
+    if match is not None:
+        return "subgraph", _unquote(match.group(1))
+    return None
+
+
+class _Tokens:
+    """
+    Token stream over DOT lines with one token of lookahead.
+
+    Lines are read only when the next token is needed. A line holding one simple
+    statement becomes a single `_LINE` token; should the parser need its tokens
+    after all (the line continues a statement), it is tokenized then.
+    """
+
+    def __init__(self, lines):
+        self._lines = enumerate(lines, start=1)
+        self._queue = deque()
+        self._pending = None  # start of a quoted string continued on the next line
+        self._pending_html = None  # [start, depth] of an HTML-like ID continued likewise
+        self.line_number = 0
+
+    @property
+    def _continued(self):
+        return self._pending is not None or self._pending_html is not None
+
+    def _tokenize(self, line, line_number):
+        if self._pending_html is not None:
+            text, depth = self._pending_html
+            end, depth = _html_end(line, depth)
+            if end is None:
+                self._pending_html = [text + line, depth]
+                return
+            self._queue.append((HTML, text + line[: end - 1], line_number))
+            self._pending_html = None
+            line = line[end:]
+        elif self._pending is not None:
+            match = _QUOTED_REST.match(line)
+            if match is None:
+                self._pending += line
+                return
+            value = unescape(self._pending + match.group("quoted"))
+            self._queue.append((QUOTED, value, line_number))
+            self._pending = None
+            line = line[match.end() :]
+        elif line.startswith("#"):
+            return
+
+        pos = 0
+        end = len(line)
+        while pos < end:
+            if line[pos] == "<":
+                html_end, depth = _html_end(line, 0, pos)
+                if html_end is None:
+                    self._pending_html = [line[pos + 1 :], depth]
+                    return
+                self._queue.append((HTML, line[pos + 1 : html_end - 1], line_number))
+                pos = html_end
+                continue
+            match = _TOKEN.match(line, pos)
+            if match is None:
+                raise DotSyntaxError(f"line {line_number}: unexpected {line[pos : pos + 20]!r}")
+            pos = match.end()
+            kind = match.lastgroup
+            if kind is None or kind == "comment":
+                continue
+            if kind == "open":
+                self._pending = match.group("open")[1:]
+                return
+            value = match.group(kind)
+            if kind == QUOTED:
+                value = unescape(value)
+            self._queue.append((kind, value, line_number))
+
+    def peek(self):
+        """Get the next token, or (None, None, None) at the end."""
+        while not self._queue:
+            line = None
+            for self.line_number, line in self._lines:
+                break
+            if line is None:
+                if self._pending is not None:
+                    raise DotSyntaxError(f"line {self.line_number}: unterminated quoted string")
+                if self._pending_html is not None:
+                    raise DotSyntaxError(f"line {self.line_number}: unterminated HTML-like ID")
+                return (None, None, None)
+            parsed = None if self._continued else _parse_line(line)
+            if parsed is not None:
+                self._queue.append((_LINE, (parsed, line), self.line_number))
+            elif not self._continued and line.isspace():
+                continue
+            else:
+                self._tokenize(line, self.line_number)
+        return self._queue[0]
+
+    def take_line(self):
+        """Take the next token if it is a whole line; get its `_parse_line` result."""
+        kind, value, _ = self.peek()
+        if kind != _LINE:
+            return None
+        self._queue.popleft()
+        return value[0]
+
+    def take(self):
+        """Take the next token."""
+        kind, value, line_number = self.peek()
+        if kind == _LINE:
+            # The line continues a statement, so it is needed token by token
+            self._queue.popleft()
+            self._tokenize(value[1], line_number)
+            return self.take()
+        if kind is not None:
+            self._queue.popleft()
+        return kind, value, line_number
+
+    def is_punctuation(self, value):
+        kind, token_value, _ = self.peek()
+        return kind == PUNCTUATION and token_value == value
+
+    def identifier(self):
+        kind, value, line_number = self.take()
+        if kind not in (QUOTED, HTML, NAME):
+            raise DotSyntaxError(f"line {line_number}: expected an ID, got {value!r}")
+        return value
+
+    def attribute_lists(self, attributes):
+        """Parse `[a=b, c=d][e=f]` lists following a statement into `attributes`."""
+        while self.is_punctuation("["):
+            self.take()
+            while not self.is_punctuation("]"):
+                if self.is_punctuation(",") or self.is_punctuation(";"):
+                    self.take()
+                    continue
+                name = self.identifier()
+                value = "true"
+                if self.is_punctuation("="):
+                    self.take()
+                    value = self.identifier()
+                attributes[name] = value
+            self.take()
+        return attributes
+
+
+def dot_tokens(lines):
+    """
+    Split DOT lines into (kind, value, line_number) tokens.
+
+    Kinds are QUOTED (value unescaped), HTML (the markup inside the outer angle
+    brackets), NAME, EDGE_OPERATOR and PUNCTUATION. A quoted string or HTML-like ID
+    left open at the end of a line continues on the next one.
+    """
+    tokens = _Tokens(lines)
+    while True:
+        token = tokens.take()
+        if token[0] is None:
+            return
+        yield token
+
+
+def read_dot(lines):
+    """
+    Yield a `DotNode` for every node statement and a `DotEdge` for every edge of
+    a DOT graph, reading `lines` incrementally.
+    """
+    tokens = _Tokens(lines)
+    subgraphs = []
+    started = False
+    while True:
+        line = tokens.take_line() if started else None
+        if line is not None:
+            kind, value = line
+            if kind == "close":
+                if not subgraphs:
+                    raise DotSyntaxError(f"line {tokens.line_number}: unbalanced '}}'")
+                subgraphs.pop()
+                started = bool(subgraphs)
+                continue
+            if kind == "subgraph":
+                subgraphs.append(value)
+                continue
+            if kind == "ignored":
+                continue
+            chain, attributes = value
+        else:
+            kind, value, line_number = tokens.take()
+            if kind is None:
+                if subgraphs:
+                    raise DotSyntaxError("unexpected end of input inside a block")
+                return
+            if kind == PUNCTUATION:
+                if value == "}":
+                    if not subgraphs:
+                        raise DotSyntaxError(f"line {line_number}: unbalanced '}}'")
+                    subgraphs.pop()
+                    # A file may hold several graphs
+                    started = bool(subgraphs)
+                elif value == "{":
+                    subgraphs.append(None)
+                elif value not in ";,":
+                    raise DotSyntaxError(f"line {line_number}: unexpected {value!r}")
+                continue
+            if kind == EDGE_OPERATOR:
+                raise DotSyntaxError(f"line {line_number}: edge without a source")
+
+            keyword = value.lower() if kind == NAME else None
+            if not started and keyword in ("strict", "graph", "digraph"):
+                # Header: [strict] (graph|digraph) [ID] {
+                while not tokens.is_punctuation("{"):
+                    if tokens.take()[0] is None:
+                        raise DotSyntaxError("missing '{' after the graph header")
+                tokens.take()
+                subgraphs.append(None)
+                started = True
+                continue
+            if keyword == "subgraph":
+                name = None if tokens.is_punctuation("{") else tokens.identifier()
+                if not tokens.is_punctuation("{"):
+                    raise DotSyntaxError(f"line {line_number}: expected '{{' after subgraph")
+                tokens.take()
+                subgraphs.append(name)
+                continue
+            if keyword in ("node", "edge", "graph") and tokens.is_punctuation("["):
+                # Default attributes, e.g. `node [shape=box]`
+                tokens.attribute_lists({})
+                continue
+            if tokens.is_punctuation("="):
+                # Graph or subgraph attribute, e.g. `rankdir=LR`
+                tokens.take()
+                tokens.identifier()
+                continue
+            chain, attributes = [value], {}
+
+        # The statement may continue on the following lines
+        while tokens.peek()[0] == EDGE_OPERATOR:
+            tokens.take()
+            chain.append(tokens.identifier())
+        tokens.attribute_lists(attributes)
+
+        subgraph = next((name for name in reversed(subgraphs) if name is not None), None)
+        if len(chain) == 1:
+            yield DotNode(chain[0], attributes, subgraph)
+        for source, target in zip(chain, chain[1:]):
+            yield DotEdge(source, target, attributes, subgraph)
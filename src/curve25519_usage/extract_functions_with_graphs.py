@@ -1,12 +1,33 @@
 #!/usr/bin/env python3
 """
 Extract functions that have non-empty graphs and create a markdown file
+
+Public API entries are joined to graphs on symbol keys, (module, type, name) as
+`extract_public_api_from_scip` derives them from SCIP symbols, through a dict:
+
+- with `processing_results.json` next to the graphs, the keys of the symbols
+  whose graphs were generated (all symbols but the failed ones);
+- without it, the graph file names: the filesystem-safe name of each entry's
+  SCIP symbol, with any depth suffix (`_15.dot`, `_depth20.dot`) stripped.
 """
 
+import argparse
 import json
-import sys
+import re
 from pathlib import Path
 
+from curve25519_usage.extract_public_api_from_scip import parse_symbol_path
+from curve25519_usage.generate_curve25519_graphs_parallel import safe_symbol_name
+from curve25519_usage.graph_archive import open_graphs
+
+CURVE25519_PREFIX = "rust-analyzer cargo curve25519-dalek 4.1.3 "
+
+# Depth suffix of graph file names: `_15` in older outputs, `_depth20` now
+GRAPH_DEPTH_SUFFIX = re.compile(r"_(?:depth)?\d+$")
+
+# SCIP quotes identifiers that are not simple in backticks, e.g. `NafLookupTable5<T>`
+SIMPLE_IDENTIFIER = re.compile(r"[\w+$-]+")
+
 
 def get_project_root():
     """Get the project root directory."""
@@ -14,91 +35,167 @@ def get_project_root():
     return current.parent.parent
 
 
-def main():
-    # Get paths
-    project_root = get_project_root()
-    api_json_path = project_root / "data" / "curve25519-dalek-public-api.json"
-    graphs_dir = project_root / "outputs" / "curve25519-dalek_public_apis_graphs"
-    output_path = project_root / "docs" / "curve25519-dalek-public-api-with-graphs.md"
+def symbol_key(symbol):
+    """Get the (module, type, name) key of a SCIP symbol, or None if it has no name."""
+    parsed = parse_symbol_path(symbol)
+    if parsed is None or parsed["name"] is None:
+        return None
+    return (parsed["module"], parsed["type"], parsed["name"])
 
-    # Validate paths
-    if not api_json_path.exists():
-        print(f"Error: API JSON not found at {api_json_path}")
-        sys.exit(1)
-    if not graphs_dir.exists():
-        print(f"Error: Graphs directory not found at {graphs_dir}")
-        sys.exit(1)
-
-    # Read the original API JSON
-    with open(api_json_path, "r") as f:
-        api_data = json.load(f)
 
-    # Get list of DOT files (which represent non-empty graphs)
-    dot_files = list(graphs_dir.glob("*.dot"))
+def api_symbol(key, callable_entry):
+    """Get the SCIP symbol of a public API entry, as rust-analyzer names inherent items."""
+    module, type_name, name = key
+    path = f"{module}/" if module else ""
+    if type_name is not None:
+        if not SIMPLE_IDENTIFIER.fullmatch(type_name):
+            type_name = f"`{type_name}`"
+        path += f"impl#[{type_name}]"
+    return f"{CURVE25519_PREFIX}{path}{name}{'().' if callable_entry else '.'}"
 
-    # Extract function names from DOT filenames
-    functions_with_graphs = set()
-    for dot_file in dot_files:
-        # Remove _5.dot suffix and convert underscores back to original format
-        name = dot_file.stem[:-2]  # Remove _5
-        functions_with_graphs.add(name)
 
-    print(f"Found {len(functions_with_graphs)} functions with graphs")
-
-    # Build markdown content
+def iter_api_entries(api_data):
+    """
+    Yield (module, key, signature, callable) for the entries of a public API JSON,
+    in document order: type constants and methods, then functions and constants.
+    """
+    for module_name, module_data in api_data["modules"].items():
+        for type_name, type_data in module_data.get("types", {}).items():
+            for const in type_data.get("constants", []):
+                key = (module_name, type_name, const["name"])
+                yield module_name, key, const["signature"], False
+            for method in type_data.get("methods", []):
+                key = (module_name, type_name, method["name"])
+                yield module_name, key, method["signature"], True
+        for function in module_data.get("functions", []):
+            key = (module_name, None, function["name"])
+            yield module_name, key, function["signature"], True
+        for const in module_data.get("constants", []):
+            key = (module_name, None, const["name"])
+            yield module_name, key, const["signature"], False
+
+
+def successful_symbols(results_path):
+    """Get the symbols whose graphs were generated, from `processing_results.json`."""
+    with open(results_path, "r") as f:
+        results = json.load(f)
+    # Failed symbols are stored without the curve25519-dalek prefix
+    failed = {item[0] for item in results.get("failed_symbols", [])}
+    return [
+        symbol
+        for symbol in results.get("all_symbols", [])
+        if symbol.replace(CURVE25519_PREFIX, "") not in failed
+    ]
+
+
+def keys_from_symbols(symbols):
+    """Index symbols by their keys."""
+    index = {}
+    for symbol in symbols:
+        key = symbol_key(symbol)
+        if key is not None:
+            index.setdefault(key, symbol)
+    return index
+
+
+def keys_from_graph_names(names, entries):
+    """Index the API entries that have a graph among the DOT file `names` by their keys."""
+    stems = {GRAPH_DEPTH_SUFFIX.sub("", Path(name).stem) for name in names}
+    index = {}
+    for _, key, _, callable_entry in entries:
+        symbol = api_symbol(key, callable_entry)
+        if safe_symbol_name(symbol) in stems:
+            index[key] = symbol
+    return index
+
+
+def build_markdown(entries, graph_keys, total):
+    """Render the API entries whose keys have graphs, grouped by module."""
     md_content = ["# curve25519-dalek Public API Functions with libsignal Call Graphs\n"]
     md_content.append(
         "This file lists only the curve25519-dalek public functions that have non-empty call graphs "
     )
     md_content.append("showing relationships with libsignal code.\n\n")
-    md_content.append(f"Total functions with graphs: {len(functions_with_graphs)}\n")
+    md_content.append(f"Total functions with graphs: {total}\n")
 
-    # Process each module from the original API
-    for module_name, module_data in api_data["modules"].items():
-        module_functions = []
-
-        # Check types in module
-        if "types" in module_data:
-            for type_name, type_data in module_data["types"].items():
-                if "constants" in type_data:
-                    for const in type_data["constants"]:
-                        # Check if this constant has a graph
-                        safe_name = f"{module_name.replace('/', '_')}_{type_name}__{const['name']}"
-                        if any(safe_name in str(f) for f in functions_with_graphs):
-                            module_functions.append(f"- `{const['signature']}`")
-
-                if "methods" in type_data:
-                    for method in type_data["methods"]:
-                        # Check if this method has a graph
-                        safe_name = f"{module_name.replace('/', '_')}_{type_name}_{method['name']}"
-                        if any(safe_name in str(f) for f in functions_with_graphs):
-                            module_functions.append(f"- `{method['signature']}`")
-
-        # Check standalone functions
-        if "functions" in module_data:
-            for function in module_data["functions"]:
-                safe_name = f"{module_name.replace('/', '_')}_{function['name']}"
-                if any(safe_name in str(f) for f in functions_with_graphs):
-                    module_functions.append(f"- `{function['signature']}`")
-
-        # Check constants
-        if "constants" in module_data:
-            for const in module_data["constants"]:
-                safe_name = f"{module_name.replace('/', '_')}_{const['name']}"
-                if any(safe_name in str(f) for f in functions_with_graphs):
-                    module_functions.append(f"- `{const['signature']}`")
-
-        # Add to markdown if there are functions
-        if module_functions:
-            md_content.append(f"\n## Module: `{module_name}`\n")
-            md_content.extend(module_functions)
+    modules = {}
+    for module_name, key, signature, _ in entries:
+        if key in graph_keys:
+            modules.setdefault(module_name, []).append(f"- `{signature}`")
+    for module_name, module_functions in modules.items():
+        md_content.append(f"\n## Module: `{module_name}`\n")
+        md_content.extend(module_functions)
+    return md_content
+
+
+def main(argv=None):
+    project_root = get_project_root()
+    parser = argparse.ArgumentParser(
+        description="List the public API functions that have call graphs in a markdown file"
+    )
+    parser.add_argument(
+        "--api-json",
+        type=Path,
+        default=project_root / "data" / "curve25519-dalek-public-api.json",
+    )
+    parser.add_argument(
+        "--graphs",
+        type=Path,
+        default=project_root / "outputs" / "curve25519-dalek_public_apis_graphs",
+        help="Directory of DOT files (or holding graphs.dotpack), or a graph archive",
+    )
+    parser.add_argument(
+        "--results",
+        type=Path,
+        default=None,
+        help="processing_results.json of the graphs (default: next to --graphs)",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=project_root / "docs" / "curve25519-dalek-public-api-with-graphs.md",
+    )
+    args = parser.parse_args(argv)
+
+    # Validate paths
+    if not args.api_json.exists():
+        print(f"Error: API JSON not found at {args.api_json}")
+        return 1
+    if not args.graphs.exists():
+        print(f"Error: Graphs directory not found at {args.graphs}")
+        return 1
+
+    # Read the original API JSON
+    with open(args.api_json, "r") as f:
+        entries = list(iter_api_entries(json.load(f)))
+
+    results_path = args.results
+    if results_path is None:
+        graphs_dir = args.graphs if args.graphs.is_dir() else args.graphs.parent
+        results_path = graphs_dir / "processing_results.json"
+    if results_path.exists():
+        symbols = successful_symbols(results_path)
+        graph_keys = keys_from_symbols(symbols)
+        total = len(symbols)
+        print(f"Read {total} symbols with graphs from {results_path}")
+    else:
+        # Get list of DOT files (which represent non-empty graphs), loose or archived
+        with open_graphs(args.graphs) as graphs:
+            names = [name for name in graphs.names() if name.endswith(".dot")]
+        graph_keys = keys_from_graph_names(names, entries)
+        total = len(names)
+        print(f"Found {total} graphs in {args.graphs}")
+
+    md_content = build_markdown(entries, graph_keys, total)
+    print(f"Matched {len({key for _, key, _, _ in entries if key in graph_keys})} API entries")
 
     # Write the markdown file
-    with open(output_path, "w") as f:
+    with open(args.output, "w") as f:
         f.write("\n".join(md_content))
 
-    print(f"Created {output_path}")
+    print(f"Created {args.output}")
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
@@ -3,12 +3,37 @@
 Extract grey-colored nodes and sink nodes from DOT files in curve25519-dalek_public_apis_graphs directory.
 Grey nodes represent curve25519-dalek functions and are marked with fillcolor=lightgray.
 Sink nodes are curve25519-dalek nodes that have incoming edges but no outgoing edges.
+The graphs can be loose DOT files or a packed graph archive. When the generator
+wrote a `graphs.ndjson` sidecar next to them, the node roles are read from it
+instead of parsing the DOT text; `--db` queries the call graph database instead.
 """
 
+import argparse
+import hashlib
+import io
 import json
-import re
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+from curve25519_usage.callgraph_db import DB_FILE, CallGraphDatabase
+from curve25519_usage.dot_reader import DotEdge, DotSyntaxError, read_dot
+from curve25519_usage.graph_archive import GraphArchive, open_graphs
+from curve25519_usage.graph_sidecar import (
+    ROLE_CURVE25519,
+    SIDECAR_FILE,
+    graph_sha256,
+    read_sidecar,
+    sidecar_path,
+)
+from curve25519_usage.scheduler import available_cpus
+from curve25519_usage.symbol_catalog import parse_symbol
+
+# Per-graph analysis results, kept next to the graphs; bump the format when
+# `analyze_dot_lines` changes
+ANALYSIS_CACHE_FILE = "grey_nodes_cache.json"
+ANALYSIS_FORMAT = 2
+
 
 def get_project_root():
     """Get the project root directory."""
@@ -25,52 +50,27 @@ def parse_node_id(node_id, preserve_type_info=True):
         node_id: The full node ID string
         preserve_type_info: If True, preserve type information from impl#[Type] patterns
     """
-    # Split by spaces and find the part with the file path
-    parts = node_id.split()
-
-    # Find the part that contains the path (usually after version number)
-    path_part = None
-    for i, part in enumerate(parts):
-        if "/" in part or part.endswith("()."):
-            path_part = part
-            break
-
-    if path_part:
-        # Remove trailing "()" and "."
-        path_part = path_part.rstrip("().")
-
-        # Split by '/' to get file and function
-        if "/" in path_part:
-            path_components = path_part.split("/")
-            # The file is everything except the last component
-            file_path = "/".join(path_components[:-1])
-            # The function is the last component
-            function_name = path_components[-1]
-
-            # Handle special cases like impl#[Type]method
-            if "impl#" in function_name:
-                if preserve_type_info:
-                    # Keep the full signature including type information
-                    # e.g., "impl#[EdwardsPoint][MultiscalarMul]multiscalar_mul"
-                    # becomes "impl#[EdwardsPoint][MultiscalarMul]multiscalar_mul"
-                    pass  # Keep function_name as is
-                else:
-                    # Extract just the method name
-                    # e.g., "impl#[EdwardsPoint][MultiscalarMul]multiscalar_mul" -> "multiscalar_mul"
-                    match = re.search(r"impl#.*\]([^]]+)$", function_name)
-                    if match:
-                        function_name = match.group(1)
-
-            # Add .rs extension if not present
-            if not file_path.endswith(".rs"):
-                file_path += ".rs"
-
-            return (file_path, function_name)
-        else:
-            # If no '/' in path, it might be a top-level function
-            return ("unknown.rs", path_part)
+    record = parse_symbol(node_id)
+    descriptor = record.descriptor
+    if descriptor is None or ("/" not in descriptor and not descriptor.endswith("().")):
+        return None
+
+    # The function is the last descriptor segment without its trailing "()" and "."
+    function_name = record.last_segment.rstrip("().")
+    if record.module is None:
+        # A top-level function
+        return ("unknown.rs", function_name)
 
-    return None
+    if record.impl_type is not None and not preserve_type_info:
+        # Extract just the method name
+        # e.g., "impl#[EdwardsPoint][MultiscalarMul]multiscalar_mul" -> "multiscalar_mul"
+        function_name = function_name.rpartition("]")[2] or function_name
+
+    # The file is the module path, with a .rs extension
+    file_path = record.module
+    if not file_path.endswith(".rs"):
+        file_path += ".rs"
+    return (file_path, function_name)
 
 
 def extract_nodes_from_dot(dot_file_path, preserve_type_info=True):
@@ -82,85 +82,347 @@ def extract_nodes_from_dot(dot_file_path, preserve_type_info=True):
         dot_file_path: Path to the DOT file
         preserve_type_info: Whether to preserve type information in function names
     """
-    grey_nodes = set()
-    all_nodes = {}  # node_id -> node_info
-    outgoing_edges = set()  # nodes that have outgoing edges
-    incoming_edges = set()  # nodes that have incoming edges
-
     with open(dot_file_path, "r") as f:
-        content = f.read()
+        analysis = analyze_dot_lines(f, Path(dot_file_path).name)
+    return nodes_from_analysis(analysis, Path(dot_file_path).name, preserve_type_info)
+
 
-    # First, extract all nodes and identify grey nodes
-    node_pattern = r'"([^"]+)"\s*\[([^\]]+)\]'
-    matches = re.findall(node_pattern, content, re.DOTALL)
+def extract_nodes_from_dot_text(content, name, preserve_type_info=True):
+    """
+    Extract grey nodes and the sink node from DOT text, e.g. an archive member.
+
+    `name` is the graph's file name, used in warnings.
+    """
+    return nodes_from_analysis(analyze_dot_text(content, name), name, preserve_type_info)
 
-    for node_id, attributes in matches:
-        # Check if it's a curve25519-dalek node
-        if "curve25519-dalek" in node_id:
-            all_nodes[node_id] = attributes
 
-            # Check if it's grey
-            if "fillcolor=lightgray" in attributes:
-                parsed = parse_node_id(node_id, preserve_type_info=preserve_type_info)
-                if parsed:
-                    grey_nodes.add(parsed)
+def analyze_dot_text(content, name="graph"):
+    """Parse DOT text once; see `analyze_dot_lines`."""
+    return analyze_dot_lines(io.StringIO(content), name)
 
-    # Now find all edges
-    edge_pattern = r'"([^"]+)"\s*->\s*"([^"]+)"'
-    edge_matches = re.findall(edge_pattern, content)
 
-    for source, target in edge_matches:
-        if "curve25519-dalek" in source:
-            outgoing_edges.add(source)
-        if "curve25519-dalek" in target:
-            incoming_edges.add(target)
+def analyze_dot_lines(lines, name="graph"):
+    """
+    Parse a DOT graph once, streaming, into the node IDs of its grey and sink nodes.
+
+    Returns (grey_ids, sink_ids) as lists of node ID strings; `nodes_from_analysis`
+    turns them into (file, function) pairs with or without type information. Nodes
+    of compact graphs are identified by their `symbol` attribute. A malformed graph
+    gives a warning and the result of the statements before the error.
+    """
+    grey_ids = set()
+    all_nodes = {}  # node_id -> fillcolor
+    symbols = {}  # DOT node ID -> symbol, for compact graphs
+    outgoing_edges = set()  # DOT IDs of nodes that have outgoing edges
+    incoming_edges = set()  # DOT IDs of nodes that have incoming edges
+
+    try:
+        for statement in read_dot(lines):
+            if isinstance(statement, DotEdge):
+                outgoing_edges.add(statement.source)
+                incoming_edges.add(statement.target)
+                continue
+            node_id = statement.attributes.get("symbol", statement.id)
+            symbols[statement.id] = node_id
+            # Check if it's a curve25519-dalek node
+            if "curve25519-dalek" in node_id:
+                fillcolor = statement.attributes.get("fillcolor")
+                all_nodes[node_id] = fillcolor
+                # Check if it's grey
+                if fillcolor == "lightgray":
+                    grey_ids.add(node_id)
+    except DotSyntaxError as e:
+        print(f"  Warning: could not parse all of {name}: {e}")
+
+    outgoing_edges = {symbols.get(node, node) for node in outgoing_edges}
+    incoming_edges = {symbols.get(node, node) for node in incoming_edges}
 
     # Find sink nodes (curve25519-dalek nodes with incoming edges but no outgoing edges)
-    # Also consider isolated nodes (no edges at all) as potential sink nodes
-    sink_node = None
-    sink_nodes = []
+    # Whether a node ID parses does not depend on preserve_type_info
+    sink_ids = []
 
-    # Debug: check for green nodes
+    # Sink nodes are marked with fillcolor=green
     green_count = 0
-    for node_id in all_nodes:
-        # Check if it's a green node (sink nodes are marked with fillcolor=green)
-        if "fillcolor=green" in all_nodes[node_id]:
+    for node_id, fillcolor in all_nodes.items():
+        if fillcolor == "green":
             green_count += 1
-            parsed = parse_node_id(node_id, preserve_type_info=preserve_type_info)
-            if parsed:
-                sink_nodes.append(parsed)
+            if parse_node_id(node_id):
+                sink_ids.append(node_id)
 
     # If no green nodes found but we have curve25519 nodes, take the one with no outgoing edges
     if green_count == 0 and len(all_nodes) > 0:
         for node_id in all_nodes:
             if node_id in incoming_edges and node_id not in outgoing_edges:
-                parsed = parse_node_id(node_id, preserve_type_info=preserve_type_info)
-                if parsed:
-                    sink_nodes.append(parsed)
+                if parse_node_id(node_id):
+                    sink_ids.append(node_id)
                     break
 
+    return sorted(grey_ids), sink_ids
+
+
+def nodes_from_analysis(analysis, name, preserve_type_info=True):
+    """Get (grey_nodes_set, sink_node) of one graph from its `analyze_dot_lines` result."""
+    grey_ids, sink_ids = analysis
+    grey_nodes = {parse_node_id(node_id, preserve_type_info) for node_id in grey_ids}
+    grey_nodes.discard(None)
+    sink_nodes = [parse_node_id(node_id, preserve_type_info) for node_id in sink_ids]
+
     # There should be exactly one sink node per graph
+    sink_node = None
     if len(sink_nodes) == 1:
         sink_node = sink_nodes[0]
     elif len(sink_nodes) > 1:
-        print(f"  Warning: Multiple sink nodes found in {dot_file_path.name}: {sink_nodes}")
+        print(f"  Warning: Multiple sink nodes found in {name}: {sink_nodes}")
         sink_node = sink_nodes[0]  # Take the first one
 
     return grey_nodes, sink_node
 
 
-def main():
+def graph_stamp(graphs, name):
+    """
+    Get what identifies an unchanged graph without reading it: size and mtime of
+    a loose DOT file, or size and CRC-32 of an archive member.
+    """
+    if isinstance(graphs, GraphArchive):
+        entry = graphs.members[name]
+        return [entry["size"], entry["crc32"]]
+    stat = os.stat(graphs.path / name)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+# Graph sources opened by the pool processes, one per process
+_worker_graphs = {}
+
+
+def _analyze_graph(task):
+    """Pool task: analyze one graph, or return None if it still has the cached hash."""
+    graphs_path, name, cached_sha256 = task
+    graphs = _worker_graphs.get(graphs_path)
+    if graphs is None:
+        graphs = _worker_graphs[graphs_path] = open_graphs(graphs_path)
+    with graphs.open(name) as f:
+        digest = hashlib.sha256()
+        for line in f:
+            digest.update(line.encode())
+        sha256 = digest.hexdigest()
+        if sha256 == cached_sha256:
+            return name, sha256, None
+        f.seek(0)
+        return name, sha256, analyze_dot_lines(f, name)
+
+
+def analysis_cache_path(graphs_path):
+    """Get the analysis cache file of a graph directory or archive."""
+    graphs_path = Path(graphs_path)
+    directory = graphs_path if graphs_path.is_dir() else graphs_path.parent
+    return directory / ANALYSIS_CACHE_FILE
+
+
+def load_analysis_cache(path):
+    """Load the analysis cache, or an empty one if it is missing or outdated."""
+    try:
+        with open(path, "r") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if cache.get("format") != ANALYSIS_FORMAT:
+        return {}
+    return cache.get("graphs", {})
+
+
+def save_analysis_cache(path, entries):
+    """Write the analysis cache atomically, ignoring a read-only graph directory."""
+    tmp_path = Path(path).with_name(Path(path).name + ".tmp")
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump({"format": ANALYSIS_FORMAT, "graphs": entries}, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Warning: could not write analysis cache {path}: {e}")
+
+
+def analyze_graphs(graphs_path, workers=1, use_cache=True):
+    """
+    Analyze every graph at `graphs_path` once, across `workers` processes.
+
+    Graphs whose size and mtime (or archive CRC) match the cache are not read at
+    all; graphs that are read but hash as cached are not parsed again. Returns
+    {graph name: (grey_ids, sink_ids)} and the number of graphs parsed.
+    """
+    cache_path = analysis_cache_path(graphs_path)
+    cached = load_analysis_cache(cache_path) if use_cache else {}
+    entries = {}
+    tasks = []
+    with open_graphs(graphs_path) as graphs:
+        for name in graphs.names():
+            stamp = graph_stamp(graphs, name)
+            entry = cached.get(name)
+            if entry is not None and entry["stamp"] == stamp:
+                entries[name] = entry
+            else:
+                entries[name] = {"stamp": stamp}
+                tasks.append((str(graphs_path), name, entry["sha256"] if entry else None))
+
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+            chunksize = max(1, len(tasks) // (4 * workers))
+            results = list(executor.map(_analyze_graph, tasks, chunksize=chunksize))
+    else:
+        results = [_analyze_graph(task) for task in tasks]
+        for graphs in _worker_graphs.values():
+            graphs.close()
+        _worker_graphs.clear()
+
+    parsed = 0
+    for name, sha256, analysis in results:
+        entry = entries[name]
+        entry["sha256"] = sha256
+        if analysis is None:
+            analysis = (cached[name]["grey"], cached[name]["sinks"])
+        else:
+            parsed += 1
+        entry["grey"], entry["sinks"] = analysis
+
+    if use_cache and (tasks or set(cached) != set(entries)):
+        save_analysis_cache(cache_path, entries)
+    return {name: (entry["grey"], entry["sinks"]) for name, entry in entries.items()}, parsed
+
+
+def analysis_from_sidecar_record(record):
+    """
+    Get the `analyze_dot_lines` result of one graph from its sidecar record: its
+    curve25519-dalek nodes other than the sink are the grey nodes.
+    """
+    grey_ids = sorted(node["id"] for node in record["nodes"] if node["role"] == ROLE_CURVE25519)
+    sink = record["sink"]
+    sink_ids = [sink] if "curve25519-dalek" in sink and parse_node_id(sink) else []
+    return grey_ids, sink_ids
+
+
+def analyze_sidecar(graphs_path):
+    """
+    Get {graph name: (grey_ids, sink_ids)} from the sidecar next to the graphs, or
+    None if there is no usable sidecar for exactly the graphs at `graphs_path`.
+
+    The DOT text of every graph is hashed (not parsed) to check that the sidecar
+    still describes it.
+    """
+    path = sidecar_path(graphs_path)
+    if not path.is_file():
+        return None
+    try:
+        records = {record["graph"]: record for record in read_sidecar(path)}
+        analyses = {name: analysis_from_sidecar_record(r) for name, r in records.items()}
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Warning: ignoring graph sidecar {path}: {e}")
+        return None
+    with open_graphs(graphs_path) as graphs:
+        if set(graphs.names()) != set(records) or any(
+            graph_sha256(graphs, name) != record.get("sha256") for name, record in records.items()
+        ):
+            print(f"Warning: ignoring graph sidecar {path}: it does not match the graphs")
+            return None
+    return analyses
+
+
+def extract_nodes_from_database(grey_symbols, sink_symbol, preserve_type_info=True):
+    """
+    Get the grey nodes and the sink node of one graph from the symbols the call
+    graph database holds for it, in the shape of `extract_nodes_from_dot_text`.
+    """
+    grey_nodes = {parse_node_id(symbol, preserve_type_info) for symbol in grey_symbols}
+    grey_nodes.discard(None)
+    sink_node = None
+    if sink_symbol and "curve25519-dalek" in sink_symbol:
+        sink_node = parse_node_id(sink_symbol, preserve_type_info=preserve_type_info)
+    return grey_nodes, sink_node
+
+
+def main(argv=None):
     """
     Main function to process all DOT files and extract grey nodes and sink nodes.
     """
-    # Directory containing the DOT files
     project_root = get_project_root()
-    graphs_dir = project_root / "outputs" / "curve25519-dalek_public_apis_graphs_20"
-    output_file = project_root / "data" / "grey_nodes_extracted_depth20.json"
-
-    if not graphs_dir.exists():
-        print(f"Error: Directory {graphs_dir} does not exist")
-        return
+    parser = argparse.ArgumentParser(
+        description="Extract grey nodes and sink nodes from the generated call graphs"
+    )
+    parser.add_argument(
+        "--graphs",
+        type=Path,
+        default=project_root / "outputs" / "curve25519-dalek_public_apis_graphs_20",
+        help="Directory of DOT files (or holding graphs.dotpack), or a graph archive",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=project_root / "data" / "grey_nodes_extracted_depth20.json",
+    )
+    parser.add_argument(
+        "--db",
+        nargs="?",
+        const=True,
+        default=None,
+        metavar="PATH",
+        help=(
+            f"Query the call graph database (default: {DB_FILE} in --graphs) "
+            "instead of parsing the DOT text"
+        ),
+    )
+    parser.add_argument(
+        "--no-sidecar",
+        dest="use_sidecar",
+        action="store_false",
+        help=f"Parse the DOT text even if {SIDECAR_FILE} is next to the graphs",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=available_cpus(),
+        help="Number of processes parsing DOT files (default: available CPUs)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        dest="use_cache",
+        action="store_false",
+        help=f"Parse every graph instead of reusing {ANALYSIS_CACHE_FILE} next to the graphs",
+    )
+    args = parser.parse_args(argv)
+    graphs_dir = args.graphs
+    output_file = args.output
+
+    # Per graph: the (grey nodes, sink node) with and without type information
+    if args.db:
+        db_path = graphs_dir / DB_FILE if args.db is True else Path(args.db)
+        if not db_path.exists():
+            print(f"Error: Database {db_path} does not exist")
+            return
+        with CallGraphDatabase(db_path) as database:
+            grey_symbols = database.grey_nodes()
+            sink_symbols = database.sink_symbols()
+        extracted = {
+            name: [
+                extract_nodes_from_database(grey_symbols[name], sink_symbols[name], preserve)
+                for preserve in (True, False)
+            ]
+            for name in grey_symbols
+        }
+    else:
+        if not graphs_dir.exists():
+            print(f"Error: Directory {graphs_dir} does not exist")
+            return
+        analyses = analyze_sidecar(graphs_dir) if args.use_sidecar else None
+        if analyses is not None:
+            print(f"Read {len(analyses)} graphs from {sidecar_path(graphs_dir)}")
+        else:
+            analyses, parsed = analyze_graphs(graphs_dir, args.workers, args.use_cache)
+            print(
+                f"Parsed {parsed} DOT files, {len(analyses) - parsed} unchanged since the last run"
+            )
+        extracted = {
+            name: [nodes_from_analysis(analysis, name, preserve) for preserve in (True, False)]
+            for name, analysis in analyses.items()
+        }
+    dot_files = sorted(extracted)
 
     # Sets to store all unique (file, function) pairs
     # With type information preserved
@@ -173,20 +435,14 @@ def main():
     all_sink_nodes_no_type = set()
 
     # Process all DOT files
-    dot_files = list(graphs_dir.glob("*.dot"))
     print(f"Found {len(dot_files)} DOT files to process")
 
     missing_sink_files = []
 
     for dot_file in dot_files:
-        # Extract with type info preserved
-        grey_nodes, sink_node = extract_nodes_from_dot(dot_file, preserve_type_info=True)
+        # Extract with type info preserved, and without type info for comparison
+        (grey_nodes, sink_node), (grey_nodes_no_type, sink_node_no_type) = extracted[dot_file]
         all_grey_nodes.update(grey_nodes)
-
-        # Extract without type info for comparison
-        grey_nodes_no_type, sink_node_no_type = extract_nodes_from_dot(
-            dot_file, preserve_type_info=False
-        )
         all_grey_nodes_no_type.update(grey_nodes_no_type)
 
         if sink_node:
@@ -194,17 +450,16 @@ def main():
             # Track which files have this sink node
             if sink_node not in sink_node_to_files:
                 sink_node_to_files[sink_node] = []
-            sink_node_to_files[sink_node].append(dot_file.name)
+            sink_node_to_files[sink_node].append(dot_file)
         else:
-            missing_sink_files.append(dot_file.name)
+            missing_sink_files.append(dot_file)
 
         if sink_node_no_type:
             all_sink_nodes_no_type.add(sink_node_no_type)
 
         if grey_nodes or sink_node:
-            print(
-                f"  {dot_file.name}: found {len(grey_nodes)} grey nodes, sink: {sink_node[1] if sink_node else 'None'}"
-            )
+            sink_name = sink_node[1] if sink_node else "None"
+            print(f"  {dot_file}: found {len(grey_nodes)} grey nodes, sink: {sink_name}")
 
     # Convert sets to sorted lists for JSON serialization
     # WITH type information
@@ -220,10 +475,10 @@ def main():
     # Create a list of all sink nodes (one per DOT file)
     all_sink_nodes_per_file = []
     for dot_file in sorted(dot_files):
-        grey_nodes, sink_node = extract_nodes_from_dot(dot_file, preserve_type_info=True)
+        grey_nodes, sink_node = extracted[dot_file][0]
         if sink_node:
             all_sink_nodes_per_file.append(
-                {"dot_file": dot_file.name, "file": sink_node[0], "function": sink_node[1]}
+                {"dot_file": dot_file, "file": sink_node[0], "function": sink_node[1]}
             )
 
     # Calculate overlap (with type info)
@@ -13,12 +13,16 @@ complete API reference including all feature variants, consider using cargo doc
 or the docs.rs documentation as the source.
 """
 
+import argparse
 import json
 import re
 from pathlib import Path
 from collections import defaultdict
 from datetime import date
 
+from curve25519_usage.scip_scan import ScipVisitor, scan_index
+from curve25519_usage.symbol_catalog import parse_symbol
+
 
 def get_project_root():
     """Get the project root directory."""
@@ -40,85 +44,51 @@ def parse_symbol_path(symbol_str):
         'symbol_type': 'method'
     }
     """
-    # Basic pattern: rust-analyzer cargo LIBRARY VERSION MODULE/PATH
-    parts = symbol_str.split()
-    if len(parts) < 5 or parts[0] != "rust-analyzer":
-        return None
-
-    library = parts[2]
-    if library != "curve25519-dalek":
+    record = parse_symbol(symbol_str)
+    if record.scheme != "rust-analyzer" or record.crate != "curve25519-dalek":
         return None
 
-    version = parts[3]
-
-    # Extract the path after version
-    rest = " ".join(parts[4:])
-
-    # Parse module and symbol info
-    # Examples:
-    # - scalar/impl#[Scalar]from_bytes_mod_order().
-    # - edwards/EdwardsPoint#compress().
-    # - constants/ED25519_BASEPOINT_COMPRESSED.
-
     result = {
-        "library": library,
-        "version": version,
-        "module": None,
+        "library": record.crate,
+        "version": record.version,
+        "module": record.module,
         "type": None,
         "name": None,
         "symbol_type": None,
     }
 
-    # Extract module path
-    if "/" in rest:
-        module_parts = rest.split("/")
-        result["module"] = "/".join(module_parts[:-1])
-        symbol_part = module_parts[-1]
-    else:
-        symbol_part = rest
-
-    # Parse the symbol part
     # Method/function patterns: Type#method(), impl#[Type]method()
     # Constant pattern: CONSTANT_NAME.
     # Type pattern: Type#
-
-    if "impl#[" in symbol_part:
-        # impl#[Type]method().
-        match = re.match(r"impl#\[([^\]]+)\]([^(\.]+)", symbol_part)
-        if match:
-            type_str = match.group(1)
-            # Clean up type name - remove backticks and path qualifiers
-            type_str = type_str.strip("`").split("::")[-1]
-            result["type"] = type_str
-            result["name"] = match.group(2)
+    # Type names drop path qualifiers, e.g. backend::serial::u64::scalar::Scalar52
+    if record.impl_type is not None:
+        # impl#[Type]method() - trait items keep the trait in the name: [Trait]method
+        segment = record.last_segment
+        name = segment[segment.index("]") + 1 :].split("(")[0].split(".")[0]
+        if name:
+            result["type"] = record.impl_type.split("::")[-1]
+            result["name"] = name
             result["symbol_type"] = "method"
-    elif "#" in symbol_part and "(" in symbol_part:
+    elif record.kind == "method" and record.owner_type is not None:
         # Type#method()
-        match = re.match(r"([^#]+)#([^(]+)", symbol_part)
-        if match:
-            type_str = match.group(1).strip("`").split("::")[-1]
-            result["type"] = type_str
-            result["name"] = match.group(2)
-            result["symbol_type"] = "method"
-    elif "#" in symbol_part and "(" not in symbol_part and symbol_part.count("#") == 1:
-        # Type definition or constant on type
-        type_part, name_part = symbol_part.split("#", 1)
-        type_str = type_part.strip("`").split("::")[-1]
-        result["type"] = type_str
-        if name_part and not name_part.startswith("["):
-            result["name"] = name_part.rstrip(".")
-            result["symbol_type"] = "const"
-        else:
-            result["symbol_type"] = "type"
-    elif "(" in symbol_part:
+        result["type"] = record.owner_type.split("::")[-1]
+        result["name"] = record.name
+        result["symbol_type"] = "method"
+    elif record.kind == "const" and record.owner_type is not None:
+        # Constant on a type
+        result["type"] = record.owner_type.split("::")[-1]
+        result["name"] = record.name
+        result["symbol_type"] = "const"
+    elif record.kind == "type" and record.owner_type is None:
+        result["type"] = record.name.split("::")[-1]
+        result["symbol_type"] = "type"
+    elif record.kind == "function":
         # Standalone function
-        match = re.match(r"([^(]+)", symbol_part)
-        if match:
-            result["name"] = match.group(1)
-            result["symbol_type"] = "function"
-    elif symbol_part.endswith(".") and symbol_part.replace("_", "").replace(".", "").isupper():
+        result["name"] = record.name
+        result["symbol_type"] = "function"
+    elif record.kind == "constant" and record.name.replace("_", "").isupper():
         # Constant (all uppercase with underscores)
-        result["name"] = symbol_part.rstrip(".")
+        result["name"] = record.name
         result["symbol_type"] = "constant"
 
     return result
@@ -246,35 +216,27 @@ def is_trait_implementation(name):
     return name.startswith("[") and name.endswith("]")
 
 
-def extract_public_apis(scip_json_path):
-    """Extract all public APIs from the SCIP index."""
-    with open(scip_json_path, "r") as f:
-        data = json.load(f)
+class PublicApiVisitor(ScipVisitor):
+    """Collect public API items of curve25519-dalek source documents, by module and type."""
 
-    # Organize APIs by module and type
-    api_structure = defaultdict(
-        lambda: {
-            "types": defaultdict(lambda: {"methods": [], "constants": []}),
-            "functions": [],
-            "constants": [],
-        }
-    )
-
-    version = None
-
-    # Process all documents
-    for doc in data.get("documents", []):
-        relative_path = doc.get("relative_path", "")
+    path_prefixes = "curve25519-dalek/src/"
 
-        # Only process curve25519-dalek source files
-        if not relative_path.startswith("curve25519-dalek/src/"):
-            continue
+    def __init__(self):
+        # Organize APIs by module and type
+        self.api_structure = defaultdict(
+            lambda: {
+                "types": defaultdict(lambda: {"methods": [], "constants": []}),
+                "functions": [],
+                "constants": [],
+            }
+        )
+        self.version = None
 
+    def visit_document(self, index, doc):
         # Process symbols in this document
-        for symbol_info in doc.get("symbols", []):
-            symbol_str = symbol_info.get("symbol", "")
-            sig_doc = symbol_info.get("signature_documentation", {})
-            signature = sig_doc.get("text", "")
+        for symbol_info in doc.symbol_information:
+            symbol_str = index.symbol(symbol_info.symbol_id)
+            signature = symbol_info.signature
 
             # Only include public APIs
             if not is_public_api(signature):
@@ -285,8 +247,8 @@ def extract_public_apis(scip_json_path):
             if not parsed or not parsed["name"]:
                 continue
 
-            if not version:
-                version = parsed["version"]
+            if not self.version:
+                self.version = parsed["version"]
 
             module = parsed["module"] or "root"
 
@@ -320,16 +282,16 @@ def extract_public_apis(scip_json_path):
             # Add to appropriate location in structure
             if is_constant and type_name:
                 # Constant on a type
-                api_structure[module]["types"][type_name]["constants"].append(api_entry)
+                self.api_structure[module]["types"][type_name]["constants"].append(api_entry)
             elif symbol_type == "method" and type_name:
                 # Method on a type
-                api_structure[module]["types"][type_name]["methods"].append(api_entry)
+                self.api_structure[module]["types"][type_name]["methods"].append(api_entry)
             elif symbol_type == "const" and type_name:
                 # Constant on a type
-                api_structure[module]["types"][type_name]["constants"].append(api_entry)
+                self.api_structure[module]["types"][type_name]["constants"].append(api_entry)
             elif symbol_type == "function":
                 # Standalone function
-                api_structure[module]["functions"].append(api_entry)
+                self.api_structure[module]["functions"].append(api_entry)
             elif symbol_type == "constant":
                 # Module-level constant
                 constant_entry = {"name": name, "signature": signature.strip()}
@@ -341,12 +303,22 @@ def extract_public_apis(scip_json_path):
                         constant_entry["type"] = "&" + constant_entry["type"]
 
                 # Check for feature gates
-                if "feature" in signature or "#[cfg" in str(symbol_info.get("documentation", [])):
+                if "feature" in signature or "#[cfg" in str(symbol_info.documentation):
                     constant_entry["feature_gated"] = "precomputed-tables"
 
-                api_structure[module]["constants"].append(constant_entry)
+                self.api_structure[module]["constants"].append(constant_entry)
 
-    return api_structure, version
+
+def extract_public_apis(scip_json_path, use_cache=True):
+    """
+    Extract all public APIs from the SCIP index.
+
+    Only curve25519-dalek source documents are decoded, from the snapshot or, with
+    `use_cache=False`, while streaming the JSON.
+    """
+    visitor = PublicApiVisitor()
+    scan_index(scip_json_path, [visitor], use_cache)
+    return visitor.api_structure, visitor.version
 
 
 def build_output_json(api_structure, version):
@@ -393,8 +365,16 @@ def build_output_json(api_structure, version):
     return output
 
 
-def main():
+def main(argv=None):
     """Main function."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Stream the SCIP JSON instead of reading or rebuilding its snapshot",
+    )
+    args = parser.parse_args(argv)
+
     project_root = get_project_root()
     scip_json_path = project_root / "data" / "index_scip_curve25519-4.1.3.json"
     output_path = project_root / "data" / "curve25519-dalek-public-api-generated.json"
@@ -404,7 +384,7 @@ def main():
         return 1
 
     print(f"Reading SCIP index from {scip_json_path}")
-    api_structure, version = extract_public_apis(scip_json_path)
+    api_structure, version = extract_public_apis(scip_json_path, use_cache=not args.no_cache)
 
     print(f"Extracted public APIs for curve25519-dalek {version}")
     print(f"Modules found: {len(api_structure)}")
@@ -3,13 +3,46 @@
 Generate call graphs for curve25519-dalek functions - parallel version
 """
 
+import argparse
+import itertools
 import json
+import shlex
 import subprocess
 import os
 import sys
 from pathlib import Path
-from multiprocessing import Pool, cpu_count
 import time
+from collections import Counter
+
+from curve25519_usage.callgraph import (
+    BODY_STORE_FILE,
+    LIBSIGNAL_PATH_PREFIXES,
+    SourceReader,
+    build_call_graph,
+    compact_graph_symbols,
+    cut_subgraphs,
+    is_function_symbol,
+    libsignal_distances,
+    write_body_store,
+    write_function_graph,
+)
+from curve25519_usage.callgraph_db import DB_FILE, write_database
+from curve25519_usage.graph_archive import ARCHIVE_FILE, GraphArchive, open_graphs, write_archive
+from curve25519_usage.graph_sidecar import SIDECAR_FILE, write_sidecar
+from curve25519_usage.graph_manifest import GraphManifest, InputHasher, reusable_result
+from curve25519_usage.run_journal import JOURNAL_FILE, RunJournal, journal_result, read_journal
+from curve25519_usage.graph_worker import WorkerPool, stand_in_worker_command
+from curve25519_usage.resource_usage import ProcessUsage, dot_stats, format_report, run_measured
+from curve25519_usage.scheduler import (
+    DEFAULT_TIMEOUT,
+    Scheduler,
+    Task,
+    available_cpus,
+    estimate_durations,
+    history_timeout,
+)
+from curve25519_usage.scip_index import OCCURRENCE_FIELDS, load_index
+from curve25519_usage.scip_scan import ScipVisitor, scan_index
 
 
 def get_project_root():
@@ -28,36 +61,61 @@ def get_default_paths():
     }
 
 
+class FunctionSymbolVisitor(ScipVisitor):
+    """Collect curve25519-dalek function symbols occurring anywhere in the index."""
+
+    def __init__(self):
+        self.symbols = set()
+        self._seen_ids = set()
+
+    def visit_document(self, index, doc):
+        symbol_ids = set(doc.definitions[::OCCURRENCE_FIELDS])
+        symbol_ids.update(doc.references[::OCCURRENCE_FIELDS])
+        symbol_ids.update(info.symbol_id for info in doc.symbol_information)
+        for symbol_id in symbol_ids - self._seen_ids:
+            symbol = index.symbol(symbol_id)
+            # Filter for function symbols (those with () at the end)
+            if "curve25519-dalek" in symbol and is_function_symbol(symbol):
+                self.symbols.add(symbol)
+        self._seen_ids |= symbol_ids
+
+    def sorted_symbols(self):
+        return sorted(self.symbols)
+
+
 def search_all_curve25519_symbols(scip_json_path):
-    """Get all unique curve25519-dalek symbols"""
-    cmd = ["grep", "-o", '"symbol":"[^"]*curve25519-dalek[^"]*"', scip_json_path]
+    """Get all unique curve25519-dalek function symbols"""
     print("Searching for all curve25519-dalek symbols...")
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode == 0 and result.stdout.strip():
-            symbols = set()
-            for line in result.stdout.strip().split("\n"):
-                if '"symbol":"' in line:
-                    symbol = line.split('"symbol":"')[1].rstrip('"')
-                    # Filter for function symbols (those with () at the end)
-                    if symbol.endswith("()."):
-                        symbols.add(symbol)
-            return sorted(list(symbols))
-        return []
+        visitor = FunctionSymbolVisitor()
+        scan_index(scip_json_path, [visitor])
+        return visitor.sorted_symbols()
     except Exception as e:
         print(f"Error searching: {e}")
         return []
 
 
-def generate_single_graph(args):
-    """Generate graph for a single function symbol (for use with multiprocessing)"""
-    scip_json_path, output_path, symbol, rust_analyzer_dir, depth = args
-
-    # Create a safe filename
+def safe_symbol_name(symbol):
+    """Get the filesystem-safe name of a symbol that its graph files are named after."""
     safe_name = symbol.replace("rust-analyzer cargo curve25519-dalek 4.1.3 ", "")
     safe_name = safe_name.replace("::", "_").replace("#", "_").replace("[", "_").replace("]", "_")
-    safe_name = safe_name.replace("()", "").replace(".", "").replace(" ", "_").replace("/", "_")
-    output_file = output_path / f"{safe_name}_depth{depth}.dot"
+    return safe_name.replace("()", "").replace(".", "").replace(" ", "_").replace("/", "_")
+
+
+def graph_output_file(output_path, symbol, depth):
+    """Get the DOT output path for a symbol, using a filesystem-safe name."""
+    return output_path / f"{safe_symbol_name(symbol)}_depth{depth}.dot"
+
+
+def generate_single_graph(args, timeout=DEFAULT_TIMEOUT, usage=None):
+    """
+    Generate graph for a single function symbol in a cargo subprocess.
+
+    If `usage` is a dict, the CPU time and peak RSS of the subprocess are stored in it.
+    """
+    scip_json_path, output_path, symbol, rust_analyzer_dir, depth = args
+
+    output_file = graph_output_file(output_path, symbol, depth)
 
     cmd = [
         "cargo",
@@ -75,15 +133,13 @@ def generate_single_graph(args):
     ]
 
     try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            cwd=str(rust_analyzer_dir),
-            timeout=120,  # 120 second timeout per graph (increased for depth 20)
+        returncode, _, stderr, measured = run_measured(
+            cmd, cwd=str(rust_analyzer_dir), timeout=timeout
         )
+        if usage is not None:
+            usage.update(measured)
 
-        if result.returncode == 0:
+        if returncode == 0:
             # Check if the generated file is non-empty
             if output_file.exists() and output_file.stat().st_size > 0:
                 # Check if the dot file has actual content (not just empty graph)
@@ -101,29 +157,315 @@ def generate_single_graph(args):
                 return (symbol, False, "no file generated", None)
         else:
             # Capture stderr for error diagnosis
-            error_msg = result.stderr.strip() if result.stderr else "no error message"
+            error_msg = stderr.strip() if stderr else "no error message"
             # Truncate to last 200 chars to keep it manageable
             if len(error_msg) > 200:
                 error_msg = "..." + error_msg[-200:]
-            return (symbol, False, f"error: {result.returncode}", error_msg)
+            return (symbol, False, f"error: {returncode}", error_msg)
     except subprocess.TimeoutExpired:
-        return (symbol, False, "timeout", "Process exceeded 120 second timeout")
+        return (symbol, False, "timeout", f"Process exceeded {timeout} second timeout")
     except Exception as e:
         return (symbol, False, f"exception: {str(e)}", str(e))
 
 
-def main():
-    # Get paths
+def index_function_symbols(index):
+    """
+    Get the curve25519-dalek function symbols of a loaded index, sorted: the same
+    symbols as `search_all_curve25519_symbols`, for every engine.
+    """
+    visitor = FunctionSymbolVisitor()
+    for doc in index.iter_documents():
+        visitor.visit_document(index, doc)
+    return visitor.sorted_symbols()
+
+
+def generate_graphs_in_process(
+    graph, symbols, output_path, depth, source_root=None, compact=False, subgraphs=None
+):
+    """
+    Generate graphs for `symbols` in this process from an already built call graph.
+
+    Yields (result, seconds, usage) with results in the same shape as
+    `generate_single_graph` and the CPU time and peak RSS of this process in usage.
+    The subgraph cut for each symbol is stored in `subgraphs` if it is a dict.
+    """
+    sources = SourceReader(source_root or graph.source_root)
+    usage = ProcessUsage()
+    for symbol in symbols:
+        output_file = graph_output_file(output_path, symbol, depth)
+        start = time.perf_counter()
+        usage.start()
+        result = write_function_graph(
+            graph, symbol, output_file, depth, sources, compact=compact, subgraphs=subgraphs
+        )
+        yield result, time.perf_counter() - start, usage.stop()
+
+
+def split_reachable(graph, symbols, depth):
+    """
+    Split symbols into those a libsignal function may reach within `depth` calls
+    and those whose graph is certainly empty.
+
+    One traversal from all libsignal functions replaces a generator run per
+    unreachable symbol.
+    """
+    distances = libsignal_distances(graph, depth)
+    reachable = []
+    unreachable = []
+    for symbol in symbols:
+        node = graph.id(symbol)
+        if node is not None and node in distances:
+            reachable.append(symbol)
+        else:
+            unreachable.append(symbol)
+    return reachable, unreachable
+
+
+def scheduled_tasks(symbols, payloads, manifest, closure_sizes, default_timeout):
+    """
+    Build scheduler tasks, estimating durations and timeouts from previous runs.
+
+    Symbols without a recorded duration are estimated from their caller closure
+    size and keep `default_timeout`.
+    """
+    history = {symbol: manifest.previous_seconds(symbol) for symbol in symbols}
+    estimates = estimate_durations(symbols, history, closure_sizes)
+    return [
+        Task(
+            symbol,
+            payload,
+            estimates[symbol],
+            history_timeout(history[symbol], default_timeout),
+        )
+        for symbol, payload in zip(symbols, payloads)
+    ]
+
+
+def summarize_results(symbols, results):
+    """
+    Summarize result tuples in the format of `processing_results.json`.
+
+    Failed symbols are (short_name, info) or (short_name, info, error_msg) entries.
+    """
+    generated_graphs = 0
+    failed_symbols = []
+    for result in results:
+        symbol, success, info = result[0], result[1], result[2]
+        error_msg = result[3] if len(result) > 3 else None
+        short_name = symbol.replace("rust-analyzer cargo curve25519-dalek 4.1.3 ", "")
+        if success:
+            generated_graphs += 1
+        elif error_msg:
+            # Store with error message if available
+            failed_symbols.append((short_name, info, error_msg))
+        else:
+            failed_symbols.append((short_name, info))
+    return {
+        "total_symbols": len(symbols),
+        "generated_graphs": generated_graphs,
+        "failed_symbols": failed_symbols,
+        "failure_breakdown": dict(Counter(item[1] for item in failed_symbols)),
+        "all_symbols": symbols,
+    }
+
+
+def symbol_resource_record(entry):
+    """Get the `processing_results.json` resource record of a journal entry."""
+    record = {"success": entry["success"], "info": entry["info"]}
+    if entry.get("seconds") is not None:
+        record["wall_seconds"] = entry["seconds"]
+    record.update(entry.get("resources") or {})
+    return record
+
+
+def store_graphs(output_dir, graphs, archive_mode, previous_archive=None):
+    """
+    Bring the graphs of a run into the requested output layout.
+
+    `graphs` maps symbols to the DOT paths of their graphs. A graph reused from a
+    previous archive run has no loose file and is read from `previous_archive`.
+    In archive mode all graphs are packed into `graphs.dotpack` (members named
+    like the loose files) and the loose files removed; otherwise archived graphs
+    are unpacked and the archive removed.
+    """
+    archive_path = output_dir / ARCHIVE_FILE
+    members = []
+    for symbol, dot_path in graphs.items():
+        dot_path = Path(dot_path)
+        if dot_path.exists():
+            text = dot_path.read_text() if archive_mode else None
+        else:
+            text = previous_archive.read_text(dot_path.name)
+            if not archive_mode:
+                dot_path.write_text(text)
+        members.append((dot_path, symbol, text))
+    if previous_archive is not None:
+        previous_archive.close()
+
+    if archive_mode:
+        write_archive(archive_path, ((path.name, symbol, text) for path, symbol, text in members))
+        for dot_path, _, _ in members:
+            if dot_path.exists():
+                dot_path.unlink()
+    elif archive_path.exists():
+        archive_path.unlink()
+
+
+def generation_settings(args):
+    """Get the settings that, besides the index and depth, determine every graph."""
+    settings = {
+        "engine": args.engine,
+        "filter_non_libsignal": True,
+        "libsignal_prefixes": sorted(args.libsignal_prefixes or LIBSIGNAL_PATH_PREFIXES),
+    }
+    if args.compact:
+        # Only set when used, so manifests of regular runs stay valid
+        settings["compact"] = True
+    if args.engine == "python":
+        settings["source_root"] = str(args.source_root) if args.source_root else None
+    elif args.engine == "worker":
+        settings["worker_command"] = args.worker_command
+    else:
+        settings["rust_analyzer_dir"] = str(args.rust_analyzer_dir)
+    return settings
+
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
     paths = get_default_paths()
-    scip_json_path = paths["scip_json"]
-    output_dir = paths["output_dir"]
-    rust_analyzer_dir = paths["rust_analyzer_dir"]
+    parser = argparse.ArgumentParser(
+        description="Generate call graphs for all curve25519-dalek function symbols"
+    )
+    parser.add_argument(
+        "--engine",
+        choices=["python", "worker", "cargo"],
+        default="python",
+        help=(
+            "python: in-process call graph (default); worker: pool of persistent batch "
+            "workers; cargo: one Rust subprocess per symbol"
+        ),
+    )
+    parser.add_argument("--scip-json", type=Path, default=paths["scip_json"])
+    parser.add_argument("--output-dir", type=Path, default=paths["output_dir"])
+    parser.add_argument("--rust-analyzer-dir", type=Path, default=paths["rust_analyzer_dir"])
+    # Using depth 20 for comprehensive call chains (increased from 15 to capture all dependencies)
+    parser.add_argument("--depth", type=int, default=20)
+    parser.add_argument(
+        "--source-root",
+        type=Path,
+        default=None,
+        help="Source tree for node tooltips (python engine; default: the SCIP project root)",
+    )
+    parser.add_argument(
+        "--libsignal-prefix",
+        action="append",
+        dest="libsignal_prefixes",
+        help="Document path prefix of libsignal sources (python engine; default: rust/)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=available_cpus(),
+        help="Number of parallel workers (worker and cargo engines; default: available CPUs)",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=int,
+        default=DEFAULT_TIMEOUT,
+        help=(
+            "Seconds per graph for symbols without a duration from a previous run "
+            "(worker and cargo engines); others get a multiple of their last duration"
+        ),
+    )
+    parser.add_argument(
+        "--worker-command",
+        default=None,
+        help=(
+            "Command starting one batch worker (worker engine); {scip_json} is replaced by the "
+            "index path. Defaults to the Python stand-in worker"
+        ),
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Regenerate every graph instead of reusing unchanged ones from the manifest",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted run, skipping symbols already in the results journal",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help=(
+            "Write compact DOT: numeric node IDs with the symbol as an attribute, and function "
+            f"bodies in a shared {BODY_STORE_FILE} instead of tooltips (python and worker engines)"
+        ),
+    )
+    parser.add_argument(
+        "--archive",
+        action="store_true",
+        help=(
+            f"Pack all graphs into {ARCHIVE_FILE} in the output directory "
+            "instead of loose DOT files"
+        ),
+    )
+    parser.add_argument(
+        "--no-reachability-filter",
+        dest="reachability_filter",
+        action="store_false",
+        help=(
+            "Run the generator for every symbol instead of recording symbols that no "
+            "libsignal function reaches within the depth as empty graphs (python engine "
+            "and stand-in worker; other generators always run every symbol)"
+        ),
+    )
+    parser.add_argument(
+        "--report",
+        type=int,
+        nargs="?",
+        const=10,
+        default=None,
+        metavar="N",
+        help="Print the resource distribution and the N most expensive symbols (default N: 10)",
+    )
+    return parser.parse_args(argv)
+
+
+def worker_command(args):
+    """Get the batch worker command line for the worker engine."""
+    if args.worker_command is None:
+        return stand_in_worker_command(
+            args.scip_json, args.source_root, args.libsignal_prefixes, args.compact
+        )
+    return shlex.split(args.worker_command.format(scip_json=args.scip_json))
+
+
+def uses_python_call_graph(args):
+    """
+    Whether the graphs are cut from the in-process call graph: by the python engine
+    or by the stand-in worker. The cargo generator and a `--worker-command` decide
+    reachability and graph contents themselves.
+    """
+    return args.engine == "python" or (args.engine == "worker" and args.worker_command is None)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    scip_json_path = args.scip_json
+    output_dir = args.output_dir
+    rust_analyzer_dir = args.rust_analyzer_dir
+    depth = args.depth
 
     # Validate paths
     if not scip_json_path.exists():
         print(f"Error: SCIP JSON not found at {scip_json_path}")
         sys.exit(1)
-    if not Path(rust_analyzer_dir).exists():
+    if args.compact and args.engine == "cargo":
+        print("Error: --compact needs the python or worker engine")
+        sys.exit(1)
+    if args.engine == "cargo" and not Path(rust_analyzer_dir).exists():
         print(f"Error: Rust analyzer directory not found at {rust_analyzer_dir}")
         print("Tip: Set RUST_ANALYZER_DIR environment variable to the correct path")
         sys.exit(1)
@@ -131,63 +473,196 @@ def main():
     # Create output directory
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    # Get all function symbols
-    all_symbols = search_all_curve25519_symbols(scip_json_path)
+    start_time = time.time()
+
+    # The call graph drives the python engine and the per-symbol input hashes
+    print("Building call graph from SCIP index...")
+    index = load_index(scip_json_path)
+    graph = build_call_graph(index, args.libsignal_prefixes or LIBSIGNAL_PATH_PREFIXES)
+    all_symbols = index_function_symbols(index)
     print(f"Found {len(all_symbols)} function symbols")
 
-    # Prepare arguments for parallel processing
-    # Using depth 20 for comprehensive call chains (increased from 15 to capture all dependencies)
-    args_list = [
-        (scip_json_path, output_dir, symbol, rust_analyzer_dir, 20) for symbol in all_symbols
-    ]
+    manifest = GraphManifest.load(output_dir)
+    hasher = InputHasher(index, graph, depth, generation_settings(args))
+    input_hashes = {symbol: hasher.symbol_hash(symbol) for symbol in all_symbols}
+
+    # Graphs packed by a previous --archive run are reused from the archive
+    previous_archive = None
+    if (output_dir / ARCHIVE_FILE).exists():
+        previous_archive = GraphArchive(output_dir / ARCHIVE_FILE)
+
+    def graph_exists(dot_path):
+        if Path(dot_path).exists():
+            return True
+        return previous_archive is not None and Path(dot_path).name in previous_archive
+
+    # Skip symbols already completed by an interrupted run of the same inputs
+    journal_path = output_dir / JOURNAL_FILE
+    resumed = set()
+    if args.resume:
+        journaled = read_journal(journal_path)
+        for symbol in all_symbols:
+            result = reusable_result(
+                symbol, journaled.get(symbol), input_hashes[symbol], graph_exists
+            )
+            if result is not None:
+                entry = journaled[symbol]
+                manifest.record(
+                    input_hashes[symbol], result, entry.get("seconds"), entry.get("resources")
+                )
+                resumed.add(symbol)
+        print(f"Resuming: {len(resumed)} symbols already journaled")
+
+    # Reuse the results of symbols whose inputs did not change since the last run
+    reused = []
+    pending_symbols = []
+    for symbol in all_symbols:
+        if symbol in resumed:
+            continue
+        result = None
+        if not args.force:
+            result = manifest.reusable_result(symbol, input_hashes[symbol], graph_exists)
+        if result is not None:
+            reused.append(
+                (result, manifest.previous_seconds(symbol), manifest.previous_resources(symbol))
+            )
+        else:
+            pending_symbols.append(symbol)
+
+    # Symbols no libsignal function reaches get an empty graph without running the generator.
+    # Only for generators that cut their graphs from this call graph
+    unreachable = []
+    if args.reachability_filter and uses_python_call_graph(args):
+        pending_symbols, unreachable = split_reachable(graph, pending_symbols, depth)
+    print(f"Reusing {len(reused)} unchanged results, generating {len(pending_symbols)}")
+    if unreachable:
+        print(f"Recording {len(unreachable)} symbols not reachable from libsignal as empty graphs")
+    reused.extend(((symbol, False, "empty graph", None), None, None) for symbol in unreachable)
+
+    # Subgraphs cut in this process, reused for the database and the sidecar
+    subgraphs = {}
+    if args.engine == "python":
+        results = generate_graphs_in_process(
+            graph, pending_symbols, output_dir, depth, args.source_root, args.compact, subgraphs
+        )
+    else:
+        if args.engine == "worker":
+            # Each worker loads the index once and then serves many symbols
+            worker_pool = WorkerPool(worker_command(args), args.workers)
+            make_runner = worker_pool.make_runner
+            payloads = [
+                (symbol, depth, graph_output_file(output_dir, symbol, depth))
+                for symbol in pending_symbols
+            ]
+            print(f"Using {worker_pool.num_workers} persistent workers")
+        else:
 
-    # Use number of CPUs for parallel processing
-    num_workers = min(cpu_count(), 8)  # Cap at 8 workers to avoid overwhelming the system
-    print(f"Using {num_workers} parallel workers")
+            def make_runner():
+                return lambda task: generate_single_graph(task.payload, task.timeout, task.usage)
 
-    # Process in parallel
-    generated_graphs = 0
-    failed_symbols = []
-    start_time = time.time()
+            payloads = [
+                (scip_json_path, output_dir, symbol, rust_analyzer_dir, depth)
+                for symbol in pending_symbols
+            ]
+            print(f"Using {args.workers} parallel workers")
 
-    with Pool(num_workers) as pool:
+        # Longest expected first, so that no heavy symbol is left running alone at the end
+        tasks = scheduled_tasks(
+            pending_symbols, payloads, manifest, hasher.closure_sizes, args.timeout
+        )
+        scheduler = Scheduler(args.workers)
+        results = (
+            (result, seconds, task.usage)
+            for task, result, seconds in scheduler.run(tasks, make_runner)
+        )
+
+    journal = RunJournal(journal_path, resume=args.resume)
+    try:
         # Process with progress updates
-        for i, result in enumerate(pool.imap_unordered(generate_single_graph, args_list)):
+        completed = itertools.chain(reused, results)
+        for i, (result, seconds, resources) in enumerate(completed, start=len(resumed)):
             # Result can be (symbol, success, info) or (symbol, success, info, error_msg)
             symbol = result[0]
             success = result[1]
             info = result[2]
-            error_msg = result[3] if len(result) > 3 else None
+            if success and resources is not None and "dot_bytes" not in resources:
+                resources = dict(resources, **dot_stats(info))
+            journal.append(input_hashes[symbol], result, seconds, resources)
+            manifest.record(input_hashes[symbol], result, seconds, resources)
 
             short_name = symbol.replace("rust-analyzer cargo curve25519-dalek 4.1.3 ", "")
 
             if success:
-                generated_graphs += 1
                 print(f"[{i + 1}/{len(all_symbols)}] ✓ {short_name}")
             else:
-                # Store with error message if available
-                if error_msg and error_msg is not None:
-                    failed_symbols.append((short_name, info, error_msg))
-                else:
-                    failed_symbols.append((short_name, info))
+                # A graph from an earlier run is outdated once the symbol has none
+                stale_file = graph_output_file(output_dir, symbol, depth)
+                if stale_file.exists():
+                    stale_file.unlink()
                 print(f"[{i + 1}/{len(all_symbols)}] × {short_name} ({info})")
 
             # Show progress every 10 items
-            if (i + 1) % 10 == 0:
+            done = i + 1 - len(resumed)
+            if done % 10 == 0:
                 elapsed = time.time() - start_time
-                rate = (i + 1) / elapsed
+                rate = done / elapsed
                 remaining = (len(all_symbols) - (i + 1)) / rate
                 print(
-                    f"  Progress: {i + 1}/{len(all_symbols)} - Rate: {rate:.1f}/s - ETA: {remaining:.0f}s"
+                    f"  Progress: {i + 1}/{len(all_symbols)} - Rate: {rate:.1f}/s"
+                    f" - ETA: {remaining:.0f}s"
                 )
+    finally:
+        journal.close()
+        manifest.save(all_symbols)
+
+    # Compact the summary from the journal, which also covers resumed symbols
+    journaled = read_journal(journal_path)
+    summary = summarize_results(
+        all_symbols,
+        [journal_result(entry) for symbol, entry in journaled.items() if symbol in input_hashes],
+    )
+    generated_graphs = summary["generated_graphs"]
+    failed_symbols = summary["failed_symbols"]
+    symbol_resources = {
+        symbol: symbol_resource_record(entry)
+        for symbol, entry in journaled.items()
+        if symbol in input_hashes
+    }
+    generated_files = {
+        symbol: entry["info"]
+        for symbol, entry in journaled.items()
+        if symbol in input_hashes and entry["success"]
+    }
+    store_graphs(output_dir, generated_files, args.archive, previous_archive)
+    if uses_python_call_graph(args):
+        # Both describe the graphs as cut from this call graph, which only holds for
+        # the generators that use it
+        db_graphs = {symbol: Path(info).name for symbol, info in generated_files.items()}
+        subgraphs = cut_subgraphs(graph, db_graphs, depth, subgraphs)
+        write_database(output_dir / DB_FILE, graph, db_graphs, depth, subgraphs)
+        print(f"Wrote call graph database {output_dir / DB_FILE}")
+        write_sidecar(output_dir / SIDECAR_FILE, graph, db_graphs, depth, subgraphs)
+        print(f"Wrote graph sidecar {output_dir / SIDECAR_FILE}")
+    else:
+        for stale in (DB_FILE, SIDECAR_FILE):
+            if (output_dir / stale).exists():
+                (output_dir / stale).unlink()
+    if args.compact:
+        # One copy of every function body shown in any graph
+        symbols = set()
+        with open_graphs(output_dir) as graphs:
+            for name in graphs.names():
+                symbols.update(compact_graph_symbols(graphs.read_text(name)))
+        sources = SourceReader(args.source_root or graph.source_root)
+        bodies = write_body_store(output_dir / BODY_STORE_FILE, graph, symbols, sources)
+        print(f"Wrote {len(bodies)} function bodies to {output_dir / BODY_STORE_FILE}")
+    elif (output_dir / BODY_STORE_FILE).exists():
+        (output_dir / BODY_STORE_FILE).unlink()
 
     # Print summary with detailed failure breakdown
     elapsed_total = time.time() - start_time
 
-    # Categorize failures by type
-    from collections import Counter
-
-    failure_reasons = Counter([item[1] for item in failed_symbols])
+    failure_reasons = Counter(summary["failure_breakdown"])
 
     print(f"\n{'=' * 50}")
     print("Summary:")
@@ -219,20 +694,38 @@ def main():
 
     # Save detailed results with failure breakdown
     results = {
-        "total_symbols": len(all_symbols),
+        "total_symbols": summary["total_symbols"],
         "generated_graphs": generated_graphs,
         "failed_symbols": failed_symbols,
-        "failure_breakdown": dict(failure_reasons),
+        "failure_breakdown": summary["failure_breakdown"],
         "elapsed_seconds": elapsed_total,
         "all_symbols": all_symbols,
+        "symbol_resources": symbol_resources,
     }
 
     with open(output_dir / "processing_results.json", "w") as f:
         json.dump(results, f, indent=2)
 
     # List generated files
-    dot_files = list(output_dir.glob("*.dot"))
-    print(f"\nGenerated {len(dot_files)} .dot files")
+    if args.archive:
+        archive_path = output_dir / ARCHIVE_FILE
+        print(
+            f"\nPacked {generated_graphs} graphs into {archive_path} "
+            f"({archive_path.stat().st_size / 1024:.1f} KB)"
+        )
+    else:
+        dot_files = list(output_dir.glob("*.dot"))
+        print(f"\nGenerated {len(dot_files)} .dot files")
+
+    if args.report is not None:
+        print(f"\n{'=' * 50}")
+        print(
+            format_report(
+                symbol_resources,
+                args.report,
+                lambda symbol: symbol.replace("rust-analyzer cargo curve25519-dalek 4.1.3 ", ""),
+            )
+        )
 
 
 if __name__ == "__main__":
@@ -11,11 +11,16 @@ Functions that failed for any reason (empty graph, error, timeout, etc.) are exc
 This ensures the CSV contains only functions actually used in libsignal.
 """
 
+import argparse
 import json
 import csv
 import re
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+
+from curve25519_usage.definition_index import DefinitionIndex
+from curve25519_usage.scip_scan import scan_index
+from curve25519_usage.symbol_catalog import parse_symbol
 
 
 def extract_symbols_from_processing_results(json_file: Path) -> List[str]:
@@ -77,72 +82,87 @@ def parse_symbol_path(symbol: str) -> Dict[str, str]:
 
     Example: 'rust-analyzer cargo curve25519-dalek 4.1.3 backend/serial/u64/field/impl#[FieldElement51]as_bytes().'
     """
+    record = parse_symbol(symbol)
+
     # Remove the prefix
-    if "curve25519-dalek 4.1.3 " in symbol:
-        path_part = symbol.split("curve25519-dalek 4.1.3 ")[1]
+    if record.crate == "curve25519-dalek" and record.version == "4.1.3":
+        path_part = record.descriptor
     else:
         path_part = symbol
 
     # Extract the display name (function name)
-    # Pattern: ends with something like "function()." or "#[Type]method()."
-    if "()." in path_part:
-        # Get everything after the last / or #
-        parts = re.split(r"[/#]", path_part)
-        last_part = parts[-1]
-        # Remove the ().
-        func_name = last_part.replace("().", "")
-    else:
-        func_name = path_part
+    func_name = record.name if record.is_callable else path_part
 
     return {"symbol_id": symbol, "path": path_part, "display_name": func_name}
 
 
-def parse_scip_index(scip_file: Path) -> Dict[str, Tuple[str, int]]:
+class DefinitionLocationVisitor(DefinitionIndex):
     """
-    Parse the SCIP index and create a mapping from symbol IDs to their file locations.
-
-    Returns a dictionary mapping symbol IDs to (file_path, line_number) tuples.
+    Map symbol IDs to the (file_path, line_number) of their first definition; the
+    definition spans stay available through the `DefinitionIndex` methods.
     """
-    with open(scip_file, "r") as f:
-        data = json.load(f)
 
-    symbol_locations = {}
+    def __init__(self):
+        # Only process curve25519-dalek files (not x25519-dalek or ed25519-dalek)
+        super().__init__(path_prefixes="curve25519-dalek/")
+        self.symbol_locations = {}
 
-    for doc in data.get("documents", []):
-        relative_path = doc.get("relative_path", "")
+    def visit_document(self, index, doc):
+        super().visit_document(index, doc)
+        for span in self.documents[doc.relative_path].spans:
+            symbol = index.symbol(span.symbol_id)
 
-        # Only process curve25519-dalek files (not x25519-dalek or ed25519-dalek)
-        if not relative_path.startswith("curve25519-dalek/"):
-            continue
+            # Only store if we haven't seen this symbol before
+            # (prefer the first definition)
+            if symbol not in self.symbol_locations:
+                self.symbol_locations[symbol] = (span.relative_path, span.line)
 
-        # Build a symbol to occurrence mapping for definitions
-        for occ in doc.get("occurrences", []):
-            symbol = occ.get("symbol", "")
-            symbol_roles = occ.get("symbol_roles", 0)
 
-            # symbol_roles & 1 means it's a definition
-            if symbol_roles & 1:
-                range_info = occ.get("range", [])
-                line_num = range_info[0] if range_info else 0
+def parse_scip_index(scip_file: Path, use_cache: bool = True) -> Dict[str, Tuple[str, int]]:
+    """
+    Parse the SCIP index and create a mapping from symbol IDs to their file locations.
+
+    Returns a dictionary mapping symbol IDs to (file_path, line_number) tuples.
+    Only curve25519-dalek documents are decoded, from the snapshot or, with
+    `use_cache=False`, while streaming the JSON.
+    """
+    visitor = DefinitionLocationVisitor()
+    scan_index(scip_file, [visitor], use_cache)
+    return visitor.symbol_locations
 
-                # Only store if we haven't seen this symbol before
-                # (prefer the first definition)
-                if symbol not in symbol_locations:
-                    symbol_locations[symbol] = (relative_path, line_num)
 
-    return symbol_locations
+GITHUB_BASE_URL = "https://github.com/dalek-cryptography/curve25519-dalek"
+GITHUB_LINK_PATTERN = re.compile(
+    re.escape(GITHUB_BASE_URL)
+    + r"/tree/curve25519-(?P<version>[^/]+)/(?P<path>[^#?]+)#L(?P<line>\d+)"
+)
 
 
 def generate_github_link(file_path: str, line_num: int, version: str = "4.1.3") -> str:
     """Generate a GitHub link to the curve25519-dalek repository."""
     # Keep the full path including "curve25519-dalek/" prefix
     # The repository structure has the code in the curve25519-dalek/ subdirectory
-    base_url = "https://github.com/dalek-cryptography/curve25519-dalek"
-    return f"{base_url}/tree/curve25519-{version}/{file_path}#L{line_num}"
+    return f"{GITHUB_BASE_URL}/tree/curve25519-{version}/{file_path}#L{line_num}"
 
 
-def main():
+def parse_github_link(link: str) -> Optional[Tuple[str, str, int]]:
+    """Get the (version, file_path, line_num) of a `generate_github_link` link, or None."""
+    match = GITHUB_LINK_PATTERN.fullmatch(link)
+    if match is None:
+        return None
+    return match.group("version"), match.group("path"), int(match.group("line"))
+
+
+def main(argv=None):
     """Main function to generate the CSV file."""
+    parser = argparse.ArgumentParser(description="Generate the curve25519-dalek functions CSV")
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Stream the SCIP JSON instead of reading or rebuilding its snapshot",
+    )
+    args = parser.parse_args(argv)
+
     # Paths
     base_dir = Path(__file__).parent.parent.parent
     processing_results_file = (
@@ -156,7 +176,7 @@ def main():
     print(f"Found {len(symbols)} curve25519-dalek symbols")
 
     print(f"\nParsing SCIP index from {scip_file}...")
-    symbol_locations = parse_scip_index(scip_file)
+    symbol_locations = parse_scip_index(scip_file, use_cache=not args.no_cache)
     print(f"Found {len(symbol_locations)} symbol definitions in SCIP index")
 
     print("\nMatching symbols and generating CSV...")
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Content-hash manifest for incremental graph regeneration.
+
+The manifest (`graph_manifest.json` in the graph output directory) records, per
+symbol, a hash of every input that determines that symbol's graph together with
+the result of its last generation. On the next run only symbols whose input hash
+changed are regenerated; the others reuse their DOT file and result entry.
+
+A symbol's input hash covers:
+- the generation settings (engine, depth, libsignal prefixes, ...)
+- the content of the SCIP documents that define a function in the symbol's
+  unfiltered caller closure, i.e. every document that can reach the symbol
+  within `depth` calls
+
+A change to any other document (e.g. an unrelated part of libsignal) leaves the
+hash unchanged. A new call site in a previously unrelated document adds that
+document to the closure, which changes the hash.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from curve25519_usage.callgraph import caller_closure
+from curve25519_usage.scip_index import OCCURRENCE_FIELDS
+
+MANIFEST_FILE = "graph_manifest.json"
+
+# Bump when the hashed inputs change to invalidate existing manifests
+MANIFEST_FORMAT = 2
+
+
+def document_hash(index, doc):
+    """
+    Hash the path, occurrences and definition enclosing ranges of a SCIP document,
+    independent of symbol IDs.
+    """
+    digest = hashlib.sha256(doc.relative_path.encode())
+    symbols = index.symbols
+    for values in (doc.definitions, doc.references):
+        digest.update(b"\1")
+        for i in range(0, len(values), OCCURRENCE_FIELDS):
+            digest.update(symbols[values[i]].encode())
+            digest.update(b"\0")
+            digest.update(values[i + 1 : i + OCCURRENCE_FIELDS].tobytes())
+    # Enclosing ranges decide which function a reference is attributed to
+    digest.update(b"\1")
+    digest.update(doc.enclosing_ranges.tobytes())
+    return digest.hexdigest()
+
+
+def reusable_result(symbol, entry, input_hash, graph_exists=None):
+    """
+    Get the result tuple stored in a manifest or journal entry if it is still valid.
+
+    An entry is valid if it was generated from the same inputs and, for a
+    generated graph, its DOT file still exists. `graph_exists(dot_path)` replaces
+    the file check, e.g. to also accept graphs packed in an archive.
+    """
+    if entry is None or entry.get("input_hash") != input_hash:
+        return None
+    graph_exists = graph_exists or (lambda dot_path: Path(dot_path).exists())
+    if entry["success"] and not graph_exists(entry["info"]):
+        return None
+    return (symbol, entry["success"], entry["info"], entry.get("error"))
+
+
+def result_entry(input_hash, result, seconds=None, resources=None):
+    """
+    Convert a (symbol, success, info[, error_msg]) result tuple to a stored entry.
+
+    `seconds` is the wall time the symbol took; the scheduler of the next run
+    uses it to order symbols and size their timeouts. `resources` is the rest of
+    the symbol's usage record (see `resource_usage`).
+    """
+    entry = {
+        "input_hash": input_hash,
+        "success": result[1],
+        "info": result[2],
+        "error": result[3] if len(result) > 3 else None,
+    }
+    if seconds is not None:
+        entry["seconds"] = seconds
+    if resources:
+        entry["resources"] = resources
+    return entry
+
+
+class InputHasher:
+    """Compute per-symbol input hashes over a call graph and its SCIP index."""
+
+    def __init__(self, index, graph, depth, settings):
+        self.graph = graph
+        self.depth = depth
+        settings = dict(settings, depth=depth, format=MANIFEST_FORMAT)
+        self.settings_hash = hashlib.sha256(
+            json.dumps(settings, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        self._index = index
+        self._documents = {doc.relative_path: doc for doc in index.documents}
+        self._document_hashes = {}
+        # Caller closure size of every hashed symbol, a proxy for its generation cost
+        self.closure_sizes = {}
+
+    def document_hash(self, relative_path):
+        """Get the content hash of a document, computed once per run."""
+        digest = self._document_hashes.get(relative_path)
+        if digest is None:
+            doc = self._documents.get(relative_path)
+            digest = document_hash(self._index, doc) if doc is not None else ""
+            self._document_hashes[relative_path] = digest
+        return digest
+
+    def symbol_hash(self, symbol):
+        """Get the input hash of the graph of `symbol`."""
+        digest = hashlib.sha256(self.settings_hash.encode())
+        digest.update(symbol.encode())
+
+        node = self.graph.id(symbol)
+        nodes = caller_closure(self.graph, node, self.depth)[0] if node is not None else ()
+        self.closure_sizes[symbol] = len(nodes)
+        locations = map(self.graph.definition, nodes)
+        paths = sorted({location[0] for location in locations if location is not None})
+        for relative_path in paths:
+            digest.update(b"\0" + relative_path.encode() + b"\0")
+            digest.update(self.document_hash(relative_path).encode())
+        return digest.hexdigest()
+
+
+class GraphManifest:
+    """Per-symbol input hashes and results of the previous and the current run."""
+
+    def __init__(self, path, previous=None):
+        self.path = Path(path)
+        self.previous = previous or {}
+        self.entries = {}
+
+    @classmethod
+    def load(cls, output_dir):
+        """Load the manifest of an output directory; a missing or stale one is empty."""
+        path = Path(output_dir) / MANIFEST_FILE
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(path)
+        if data.get("format") != MANIFEST_FORMAT:
+            return cls(path)
+        return cls(path, data.get("symbols", {}))
+
+    def reusable_result(self, symbol, input_hash, graph_exists=None):
+        """
+        Get the previous result of `symbol` if its inputs are unchanged.
+
+        Returns a (symbol, success, info, error_msg) tuple, or None if the graph
+        has to be regenerated (changed inputs, or its DOT file is gone).
+        """
+        return reusable_result(symbol, self.previous.get(symbol), input_hash, graph_exists)
+
+    def record(self, input_hash, result, seconds=None, resources=None):
+        """Record the result tuple of one symbol, and what it cost, for the next run."""
+        self.entries[result[0]] = result_entry(input_hash, result, seconds, resources)
+
+    def previous_seconds(self, symbol):
+        """Get the wall time `symbol` took when it was last generated, or None."""
+        return self.previous.get(symbol, {}).get("seconds")
+
+    def previous_resources(self, symbol):
+        """Get the resource usage recorded when `symbol` was last generated."""
+        return self.previous.get(symbol, {}).get("resources")
+
+    def save(self, symbols=()):
+        """
+        Write the entries recorded in this run atomically.
+
+        Previous entries of `symbols` that were not recorded (e.g. after an
+        interrupted run) are kept; they are still checked against their input hash.
+        """
+        entries = {
+            symbol: self.previous[symbol]
+            for symbol in symbols
+            if symbol not in self.entries and symbol in self.previous
+        }
+        entries.update(self.entries)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"format": MANIFEST_FORMAT, "symbols": entries}, f, indent=2)
+        os.replace(tmp_path, self.path)
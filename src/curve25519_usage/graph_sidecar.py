@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Machine-readable sidecar of the generated graphs: `graphs.ndjson`.
+
+The DOT files encode what a node is only through styling (green sink, white
+libsignal, light gray dependency nodes). Next to them the generator writes one
+NDJSON file that says it explicitly. The first line is a header, then there is one
+line per graph:
+
+    {"format": 2, "depth": 20}
+    {"graph": "<DOT file name>", "sha256": "<hash of the DOT text>", "sink": "<symbol>",
+     "nodes": [{"id": "<symbol>", "role": "sink"}, ...],
+     "edges": [[caller, callee], ...]}
+
+Nodes are sorted by symbol and edges are pairs of indexes into `nodes`. The role
+of a node is one of ROLES. A consumer reads one line per graph with
+`json.loads`, without any DOT parsing; `sha256` tells whether a record still
+describes the DOT file next to it.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from curve25519_usage.callgraph import cut_subgraphs
+from curve25519_usage.graph_archive import open_graphs
+
+SIDECAR_FILE = "graphs.ndjson"
+SIDECAR_FORMAT = 2
+
+ROLE_SINK = "sink"
+ROLE_LIBSIGNAL = "libsignal"
+ROLE_CURVE25519 = "curve25519-dalek"
+ROLE_DEPENDENCY = "dependency"
+ROLES = (ROLE_SINK, ROLE_LIBSIGNAL, ROLE_CURVE25519, ROLE_DEPENDENCY)
+
+
+def node_role(graph, node, sink):
+    """Get the role of a node in the graph of `sink`."""
+    if node == sink:
+        return ROLE_SINK
+    if graph.is_libsignal(node):
+        return ROLE_LIBSIGNAL
+    if graph.catalog.record(node).crate == "curve25519-dalek":
+        return ROLE_CURVE25519
+    return ROLE_DEPENDENCY
+
+
+def graph_sha256(graphs, name):
+    """Get the SHA-256 of the DOT text of the graph `name` in opened `graphs`."""
+    digest = hashlib.sha256()
+    with graphs.open(name) as f:
+        for line in f:
+            digest.update(line.encode())
+    return digest.hexdigest()
+
+
+def graph_record(graph, name, sha256, sink, nodes, edges):
+    """Get the sidecar record of the graph `name` of `sink`, cut as (nodes, edges)."""
+    ordered = sorted(nodes, key=graph.symbol)
+    index = {node: i for i, node in enumerate(ordered)}
+    return {
+        "graph": name,
+        "sha256": sha256,
+        "sink": graph.symbol(sink),
+        "nodes": [
+            {"id": graph.symbol(node), "role": node_role(graph, node, sink)} for node in ordered
+        ],
+        "edges": sorted([index[caller], index[callee]] for caller, callee in edges),
+    }
+
+
+def write_sidecar(path, graph, graphs, depth, subgraphs=None):
+    """
+    Write the sidecar atomically.
+
+    `graphs` and `subgraphs` are as for `callgraph_db.write_database`. The DOT files
+    are read from the sidecar's directory (loose or archived) for their hashes;
+    graphs not found there are left out. Returns the number of graphs written.
+    """
+    subgraphs = cut_subgraphs(graph, graphs, depth, subgraphs)
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    count = 0
+    with open_graphs(path.parent) as dot_files, open(tmp_path, "w") as f:
+        f.write(json.dumps({"format": SIDECAR_FORMAT, "depth": depth}) + "\n")
+        for symbol, name in sorted(graphs.items(), key=lambda item: item[1]):
+            if symbol not in subgraphs or name not in dot_files:
+                continue
+            sha256 = graph_sha256(dot_files, name)
+            record = graph_record(graph, name, sha256, graph.id(symbol), *subgraphs[symbol])
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+            count += 1
+    os.replace(tmp_path, path)
+    return count
+
+
+def sidecar_path(graphs_path):
+    """Get the sidecar file of a graph directory or archive."""
+    graphs_path = Path(graphs_path)
+    directory = graphs_path if graphs_path.is_dir() else graphs_path.parent
+    return directory / SIDECAR_FILE
+
+
+def read_sidecar(path):
+    """
+    Yield the graph records of a sidecar, one line at a time.
+
+    Raises ValueError if the file is not a sidecar of a supported format.
+    """
+    with open(path, "r") as f:
+        header = json.loads(f.readline() or "null")
+        if not isinstance(header, dict) or header.get("format") != SIDECAR_FORMAT:
+            raise ValueError(f"unsupported graph sidecar: {path}")
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
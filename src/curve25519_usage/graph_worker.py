@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Persistent batch workers for the subgraph generator.
+
+Instead of one process per symbol, a small number of long-lived workers each load
+the SCIP index once and then answer graph requests, one JSON object per line:
+
+    worker -> driver   {"ready": true, "protocol": 1}            (once, after loading)
+    driver -> worker   {"id": 7, "symbol": "...", "depth": 20, "output": "/path/x.dot"}
+    worker -> driver   {"id": 7, "symbol": "...", "success": true,
+                        "info": "/path/x.dot", "error": null}
+
+The worker exits when its stdin is closed. `info` and `error` carry the same values
+as the result tuples of `generate_single_graph` (e.g. "empty graph"). A response
+may also carry `"usage": {"cpu_seconds": ..., "rss_growth_kb": ...}`, the resources
+the worker spent on the request (see `resource_usage`).
+
+This module contains the Python stand-in worker (`serve`, run with
+`python -m curve25519_usage.graph_worker --scip-json ...`), which answers requests
+with the in-process call graph engine, and `WorkerPool`, which drives any worker
+command that speaks the protocol.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import select
+import subprocess
+import sys
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+
+from curve25519_usage.callgraph import (
+    LIBSIGNAL_PATH_PREFIXES,
+    SourceReader,
+    load_call_graph,
+    write_function_graph,
+)
+from curve25519_usage.resource_usage import ProcessUsage
+from curve25519_usage.scheduler import DEFAULT_TIMEOUT, Scheduler, Task
+
+PROTOCOL_VERSION = 1
+
+
+class WorkerError(Exception):
+    """A worker crashed, closed its output or broke the protocol."""
+
+
+def encode_message(message):
+    """Encode a protocol message as one JSON line."""
+    return json.dumps(message, separators=(",", ":")) + "\n"
+
+
+def request_message(request_id, symbol, depth, output_file):
+    """Build the request for one symbol graph."""
+    return {"id": request_id, "symbol": symbol, "depth": depth, "output": str(output_file)}
+
+
+def result_from_response(response):
+    """Convert a worker response to a (symbol, success, info, error_msg) result tuple."""
+    return (
+        response.get("symbol"),
+        bool(response.get("success")),
+        response.get("info", ""),
+        response.get("error"),
+    )
+
+
+def serve(
+    scip_json_path,
+    input_stream,
+    output_stream,
+    libsignal_prefixes=LIBSIGNAL_PATH_PREFIXES,
+    source_root=None,
+    compact=False,
+):
+    """
+    Run the stand-in worker: load the call graph once, then answer requests until EOF.
+
+    Anything printed while loading or generating goes to stderr so that the output
+    stream only carries protocol lines. With `compact` the graphs are written in
+    compact DOT.
+    """
+    with redirect_stdout(sys.stderr):
+        graph = load_call_graph(scip_json_path, libsignal_prefixes)
+    sources = SourceReader(source_root or graph.source_root)
+    usage = ProcessUsage()
+
+    output_stream.write(encode_message({"ready": True, "protocol": PROTOCOL_VERSION}))
+    output_stream.flush()
+
+    for line in input_stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            request = json.loads(line)
+            symbol = request["symbol"]
+            output_file = Path(request["output"])
+            depth = int(request["depth"])
+        except (ValueError, KeyError, TypeError) as e:
+            response = {"id": None, "symbol": None, "success": False}
+            response.update({"info": "bad request", "error": str(e)})
+        else:
+            usage.start()
+            with redirect_stdout(sys.stderr):
+                _, success, info, error_msg = write_function_graph(
+                    graph, symbol, output_file, depth, sources, compact=compact
+                )
+            response = {"id": request.get("id"), "symbol": symbol, "success": success}
+            response.update({"info": info, "error": error_msg, "usage": usage.stop()})
+        output_stream.write(encode_message(response))
+        output_stream.flush()
+
+
+def stand_in_worker_command(
+    scip_json_path, source_root=None, libsignal_prefixes=None, compact=False
+):
+    """Get the command line that starts the Python stand-in worker."""
+    command = [sys.executable, "-m", "curve25519_usage.graph_worker", "--scip-json"]
+    command.append(str(scip_json_path))
+    if source_root:
+        command += ["--source-root", str(source_root)]
+    for prefix in libsignal_prefixes or ():
+        command += ["--libsignal-prefix", prefix]
+    if compact:
+        command.append("--compact")
+    return command
+
+
+class _WorkerProcess:
+    """One running worker and its protocol pipes."""
+
+    def __init__(self, command, startup_timeout=DEFAULT_TIMEOUT):
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        # Output read from the worker but not yet returned as a message
+        self._buffer = bytearray()
+        try:
+            ready = self.read_message(startup_timeout)
+        except TimeoutError:
+            self.kill()
+            raise WorkerError(f"worker not ready after {startup_timeout} seconds")
+        if not ready.get("ready"):
+            self.kill()
+            raise WorkerError(f"unexpected worker greeting: {ready}")
+
+    def read_message(self, timeout=None):
+        """
+        Read one protocol line, raising TimeoutError if it is not complete in time.
+
+        The pipe is read directly into our own buffer, so that neither a partial
+        line nor lines that arrived together can leave `select` out of step.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        fd = self.process.stdout.fileno()
+        end = self._buffer.find(b"\n")
+        while end < 0:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                raise TimeoutError
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                raise TimeoutError
+            chunk = os.read(fd, 1 << 16)
+            if not chunk:
+                code = self.process.wait()
+                raise WorkerError(f"worker exited with code {code}")
+            scanned = len(self._buffer)
+            self._buffer += chunk
+            end = self._buffer.find(b"\n", scanned)
+        line = bytes(self._buffer[:end])
+        del self._buffer[: end + 1]
+        try:
+            return json.loads(line)
+        except ValueError:
+            raise WorkerError(f"invalid worker output: {line.decode(errors='replace')[:200]}")
+
+    def request(self, message, timeout):
+        """Send one request and wait for its response."""
+        try:
+            self.process.stdin.write(encode_message(message).encode())
+            self.process.stdin.flush()
+        except OSError as e:
+            raise WorkerError(f"worker input closed: {e}")
+        response = self.read_message(timeout)
+        if response.get("id") != message["id"]:
+            raise WorkerError(
+                f"response for request {response.get('id')}, expected {message['id']}"
+            )
+        return response
+
+    def close(self):
+        """Close the worker's input and wait for it to exit."""
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=10)
+        except (OSError, subprocess.TimeoutExpired):
+            self.kill()
+
+    def kill(self):
+        self.process.kill()
+        self.process.wait()
+
+
+class WorkerPool:
+    """
+    Drive a pool of persistent workers speaking the JSON lines protocol.
+
+    Each worker handles one request at a time. A worker that times out, crashes or
+    breaks the protocol is killed, its request is reported as failed and a fresh
+    worker is started for the remaining requests.
+    """
+
+    def __init__(
+        self, command, num_workers, timeout=DEFAULT_TIMEOUT, startup_timeout=DEFAULT_TIMEOUT
+    ):
+        self.command = list(command)
+        self.num_workers = max(1, num_workers)
+        self.timeout = timeout
+        self.startup_timeout = startup_timeout
+        self._startup_error = None
+
+    def imap_unordered(self, jobs):
+        """
+        Generate graphs for (symbol, depth, output_file) jobs in the given order.
+
+        Yields (symbol, success, info, error_msg) tuples in completion order, like
+        `Pool.imap_unordered(generate_single_graph, ...)`.
+        """
+        tasks = [Task(job[0], job, timeout=self.timeout) for job in jobs]
+        scheduler = Scheduler(self.num_workers, retry_timeouts=False)
+        for _, result, _ in scheduler.run(tasks, self.make_runner):
+            yield result
+
+    def make_runner(self):
+        """Get a `Scheduler` runner that owns one worker process at a time."""
+        return _WorkerRunner(self)
+
+    def _start_worker(self):
+        try:
+            return _WorkerProcess(self.command, self.startup_timeout)
+        except (OSError, WorkerError) as e:
+            # Starting again would fail the same way (e.g. an unreadable index)
+            self._startup_error = str(e)
+            raise WorkerError(f"worker failed to start: {e}")
+
+
+class _WorkerRunner:
+    """Answer (symbol, depth, output_file) tasks with one persistent worker."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.worker = None
+        self._request_ids = itertools.count()
+
+    def prepare(self):
+        """Start a worker before the next task, so its startup is not timed as the task."""
+        if self.worker is None and self.pool._startup_error is None:
+            try:
+                self.worker = self.pool._start_worker()
+            except WorkerError:
+                pass  # Reported by __call__ from the pool's startup error
+
+    def __call__(self, task):
+        symbol, depth, output_file = task.payload
+        if self.pool._startup_error is not None:
+            return (symbol, False, "exception: worker failed to start", self.pool._startup_error)
+        message = request_message(next(self._request_ids), symbol, depth, output_file)
+        try:
+            if self.worker is None:
+                self.worker = self.pool._start_worker()
+            response = self.worker.request(message, task.timeout)
+            task.usage.update(response.get("usage") or {})
+            return result_from_response(response)
+        except TimeoutError:
+            self._discard_worker()
+            return (symbol, False, "timeout", f"Worker exceeded {task.timeout} second timeout")
+        except WorkerError as e:
+            self._discard_worker()
+            return (symbol, False, f"exception: {e}", str(e))
+
+    def _discard_worker(self):
+        if self.worker is not None:
+            self.worker.kill()
+            self.worker = None
+
+    def close(self):
+        if self.worker is not None:
+            self.worker.close()
+            self.worker = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Persistent graph worker: answers JSON line requests on stdin"
+    )
+    parser.add_argument("--scip-json", type=Path, required=True)
+    parser.add_argument("--source-root", type=Path, default=None)
+    parser.add_argument("--libsignal-prefix", action="append", dest="libsignal_prefixes")
+    parser.add_argument("--compact", action="store_true", help="Write compact DOT graphs")
+    args = parser.parse_args(argv)
+
+    serve(
+        args.scip_json,
+        sys.stdin,
+        sys.stdout,
+        args.libsignal_prefixes or LIBSIGNAL_PATH_PREFIXES,
+        args.source_root,
+        args.compact,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
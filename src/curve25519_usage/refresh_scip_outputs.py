@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Regenerate every output derived from the SCIP index in a single pass.
+
+Runs the public API extraction, the definition-location lookup and the
+function-symbol enumeration as visitors of one `scan_index` traversal and writes:
+- the public API JSON (same format as `extract-public-api-from-scip`)
+- a symbol -> {file, line} map of curve25519-dalek definitions
+- the sorted list of curve25519-dalek function symbols
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from curve25519_usage.extract_public_api_from_scip import PublicApiVisitor, build_output_json
+from curve25519_usage.generate_curve25519_graphs_parallel import FunctionSymbolVisitor
+from curve25519_usage.generate_functions_csv import DefinitionLocationVisitor
+from curve25519_usage.scip_scan import scan_index
+
+
+def get_project_root():
+    """Get the project root directory."""
+    current = Path(__file__).resolve().parent
+    return current.parent.parent
+
+
+def refresh_scip_outputs(scip_json_path, use_cache=True):
+    """
+    Scan the index once and return (public_api_json, symbol_locations, function_symbols).
+    """
+    public_api = PublicApiVisitor()
+    locations = DefinitionLocationVisitor()
+    functions = FunctionSymbolVisitor()
+    scan_index(scip_json_path, [public_api, locations, functions], use_cache)
+
+    public_api_json = build_output_json(public_api.api_structure, public_api.version)
+    symbol_locations = {
+        symbol: {"file": file_path, "line": line}
+        for symbol, (file_path, line) in sorted(locations.symbol_locations.items())
+    }
+    return public_api_json, symbol_locations, functions.sorted_symbols()
+
+
+def main(argv=None):
+    project_root = get_project_root()
+    data_dir = project_root / "data"
+
+    parser = argparse.ArgumentParser(description="Regenerate all SCIP-derived outputs in one pass")
+    parser.add_argument(
+        "--scip-json", type=Path, default=data_dir / "index_scip_curve25519-4.1.3.json"
+    )
+    parser.add_argument("--output-dir", type=Path, default=data_dir)
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Stream the SCIP JSON instead of reading or rebuilding its snapshot",
+    )
+    args = parser.parse_args(argv)
+
+    if not args.scip_json.exists():
+        print(f"Error: SCIP index not found at {args.scip_json}")
+        return 1
+
+    print(f"Scanning SCIP index {args.scip_json}")
+    public_api_json, symbol_locations, function_symbols = refresh_scip_outputs(
+        args.scip_json, use_cache=not args.no_cache
+    )
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    outputs = {
+        "curve25519-dalek-public-api-generated.json": public_api_json,
+        "curve25519-dalek-symbol-locations.json": symbol_locations,
+        "curve25519-dalek-function-symbols.json": function_symbols,
+    }
+    for name, content in outputs.items():
+        with open(args.output_dir / name, "w") as f:
+            json.dump(content, f, indent=2)
+        print(f"  Wrote {args.output_dir / name}")
+
+    print(f"\nPublic API modules: {len(public_api_json['modules'])}")
+    print(f"Symbol definitions: {len(symbol_locations)}")
+    print(f"Function symbols: {len(function_symbols)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
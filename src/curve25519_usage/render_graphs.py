@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Render the generated DOT graphs to SVG with Graphviz.
+
+Every graph is rendered by its own `dot -Tsvg` subprocess, several at a time and
+largest first, so that the biggest graphs do not finish last. Each render has a
+timeout.
+
+The SVG ends with a comment holding a hash of the DOT source it was rendered from.
+A graph whose SVG already carries the hash of its current source is skipped, so
+after a regeneration only the graphs that changed are rendered again. Graphs are
+ordered by size alone; each one is read and hashed by the worker that renders it,
+so at most one source per worker is held in memory.
+
+Graphs are read through `graph_archive.open_graphs`, so a directory of loose DOT
+files and a packed `graphs.dotpack` both work; the SVGs are written next to them.
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+from curve25519_usage.graph_archive import GraphArchiveError, open_graphs
+from curve25519_usage.scheduler import Scheduler, Task, available_cpus
+
+# Bump to re-render every SVG, e.g. when the Graphviz arguments change
+RENDER_FORMAT = 1
+DOT_ARGUMENTS = ["-Tsvg"]
+
+# Seconds one `dot` run may take
+DEFAULT_TIMEOUT = 60
+
+# Result info of a graph whose SVG already carries the hash of its source
+UP_TO_DATE = "up to date"
+
+HASH_COMMENT = "<!-- dot-source-sha256: {} -->\n"
+HASH_PATTERN = re.compile(rb"<!-- dot-source-sha256: ([0-9a-f]{64}) -->\s*$")
+
+
+def get_project_root():
+    """Get the project root directory."""
+    current = Path(__file__).resolve().parent
+    return current.parent.parent
+
+
+def source_hash(text):
+    """Hash a DOT source together with the render settings."""
+    digest = hashlib.sha256(f"{RENDER_FORMAT} {' '.join(DOT_ARGUMENTS)}\n".encode())
+    digest.update(text.encode())
+    return digest.hexdigest()
+
+
+def rendered_hash(svg_file):
+    """Get the source hash recorded at the end of an SVG, or None."""
+    try:
+        with open(svg_file, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - 256))
+            tail = f.read()
+    except OSError:
+        return None
+    match = HASH_PATTERN.search(tail)
+    return match.group(1).decode() if match else None
+
+
+def svg_output_file(output_dir, name):
+    """Get the SVG path of the DOT file or archive member `name`."""
+    return Path(output_dir) / (Path(name).stem + ".svg")
+
+
+def render_svg(dot_command, name, text, svg_file, timeout=DEFAULT_TIMEOUT):
+    """
+    Render one DOT source to `svg_file` with a `dot` subprocess.
+
+    The SVG is written atomically and ends with the hash of its source. Returns a
+    (name, success, info, error_msg) result tuple.
+    """
+    try:
+        result = subprocess.run(
+            [dot_command] + DOT_ARGUMENTS,
+            input=text,
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+        )
+    except subprocess.TimeoutExpired:
+        return (name, False, "timeout", f"dot exceeded {timeout} second timeout")
+    except OSError as e:
+        return (name, False, f"exception: {str(e)}", str(e))
+    if result.returncode != 0:
+        error_msg = result.stderr.strip() or "no error message"
+        if len(error_msg) > 200:
+            error_msg = "..." + error_msg[-200:]
+        return (name, False, f"error: {result.returncode}", error_msg)
+
+    svg = result.stdout
+    if not svg.endswith("\n"):
+        svg += "\n"
+    tmp_file = svg_file.with_name(svg_file.name + ".tmp")
+    with open(tmp_file, "w") as f:
+        f.write(svg + HASH_COMMENT.format(source_hash(text)))
+    os.replace(tmp_file, svg_file)
+    return (name, True, str(svg_file), None)
+
+
+def render_tasks(graphs, output_dir, timeout=DEFAULT_TIMEOUT):
+    """
+    Build a render task for every graph without reading any of them.
+
+    Every task payload is (name, svg_file) and its estimate is the DOT size, so the
+    largest graphs are rendered first.
+    """
+    return [
+        Task(name, (name, svg_output_file(output_dir, name)), graphs.size(name), timeout)
+        for name in graphs.names()
+    ]
+
+
+class _RenderRunner:
+    """Read, hash and render (name, svg_file) tasks with graphs opened by this runner."""
+
+    def __init__(self, graphs_path, dot_command, force=False):
+        self.graphs_path = graphs_path
+        self.dot_command = dot_command
+        self.force = force
+        self.graphs = None
+
+    def __call__(self, task):
+        name, svg_file = task.payload
+        if self.graphs is None:
+            self.graphs = open_graphs(self.graphs_path)
+        try:
+            text = self.graphs.read_text(name)
+        except (OSError, ValueError, GraphArchiveError) as e:
+            return (name, False, f"exception: {str(e)}", str(e))
+        if not self.force and rendered_hash(svg_file) == source_hash(text):
+            return (name, True, UP_TO_DATE, None)
+        return render_svg(self.dot_command, name, text, svg_file, task.timeout)
+
+    def close(self):
+        if self.graphs is not None:
+            self.graphs.close()
+            self.graphs = None
+
+
+def main(argv=None):
+    project_root = get_project_root()
+    parser = argparse.ArgumentParser(description="Render the generated DOT graphs to SVG")
+    parser.add_argument(
+        "--graphs",
+        type=Path,
+        default=project_root / "outputs" / "curve25519-dalek_public_apis_graphs",
+        help="Directory of DOT files (or holding graphs.dotpack), or a graph archive",
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=Path,
+        default=None,
+        help="Directory for the SVG files (default: next to the graphs)",
+    )
+    parser.add_argument("--dot", default="dot", help="Graphviz dot executable")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=available_cpus(),
+        help="Number of dot processes at a time (default: available CPUs)",
+    )
+    parser.add_argument("--timeout", type=int, default=DEFAULT_TIMEOUT, help="Seconds per graph")
+    parser.add_argument(
+        "--force", action="store_true", help="Render every graph, even if its SVG is up to date"
+    )
+    args = parser.parse_args(argv)
+
+    if not args.graphs.exists():
+        print(f"Error: graphs not found at {args.graphs}")
+        return 1
+    if shutil.which(args.dot) is None:
+        print(f"Error: Graphviz dot not found ({args.dot})")
+        return 1
+    output_dir = args.output_dir
+    if output_dir is None:
+        output_dir = args.graphs if args.graphs.is_dir() else args.graphs.parent
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    start_time = time.time()
+    with open_graphs(args.graphs) as graphs:
+        tasks = render_tasks(graphs, output_dir, args.timeout)
+    print(f"Checking {len(tasks)} graphs")
+
+    def make_runner():
+        return _RenderRunner(args.graphs, args.dot, args.force)
+
+    up_to_date = 0
+    failures = Counter()
+    scheduler = Scheduler(args.workers, retry_timeouts=False)
+    for i, (task, result, seconds) in enumerate(scheduler.run(tasks, make_runner)):
+        name, success, info = result[0], result[1], result[2]
+        if success and info == UP_TO_DATE:
+            up_to_date += 1
+        elif success:
+            print(f"[{i + 1}/{len(tasks)}] ✓ {name} ({seconds:.1f}s)")
+        else:
+            failures[info] += 1
+            print(f"[{i + 1}/{len(tasks)}] × {name} ({info}: {result[3]})")
+
+    print(f"\n{'=' * 50}")
+    print(f"Rendered: {len(tasks) - up_to_date - sum(failures.values())}")
+    print(f"Up to date: {up_to_date}")
+    if failures:
+        print("Failures:")
+        for reason, count in failures.most_common():
+            print(f"  - {reason}: {count}")
+    print(f"Time elapsed: {time.time() - start_time:.1f}s")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Per-symbol resource accounting for graph generation.
+
+Every generated symbol gets a usage record:
+- `wall_seconds`: wall time of the symbol
+- `cpu_seconds`: user + system CPU time spent on it (the cargo subprocess and its
+  children, the batch worker, or this process for the python engine)
+- `peak_rss_kb`: peak resident set size of the cargo subprocess that generated it
+- `rss_growth_kb`: for the python engine and persistent workers, which generate
+  many symbols in one process, how far the symbol raised that process's peak
+  resident set size; the peak itself only grows from symbol to symbol and would
+  rank whichever symbols ran last
+- `dot_bytes`, `nodes`, `edges`: size and node/edge counts of the DOT output
+
+The records are journaled with the results and written to the `symbol_resources`
+section of `processing_results.json`; `format_report` ranks and summarizes them.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from curve25519_usage.dot_reader import DotNode, DotSyntaxError, read_dot
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Record fields that `--report` ranks and summarizes
+REPORT_FIELDS = (
+    "wall_seconds",
+    "cpu_seconds",
+    "peak_rss_kb",
+    "rss_growth_kb",
+    "dot_bytes",
+    "nodes",
+    "edges",
+)
+
+# Interval at which a measured subprocess is polled for exit
+POLL_INTERVAL = 0.02
+
+
+def _maxrss_kb(rusage):
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    if sys.platform == "darwin":
+        return rusage.ru_maxrss // 1024
+    return rusage.ru_maxrss
+
+
+def _rusage_record(rusage):
+    return {
+        "cpu_seconds": rusage.ru_utime + rusage.ru_stime,
+        "peak_rss_kb": _maxrss_kb(rusage),
+    }
+
+
+class ProcessUsage:
+    """
+    Measure the CPU time this process spends between `start()` and `stop()`, and
+    how much it raises the process's peak RSS.
+
+    Used where the graph is generated in the current process (python engine and
+    batch workers).
+    """
+
+    def __init__(self):
+        self._cpu_start = 0.0
+        self._maxrss_start = None
+
+    def start(self):
+        self._cpu_start = time.process_time()
+        if resource is not None:
+            self._maxrss_start = _maxrss_kb(resource.getrusage(resource.RUSAGE_SELF))
+
+    def stop(self):
+        """Get the usage record since `start()`, without what cannot be measured."""
+        usage = {"cpu_seconds": time.process_time() - self._cpu_start}
+        if self._maxrss_start is not None:
+            maxrss = _maxrss_kb(resource.getrusage(resource.RUSAGE_SELF))
+            usage["rss_growth_kb"] = maxrss - self._maxrss_start
+        return usage
+
+
+def _exit_code(status):
+    """Convert a wait status to a returncode as reported by subprocess."""
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def run_measured(cmd, cwd=None, timeout=None):
+    """
+    Run a command like `subprocess.run(cmd, capture_output=True, text=True)` and
+    measure its resource usage.
+
+    Returns (returncode, stdout, stderr, usage) where usage holds the CPU time and
+    peak RSS of the process and the descendants it waited for. Raises
+    `subprocess.TimeoutExpired` after killing the process if it exceeds `timeout`.
+    """
+    if not hasattr(os, "wait4"):
+        result = subprocess.run(cmd, capture_output=True, text=True, cwd=cwd, timeout=timeout)
+        return result.returncode, result.stdout, result.stderr, {}
+
+    # Output goes to files so the process can be reaped with os.wait4 for its rusage
+    with tempfile.TemporaryFile("w+") as stdout, tempfile.TemporaryFile("w+") as stderr:
+        process = subprocess.Popen(cmd, stdout=stdout, stderr=stderr, text=True, cwd=cwd)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            pid, status, rusage = os.wait4(process.pid, os.WNOHANG)
+            if pid:
+                break
+            if deadline is not None and time.monotonic() > deadline:
+                process.kill()
+                process.wait()
+                raise subprocess.TimeoutExpired(cmd, timeout)
+            time.sleep(POLL_INTERVAL)
+        # Keep Popen from waiting on the already reaped process
+        process.returncode = _exit_code(status)
+        stdout.seek(0)
+        stderr.seek(0)
+        return process.returncode, stdout.read(), stderr.read(), _rusage_record(rusage)
+
+
+def dot_stats(path):
+    """
+    Get the size and node/edge counts of a DOT file written by the generators.
+
+    The file is streamed through `dot_reader`, so `->` inside tooltips is not
+    mistaken for an edge. Returns {} for a missing file and only the size for a
+    file that does not parse.
+    """
+    path = Path(path)
+    try:
+        size = path.stat().st_size
+        f = open(path, "r")
+    except OSError:
+        return {}
+    nodes = edges = 0
+    with f:
+        try:
+            for statement in read_dot(f):
+                if isinstance(statement, DotNode):
+                    nodes += 1
+                else:
+                    edges += 1
+        except DotSyntaxError:
+            return {"dot_bytes": size}
+    return {"dot_bytes": size, "nodes": nodes, "edges": edges}
+
+
+def _quantile(values, fraction):
+    """Nearest-rank quantile of sorted values."""
+    index = max(0, min(len(values) - 1, int(round(fraction * len(values))) - 1))
+    return values[index]
+
+
+def distribution(values):
+    """Summarize numbers as count, total, mean, p50, p90, p99 and max."""
+    values = sorted(values)
+    if not values:
+        return {"count": 0}
+    total = sum(values)
+    return {
+        "count": len(values),
+        "total": total,
+        "mean": total / len(values),
+        "p50": _quantile(values, 0.5),
+        "p90": _quantile(values, 0.9),
+        "p99": _quantile(values, 0.99),
+        "max": values[-1],
+    }
+
+
+def top_symbols(records, field, limit):
+    """Get the `limit` (symbol, value) pairs with the largest `field`, largest first."""
+    ranked = [(symbol, usage[field]) for symbol, usage in records.items() if field in usage]
+    ranked.sort(key=lambda item: (-item[1], item[0]))
+    return ranked[:limit]
+
+
+def _format_value(field, value):
+    if field.endswith("_seconds"):
+        return f"{value:.2f}s"
+    if field.endswith("_kb"):
+        return f"{value / 1024:.1f} MB"
+    if field == "dot_bytes":
+        return f"{value / 1024:.1f} KB"
+    return f"{value:g}" if isinstance(value, float) else str(value)
+
+
+def format_report(records, limit=10, short_name=lambda symbol: symbol):
+    """
+    Format the resource report: the distribution of every field and the `limit`
+    most expensive symbols by wall time, CPU time, peak RSS, RSS growth and DOT size.
+    """
+    lines = ["Resource distribution:"]
+    for field in REPORT_FIELDS:
+        summary = distribution(usage[field] for usage in records.values() if field in usage)
+        if not summary["count"]:
+            continue
+        # Peaks of different processes do not add up
+        keys = ("mean", "p50", "p90", "p99", "max")
+        if field != "peak_rss_kb":
+            keys = ("total",) + keys
+        values = ", ".join(f"{key} {_format_value(field, summary[key])}" for key in keys)
+        lines.append(f"  {field}: {values}")
+    for field in ("wall_seconds", "cpu_seconds", "peak_rss_kb", "rss_growth_kb", "dot_bytes"):
+        # Symbols that did not raise the RSS at all are not worth listing
+        ranked = [item for item in top_symbols(records, field, limit) if item[1] > 0]
+        if not ranked:
+            continue
+        lines.append(f"\nTop {len(ranked)} symbols by {field}:")
+        for symbol, value in ranked:
+            usage = records[symbol]
+            size = ""
+            if "nodes" in usage:
+                size = f" ({usage['nodes']} nodes, {usage['edges']} edges)"
+            lines.append(f"  {_format_value(field, value):>10}  {short_name(symbol)}{size}")
+    return "\n".join(lines)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Append-only journal of graph generation results.
+
+Every result is appended to `generation_journal.jsonl` in the output directory
+and flushed as soon as its symbol completes, so a crashed, killed or interrupted
+run keeps its bookkeeping. `--resume` reads the journal back and skips symbols
+that already have a valid result; the final summary is compacted from it.
+
+Each line is one JSON object: a run marker (`{"run": "start" | "resume", ...}`)
+or a result entry `{"symbol", "input_hash", "success", "info", "error"}` plus
+the wall time in `"seconds"` and other `"resources"` when they were measured. A
+partially written last line from a killed run is ignored.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+
+from curve25519_usage.graph_manifest import result_entry
+
+JOURNAL_FILE = "generation_journal.jsonl"
+
+
+class RunJournal:
+    """Append result entries to a journal file, one flushed line per symbol."""
+
+    def __init__(self, path, resume=False):
+        self.path = Path(path)
+        resume = resume and self.path.exists()
+        self._file = open(self.path, "a" if resume else "w")
+        if resume and self.path.stat().st_size > 0 and not _ends_with_newline(self.path):
+            # Terminate a line cut off by a killed run so it stays ignorable
+            self._file.write("\n")
+        self._write({"run": "resume" if resume else "start", "time": time.time()})
+
+    def _write(self, message):
+        self._file.write(json.dumps(message) + "\n")
+        self._file.flush()
+
+    def append(self, input_hash, result, seconds=None, resources=None):
+        """Append the result tuple of one symbol and the resources it took."""
+        entry = result_entry(input_hash, result, seconds, resources)
+        self._write(dict(entry, symbol=result[0]))
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _ends_with_newline(path):
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def read_journal(path):
+    """
+    Read the latest entry of every symbol in a journal.
+
+    Returns a dict symbol -> entry ordered by when each symbol was last journaled;
+    a missing journal is empty.
+    """
+    entries = {}
+    try:
+        f = open(path, "r")
+    except OSError:
+        return entries
+    with f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(entry, dict) or "symbol" not in entry:
+                continue
+            entries.pop(entry["symbol"], None)
+            entries[entry["symbol"]] = entry
+    return entries
+
+
+def journal_result(entry):
+    """Convert a journal entry back to a (symbol, success, info, error_msg) tuple."""
+    return (entry["symbol"], entry["success"], entry["info"], entry.get("error"))
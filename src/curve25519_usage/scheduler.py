@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Cost-aware scheduling of graph generation tasks.
+
+Tasks are dispatched longest-first using their expected duration: the wall time
+the symbol took in previous runs (recorded in the graph manifest) or, for symbols
+without history, an estimate from the size of their caller closure. Running the
+expensive sinks first keeps a single heavy symbol from becoming the straggler at
+the end of a run.
+
+Timeouts are sized from the same estimates instead of one fixed constant, and a
+task that times out is re-queued once with a larger budget. The number of workers
+follows the CPU quota the process actually has (CPU affinity and cgroup limits).
+"""
+
+import heapq
+import itertools
+import math
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+
+# Timeout of a task without history, in seconds (the historical per-graph budget)
+DEFAULT_TIMEOUT = 120
+# A task may take this many times its historical duration before it times out
+TIMEOUT_FACTOR = 4
+# Bounds of history-based timeouts, in seconds
+MIN_TIMEOUT = 30
+MAX_TIMEOUT = 1800
+# Budget multiplier for the single retry of a timed-out task
+RETRY_FACTOR = 4
+
+
+def _cgroup_cpu_limit(cgroup_root="/sys/fs/cgroup"):
+    """Get the cgroup CPU quota in CPUs (v2 `cpu.max` or v1 CFS files), or None."""
+    root = Path(cgroup_root)
+    try:
+        quota, period = (root / "cpu.max").read_text().split()[:2]
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        quota = int((root / "cpu" / "cpu.cfs_quota_us").read_text())
+        period = int((root / "cpu" / "cpu.cfs_period_us").read_text())
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def available_cpus(cgroup_root="/sys/fs/cgroup"):
+    """Get the number of CPUs this process may use (affinity mask and cgroup quota)."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    limit = _cgroup_cpu_limit(cgroup_root)
+    if limit is not None:
+        cpus = min(cpus, max(1, math.ceil(limit)))
+    return max(1, cpus)
+
+
+def history_timeout(seconds, default_timeout=DEFAULT_TIMEOUT):
+    """Size the timeout of a task from its historical duration (None: no history)."""
+    if seconds is None:
+        return default_timeout
+    return min(MAX_TIMEOUT, max(MIN_TIMEOUT, TIMEOUT_FACTOR * seconds))
+
+
+def estimate_durations(symbols, history, closure_sizes):
+    """
+    Estimate the duration of every symbol.
+
+    Symbols with history use it. The others are estimated from their caller closure
+    size at the average cost per closure node of the symbols with history, or by
+    the closure size alone (ordering only) when there is no history at all.
+    """
+    known = [symbol for symbol in symbols if history.get(symbol) is not None]
+    known_nodes = sum(closure_sizes.get(symbol, 1) for symbol in known)
+    seconds_per_node = sum(history[symbol] for symbol in known) / known_nodes if known else 1.0
+    return {
+        symbol: (
+            history[symbol]
+            if history.get(symbol) is not None
+            else closure_sizes.get(symbol, 1) * seconds_per_node
+        )
+        for symbol in symbols
+    }
+
+
+class Task:
+    """
+    One unit of work: `payload` is passed to the runner, `key` identifies it.
+
+    Runners may fill `usage` with the resources the task consumed.
+    """
+
+    __slots__ = ("key", "payload", "estimate", "timeout", "attempt", "usage")
+
+    def __init__(self, key, payload, estimate=0.0, timeout=DEFAULT_TIMEOUT):
+        self.key = key
+        self.payload = payload
+        self.estimate = estimate
+        self.timeout = timeout
+        self.attempt = 0
+        self.usage = {}
+
+
+def is_timeout(result):
+    """Check if a (symbol, success, info, error_msg) result is a timeout."""
+    return not result[1] and result[2] == "timeout"
+
+
+class Scheduler:
+    """
+    Run tasks on a fixed number of worker threads, longest expected first.
+
+    `make_runner()` is called once per worker thread and returns a callable
+    `runner(task) -> result`. Optional runner methods: `prepare()` runs before each
+    task outside its measured time (e.g. to start a worker process), and `close()`
+    when the thread finishes. Runners usually drive a subprocess, so threads only
+    wait on I/O. A thread whose `make_runner()` raises leaves the work to the
+    others; if none has a runner, the remaining tasks fail with the error.
+    """
+
+    def __init__(self, num_workers, retry_timeouts=True):
+        self.num_workers = max(1, num_workers)
+        self.retry_timeouts = retry_timeouts
+
+    def run(self, tasks, make_runner):
+        """Yield (task, result, seconds) in completion order."""
+        heap = []
+        sequence = itertools.count()
+        for task in tasks:
+            heapq.heappush(heap, (-task.estimate, next(sequence), task))
+        total = len(heap)
+        remaining = total
+        num_threads = min(self.num_workers, total)
+        live_threads = num_threads
+        condition = threading.Condition()
+        results = queue.Queue()
+
+        def fail_remaining(error):
+            # Called with the condition held when no thread could build a runner
+            nonlocal remaining
+            while heap:
+                task = heapq.heappop(heap)[2]
+                remaining -= 1
+                results.put((task, (task.key, False, f"exception: {error}", error), 0.0))
+            condition.notify_all()
+
+        def work():
+            nonlocal remaining, live_threads
+            try:
+                runner = make_runner()
+            except Exception as e:
+                # The other threads take over; the last one standing fails the rest
+                with condition:
+                    live_threads -= 1
+                    if live_threads == 0:
+                        fail_remaining(str(e))
+                return
+            prepare = getattr(runner, "prepare", None)
+            try:
+                while True:
+                    with condition:
+                        # A running task may still be re-queued after a timeout
+                        while not heap and remaining > 0:
+                            condition.wait()
+                        if not heap:
+                            return
+                        task = heapq.heappop(heap)[2]
+                    start = time.perf_counter()
+                    try:
+                        if prepare is not None:
+                            prepare()
+                            start = time.perf_counter()
+                        result = runner(task)
+                    except Exception as e:
+                        result = (task.key, False, f"exception: {str(e)}", str(e))
+                    seconds = time.perf_counter() - start
+                    with condition:
+                        if self.retry_timeouts and task.attempt == 0 and is_timeout(result):
+                            task.attempt += 1
+                            task.timeout = min(MAX_TIMEOUT, task.timeout * RETRY_FACTOR)
+                            # Known stragglers go first so that they do not end the run
+                            heapq.heappush(heap, (-math.inf, next(sequence), task))
+                        else:
+                            remaining -= 1
+                            results.put((task, result, seconds))
+                        condition.notify_all()
+            finally:
+                close = getattr(runner, "close", None)
+                if close is not None:
+                    close()
+
+        threads = [threading.Thread(target=work, daemon=True) for _ in range(num_threads)]
+        for thread in threads:
+            thread.start()
+        for _ in range(total):
+            yield results.get()
+        for thread in threads:
+            thread.join()
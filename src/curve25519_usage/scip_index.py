@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+"""
+Compiled, cached representation of a SCIP index.
+
+Parsing the SCIP JSON dominates the runtime of every script in this package, so
+the parsed index is stored as a binary snapshot next to the source JSON
+(`<index>.json.snapshot`). The snapshot holds an interned symbol table and, per
+document, the definition and reference occurrences as flat integer arrays, the
+enclosing ranges of the definitions, plus the symbol information (signatures and
+documentation). Each document is stored as a section of its own, so a load
+restricted to some path prefixes only unpickles the documents under them.
+
+The snapshot is keyed by the SHA-256 of the source JSON and rebuilt
+automatically when the JSON changes. Occurrences of document-local symbols
+(`local N`) are not stored since they never take part in cross-document analysis.
+"""
+
+import hashlib
+import os
+import pickle
+import shutil
+import tempfile
+from array import array
+from collections import namedtuple
+from contextlib import contextmanager
+from pathlib import Path
+
+from curve25519_usage.scip_reader import iter_documents, read_metadata
+from curve25519_usage.symbol_catalog import SymbolCatalog
+
+# Bump when the snapshot layout changes to invalidate existing snapshots
+SNAPSHOT_FORMAT = 3
+SNAPSHOT_SUFFIX = ".snapshot"
+
+# Number of integers stored per occurrence:
+# symbol_id, start_line, start_char, end_line, end_char, symbol_roles
+OCCURRENCE_FIELDS = 6
+
+# symbol_roles bit marking a definition occurrence
+DEFINITION_ROLE = 1
+
+# Integers stored per definition for its enclosing range (the whole item, e.g. a
+# function with its body): start_line, start_char, end_line, end_char; all -1
+# when the indexer did not record one
+ENCLOSING_FIELDS = 4
+NO_ENCLOSING_RANGE = (-1, -1, -1, -1)
+
+Occurrence = namedtuple(
+    "Occurrence", ["symbol_id", "start_line", "start_char", "end_line", "end_char", "roles"]
+)
+SymbolInformation = namedtuple(
+    "SymbolInformation", ["symbol_id", "kind", "signature", "documentation"]
+)
+
+
+def normalize_range(range_info):
+    """Convert a SCIP range ([line, start, end] or 4 elements) to 4 elements."""
+    if len(range_info) == 3:
+        return range_info[0], range_info[1], range_info[0], range_info[2]
+    if len(range_info) == 4:
+        return tuple(range_info)
+    return 0, 0, 0, 0
+
+
+def iter_occurrences(values):
+    """Iterate over a flat occurrence array as `Occurrence` tuples."""
+    for i in range(0, len(values), OCCURRENCE_FIELDS):
+        yield Occurrence(*values[i : i + OCCURRENCE_FIELDS])
+
+
+class ScipDocument:
+    """One source file of a SCIP index with its occurrences and symbol information."""
+
+    __slots__ = (
+        "relative_path",
+        "language",
+        "definitions",
+        "references",
+        "symbol_information",
+        "enclosing_ranges",
+    )
+
+    def __init__(
+        self,
+        relative_path,
+        language,
+        definitions,
+        references,
+        symbol_information,
+        enclosing_ranges=None,
+    ):
+        self.relative_path = relative_path
+        self.language = language
+        self.definitions = definitions
+        self.references = references
+        self.symbol_information = symbol_information
+        if enclosing_ranges is None:
+            count = len(definitions) // OCCURRENCE_FIELDS
+            enclosing_ranges = array("i", NO_ENCLOSING_RANGE * count)
+        self.enclosing_ranges = enclosing_ranges
+
+    def iter_definitions(self):
+        """Iterate over definition occurrences in document order."""
+        return iter_occurrences(self.definitions)
+
+    def iter_enclosing_ranges(self):
+        """
+        Iterate over the enclosing range of every definition, in the order of
+        `iter_definitions`, as (start_line, start_char, end_line, end_char) or None.
+        """
+        values = self.enclosing_ranges
+        for i in range(0, len(values), ENCLOSING_FIELDS):
+            extent = tuple(values[i : i + ENCLOSING_FIELDS])
+            yield None if extent == NO_ENCLOSING_RANGE else extent
+
+    def iter_references(self):
+        """Iterate over reference (non-definition) occurrences in document order."""
+        return iter_occurrences(self.references)
+
+
+class ScipIndex:
+    """A SCIP index with an interned symbol table."""
+
+    def __init__(self, metadata, symbols, documents, catalog=None):
+        self.metadata = metadata
+        self.symbols = symbols
+        self.documents = documents
+        # Symbol IDs of the index are the IDs of its catalog
+        self.catalog = catalog if catalog is not None else SymbolCatalog(symbols)
+
+    def symbol(self, symbol_id):
+        """Get the symbol string for an interned symbol ID."""
+        return self.symbols[symbol_id]
+
+    def symbol_id(self, symbol):
+        """Get the interned ID of a symbol string, or None if it is not in the index."""
+        return self.catalog.id(symbol)
+
+    def record(self, symbol_id):
+        """Get the parsed `SymbolRecord` of an interned symbol ID."""
+        return self.catalog.record(symbol_id)
+
+    def iter_documents(self, path_prefixes=None):
+        """Iterate over documents, optionally only those whose path starts with a prefix."""
+        if isinstance(path_prefixes, str):
+            path_prefixes = (path_prefixes,)
+        for doc in self.documents:
+            if path_prefixes is None or doc.relative_path.startswith(tuple(path_prefixes)):
+                yield doc
+
+    @property
+    def project_root(self):
+        """Get the local project root the index was generated from, if recorded."""
+        project_root = self.metadata.get("project_root", "")
+        if project_root.startswith("file://"):
+            return Path(project_root[len("file://") :])
+        return None
+
+    @classmethod
+    def from_scip_data(cls, data):
+        """Build an index from parsed SCIP JSON data."""
+        builder = ScipIndexBuilder(data.get("metadata", {}))
+        for doc in data.get("documents", []):
+            builder.add_document(doc)
+        return builder.build()
+
+    @classmethod
+    def from_json(cls, scip_json_path, path_prefixes=None):
+        """
+        Build an index by streaming a SCIP JSON file one document at a time.
+
+        Documents outside `path_prefixes` are skipped without being decoded.
+        """
+        builder = ScipIndexBuilder(read_metadata(scip_json_path))
+        for doc in iter_documents(scip_json_path, path_prefixes):
+            builder.add_document(doc)
+        return builder.build()
+
+
+class ScipIndexBuilder:
+    """Incrementally intern symbols and compact documents into a `ScipIndex`."""
+
+    def __init__(self, metadata=None):
+        self.metadata = metadata or {}
+        self.catalog = SymbolCatalog()
+        self.documents = []
+
+    def intern(self, symbol):
+        """Get the ID of a symbol, adding it to the symbol table if needed."""
+        return self.catalog.intern(symbol)
+
+    def add_document(self, doc):
+        """Compact one SCIP document (as parsed from JSON), add it to the index and return it."""
+        definitions = array("i")
+        references = array("i")
+        enclosing_ranges = array("i")
+        for occ in doc.get("occurrences", []):
+            symbol = occ.get("symbol", "")
+            if not symbol or symbol.startswith("local "):
+                continue
+            roles = occ.get("symbol_roles", 0)
+            target = definitions if roles & DEFINITION_ROLE else references
+            target.append(self.intern(symbol))
+            target.extend(normalize_range(occ.get("range", [])))
+            target.append(roles)
+            if roles & DEFINITION_ROLE:
+                enclosing_range = occ.get("enclosing_range")
+                enclosing_ranges.extend(
+                    normalize_range(enclosing_range) if enclosing_range else NO_ENCLOSING_RANGE
+                )
+
+        symbol_information = []
+        for info in doc.get("symbols", []):
+            symbol = info.get("symbol", "")
+            if not symbol or symbol.startswith("local "):
+                continue
+            symbol_information.append(
+                SymbolInformation(
+                    self.intern(symbol),
+                    info.get("kind", 0),
+                    info.get("signature_documentation", {}).get("text", ""),
+                    info.get("documentation", []),
+                )
+            )
+
+        document = ScipDocument(
+            doc.get("relative_path", ""),
+            doc.get("language", ""),
+            definitions,
+            references,
+            symbol_information,
+            enclosing_ranges,
+        )
+        self.documents.append(document)
+        return document
+
+    def build(self):
+        """Get the finished index."""
+        return ScipIndex(self.metadata, self.catalog.symbols, self.documents, self.catalog)
+
+
+def snapshot_path(scip_json_path):
+    """Get the snapshot path stored next to a SCIP JSON file."""
+    scip_json_path = Path(scip_json_path)
+    return scip_json_path.with_name(scip_json_path.name + SNAPSHOT_SUFFIX)
+
+
+def file_sha256(path):
+    """Compute the SHA-256 hex digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _source_stamp(scip_json_path):
+    stat = os.stat(scip_json_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _prefix_tuple(path_prefixes):
+    if path_prefixes is None or isinstance(path_prefixes, tuple):
+        return path_prefixes
+    if isinstance(path_prefixes, str):
+        return (path_prefixes,)
+    return tuple(path_prefixes)
+
+
+def _document_fields(doc):
+    return (
+        doc.relative_path,
+        doc.language,
+        doc.definitions,
+        doc.references,
+        doc.symbol_information,
+        doc.enclosing_ranges,
+    )
+
+
+@contextmanager
+def _snapshot_file(path):
+    """Open a temporary file that replaces the snapshot at `path` once written."""
+    # A temporary file of its own, so that concurrent runs do not write into each other's
+    path = Path(path)
+    tmp_file = tempfile.NamedTemporaryFile(
+        "wb", dir=path.parent, prefix=path.name + ".", suffix=".tmp", delete=False
+    )
+    try:
+        with tmp_file as f:
+            yield f
+        os.replace(tmp_file.name, path)
+    except BaseException:
+        if os.path.exists(tmp_file.name):
+            os.unlink(tmp_file.name)
+        raise
+
+
+def _write_header(f, source_sha256, source_stamp):
+    header = {"format": SNAPSHOT_FORMAT, "sha256": source_sha256, "stamp": source_stamp}
+    pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _write_document(f, doc):
+    data = pickle.dumps(_document_fields(doc), protocol=pickle.HIGHEST_PROTOCOL)
+    pickle.dump((doc.relative_path, len(data)), f, protocol=pickle.HIGHEST_PROTOCOL)
+    f.write(data)
+
+
+def _write_trailer(f, metadata, symbols):
+    pickle.dump((None, 0), f, protocol=pickle.HIGHEST_PROTOCOL)
+    pickle.dump((metadata, symbols), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def save_snapshot(index, path, source_sha256, source_stamp):
+    """
+    Write an index snapshot atomically.
+
+    After the header, each document is a section of its own, (relative_path, size)
+    followed by `size` bytes, so that `load_snapshot` can skip the documents it
+    does not need; the metadata and the symbol table come last.
+    """
+    with _snapshot_file(path) as f:
+        _write_header(f, source_sha256, source_stamp)
+        for doc in index.documents:
+            _write_document(f, doc)
+        _write_trailer(f, index.metadata, index.symbols)
+
+
+def build_snapshot(scip_json_path, path, source_sha256, source_stamp, path_prefixes=None):
+    """
+    Stream a SCIP JSON file into a snapshot, one document at a time.
+
+    Returns the index with only the documents under `path_prefixes` (all if None),
+    so memory stays proportional to those even while the snapshot is rebuilt.
+    """
+    prefixes = _prefix_tuple(path_prefixes)
+    builder = ScipIndexBuilder(read_metadata(scip_json_path))
+    with _snapshot_file(path) as f:
+        _write_header(f, source_sha256, source_stamp)
+        for doc in iter_documents(scip_json_path):
+            document = builder.add_document(doc)
+            _write_document(f, document)
+            if prefixes is not None and not document.relative_path.startswith(prefixes):
+                builder.documents.pop()
+        _write_trailer(f, builder.metadata, builder.catalog.symbols)
+    return builder.build()
+
+
+def restamp_snapshot(path, source_sha256, source_stamp):
+    """Rewrite the header of a snapshot, copying its sections unchanged."""
+    with open(path, "rb") as source, _snapshot_file(path) as f:
+        pickle.load(source)  # header
+        _write_header(f, source_sha256, source_stamp)
+        shutil.copyfileobj(source, f)
+
+
+def read_snapshot_header(path):
+    """Read the header of a snapshot, or None if it is missing or unreadable."""
+    try:
+        with open(path, "rb") as f:
+            header = pickle.load(f)
+    except Exception:
+        # Truncated or foreign pickles raise anything from EOFError to ImportError
+        return None
+    return header if isinstance(header, dict) else None
+
+
+def load_snapshot(path, path_prefixes=None):
+    """
+    Load the index stored in a snapshot file.
+
+    Only the documents under `path_prefixes` (all if None) are unpickled; the
+    sections of the others are skipped. The symbol table is always complete.
+    """
+    prefixes = _prefix_tuple(path_prefixes)
+    documents = []
+    with open(path, "rb") as f:
+        pickle.load(f)  # header
+        while True:
+            relative_path, size = pickle.load(f)
+            if relative_path is None:
+                break
+            if prefixes is None or relative_path.startswith(prefixes):
+                data = f.read(size)
+                if len(data) != size:
+                    raise EOFError(f"truncated snapshot: {path}")
+                documents.append(ScipDocument(*pickle.loads(data)))
+            else:
+                f.seek(size, os.SEEK_CUR)
+        metadata, symbols = pickle.load(f)
+    return ScipIndex(metadata, symbols, documents)
+
+
+def load_index(scip_json_path, use_cache=True, path_prefixes=None):
+    """
+    Load a SCIP index, using the snapshot next to the JSON when it is up to date.
+
+    The snapshot is trusted without hashing when the JSON size and mtime match the
+    ones recorded at build time; otherwise the JSON is hashed and the snapshot is
+    rebuilt only if the content changed.
+
+    `path_prefixes` restricts the documents of the returned index. Only those are
+    kept in memory, whether they are read from the snapshot or while streaming the
+    JSON (with or without rebuilding the snapshot).
+    """
+    if not use_cache:
+        return ScipIndex.from_json(scip_json_path, path_prefixes)
+    cache_path = snapshot_path(scip_json_path)
+    stamp = _source_stamp(scip_json_path)
+    header = read_snapshot_header(cache_path)
+
+    source_sha256 = None
+    if header is not None and header.get("format") == SNAPSHOT_FORMAT:
+        if tuple(header.get("stamp", ())) == stamp:
+            index = _try_load_snapshot(cache_path, path_prefixes)
+            if index is not None:
+                return index
+        else:
+            source_sha256 = file_sha256(scip_json_path)
+            if header.get("sha256") == source_sha256:
+                index = _try_load_snapshot(cache_path, path_prefixes)
+                if index is not None:
+                    _try_save(restamp_snapshot, cache_path, source_sha256, stamp)
+                    return index
+
+    source_sha256 = source_sha256 or file_sha256(scip_json_path)
+    try:
+        return build_snapshot(scip_json_path, cache_path, source_sha256, stamp, path_prefixes)
+    except OSError as e:
+        print(f"Warning: could not write SCIP snapshot {cache_path}: {e}")
+        return ScipIndex.from_json(scip_json_path, path_prefixes)
+
+
+def _try_load_snapshot(cache_path, path_prefixes=None):
+    """Load a snapshot, or None if its body is truncated or unreadable."""
+    try:
+        return load_snapshot(cache_path, path_prefixes)
+    except Exception:
+        return None
+
+
+def _try_save(write, cache_path, source_sha256, stamp):
+    """Run a snapshot writer, ignoring failures such as a read-only data directory."""
+    try:
+        write(cache_path, source_sha256, stamp)
+    except OSError as e:
+        print(f"Warning: could not write SCIP snapshot {cache_path}: {e}")
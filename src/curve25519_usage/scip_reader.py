@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Streaming reader for SCIP index JSON files.
+
+`json.load` materialises every occurrence of every document at once, which does
+not fit in memory for the libsignal-wide dependency index. This reader scans the
+file in fixed-size chunks and decodes one document at a time. Documents whose
+`relative_path` does not match the requested prefixes are skipped while scanning,
+without building their occurrence lists, so peak memory is bounded by the
+largest matching document rather than by the size of the index.
+"""
+
+import json
+import re
+
+# Characters that change the JSON structure, plus string delimiters
+_STRUCTURAL = re.compile(r'["{}\[\],]')
+# Remainder of a JSON string after its opening quote, up to the closing quote
+_STRING_TAIL = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"')
+# Next character that is neither whitespace nor a key/value separator
+_SIGNIFICANT = re.compile(r"[^\s:]")
+# End of a number or literal
+_SCALAR_END = re.compile(r"[,}\]\s]")
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+
+class _JsonStream:
+    """Chunked tokenizer over a JSON text file with optional capture of raw text."""
+
+    def __init__(self, f, chunk_size=DEFAULT_CHUNK_SIZE):
+        self._f = f
+        self._chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self._pieces = None
+        self._capture_start = 0
+
+    def _fill(self):
+        """Read the next chunk, keeping unconsumed and captured text. Returns False at EOF."""
+        chunk = self._f.read(self._chunk_size)
+        if not chunk:
+            return False
+        if self._pieces is not None:
+            self._pieces.append(self.buf[self._capture_start : self.pos])
+            self._capture_start = 0
+        self.buf = self.buf[self.pos :] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Get the next significant character without consuming it, or None at EOF."""
+        while True:
+            match = _SIGNIFICANT.search(self.buf, self.pos)
+            if match:
+                self.pos = match.start()
+                return self.buf[self.pos]
+            self.pos = len(self.buf)
+            if not self._fill():
+                return None
+
+    def advance(self):
+        """Consume one character."""
+        self.pos += 1
+
+    def next_token(self):
+        """
+        Consume and return the next structural token as (char, text).
+
+        `text` is the raw JSON string (with quotes) for string tokens and the
+        character itself otherwise. Returns None at EOF.
+        """
+        while True:
+            match = _STRUCTURAL.search(self.buf, self.pos)
+            if match is None:
+                self.pos = len(self.buf)
+                if not self._fill():
+                    return None
+                continue
+            start = match.start()
+            char = self.buf[start]
+            if char != '"':
+                self.pos = start + 1
+                return char, char
+            tail = _STRING_TAIL.match(self.buf, start + 1)
+            if tail is None:
+                self.pos = start
+                if not self._fill():
+                    raise ValueError("Unterminated string in SCIP JSON")
+                continue
+            self.pos = tail.end()
+            return char, self.buf[start : self.pos]
+
+    def skip_scalar(self):
+        """Consume a number or literal (true, false, null)."""
+        while True:
+            match = _SCALAR_END.search(self.buf, self.pos)
+            if match:
+                self.pos = match.start()
+                return
+            self.pos = len(self.buf)
+            if not self._fill():
+                return
+
+    def start_capture(self):
+        """Start recording raw text from the current position."""
+        self._pieces = []
+        self._capture_start = self.pos
+
+    def end_capture(self):
+        """Stop recording and return the raw text captured so far."""
+        text = "".join(self._pieces) + self.buf[self._capture_start : self.pos]
+        self._pieces = None
+        return text
+
+    def cancel_capture(self):
+        """Stop recording and discard the captured text."""
+        self._pieces = None
+
+
+def _skip_value(stream, capture=False):
+    """Consume one JSON value, returning its raw text when `capture` is set."""
+    char = stream.peek()
+    if char is None:
+        raise ValueError("Unexpected end of SCIP JSON")
+    if capture:
+        stream.start_capture()
+    if char in "{[":
+        depth = 0
+        while True:
+            token = stream.next_token()
+            if token is None:
+                raise ValueError("Unexpected end of SCIP JSON")
+            if token[0] in "{[":
+                depth += 1
+            elif token[0] in "}]":
+                depth -= 1
+                if depth == 0:
+                    break
+    elif char == '"':
+        stream.next_token()
+    else:
+        stream.skip_scalar()
+    return stream.end_capture() if capture else None
+
+
+def _read_document(stream, path_prefixes):
+    """
+    Consume one document object, returning it decoded if its path matches.
+
+    Keys of the document object are tracked at nesting depth 1 so that the
+    `relative_path` value can be checked as soon as it is seen; from then on a
+    non-matching document is only scanned, not recorded.
+    """
+    stream.start_capture()
+    keep = True
+    relative_path = None
+    depth = 0
+    expect_key = False
+    want_path = False
+    while True:
+        token = stream.next_token()
+        if token is None:
+            raise ValueError("Unexpected end of SCIP JSON")
+        char, text = token
+        if char == '"':
+            if depth == 1:
+                if expect_key:
+                    expect_key = False
+                    want_path = text == '"relative_path"'
+                elif want_path:
+                    want_path = False
+                    relative_path = json.loads(text)
+                    if path_prefixes is not None and not relative_path.startswith(path_prefixes):
+                        keep = False
+                        stream.cancel_capture()
+        elif char in "{[":
+            depth += 1
+            expect_key = char == "{" and depth == 1
+            want_path = False
+        elif char in "}]":
+            depth -= 1
+            if depth == 0:
+                break
+        elif char == "," and depth == 1:
+            expect_key = True
+
+    if keep and relative_path is None and path_prefixes is not None:
+        keep = False
+        stream.cancel_capture()
+    if not keep:
+        return None
+    return json.loads(stream.end_capture())
+
+
+def _normalize_prefixes(path_prefixes):
+    if path_prefixes is None:
+        return None
+    if isinstance(path_prefixes, str):
+        return (path_prefixes,)
+    return tuple(path_prefixes)
+
+
+def _iter_top_level(stream):
+    """Yield the top-level keys of the index object, leaving the stream at each value."""
+    if stream.peek() != "{":
+        return
+    stream.advance()
+    while True:
+        token = stream.next_token()
+        if token is None or token[0] == "}":
+            return
+        if token[0] == ",":
+            continue
+        if token[0] != '"':
+            raise ValueError(f"Unexpected {token[1]!r} in SCIP JSON")
+        yield json.loads(token[1])
+
+
+def iter_documents(scip_json_path, path_prefixes=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield the documents of a SCIP index one at a time, as parsed JSON dicts.
+
+    Args:
+        scip_json_path: Path to the SCIP index JSON
+        path_prefixes: Only yield documents whose relative_path starts with one of
+            these prefixes (a string or a sequence of strings); None yields all
+        chunk_size: Number of characters read from the file at a time
+    """
+    path_prefixes = _normalize_prefixes(path_prefixes)
+    with open(scip_json_path, "r") as f:
+        stream = _JsonStream(f, chunk_size)
+        for key in _iter_top_level(stream):
+            if key != "documents":
+                _skip_value(stream)
+                continue
+            if stream.peek() != "[":
+                raise ValueError("SCIP JSON 'documents' is not a list")
+            stream.advance()
+            while True:
+                char = stream.peek()
+                if char == "]":
+                    stream.advance()
+                    break
+                if char == ",":
+                    stream.advance()
+                    continue
+                if char != "{":
+                    raise ValueError("Unexpected end of SCIP JSON documents")
+                doc = _read_document(stream, path_prefixes)
+                if doc is not None:
+                    yield doc
+
+
+def read_metadata(scip_json_path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Read the `metadata` object of a SCIP index without reading its documents."""
+    with open(scip_json_path, "r") as f:
+        stream = _JsonStream(f, chunk_size)
+        for key in _iter_top_level(stream):
+            if key == "metadata":
+                return json.loads(_skip_value(stream, capture=True))
+            _skip_value(stream)
+    return {}
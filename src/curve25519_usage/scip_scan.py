@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Single-pass scan of a SCIP index shared by several consumers.
+
+Each consumer is a `ScipVisitor` that declares which documents it needs and
+receives them one at a time. `scan_index` loads the index once (from its
+snapshot, or by streaming the JSON) and runs every visitor in the same traversal
+of the documents, so a full refresh of all derived outputs reads and parses the
+index only once.
+"""
+
+from curve25519_usage.scip_index import load_index
+
+
+class ScipVisitor:
+    """Base class for consumers of a SCIP document scan."""
+
+    # Documents this visitor needs (a prefix string or tuple); None means all documents
+    path_prefixes = None
+
+    def wants(self, relative_path):
+        """Check if this visitor should see the document at `relative_path`."""
+        prefixes = self.path_prefixes
+        if prefixes is None:
+            return True
+        if isinstance(prefixes, str):
+            prefixes = (prefixes,)
+        return relative_path.startswith(tuple(prefixes))
+
+    def visit_document(self, index, doc):
+        """Process one `ScipDocument`; symbol IDs resolve through `index`."""
+        raise NotImplementedError
+
+    def finish(self, index):
+        """Called once after all documents have been visited."""
+
+
+def _combined_prefixes(visitors):
+    """Get the union of the visitors' path prefixes, or None if any needs all documents."""
+    prefixes = []
+    for visitor in visitors:
+        if visitor.path_prefixes is None:
+            return None
+        if isinstance(visitor.path_prefixes, str):
+            prefixes.append(visitor.path_prefixes)
+        else:
+            prefixes.extend(visitor.path_prefixes)
+    return tuple(prefixes)
+
+
+def scan_index(scip_json_path, visitors, use_cache=True):
+    """
+    Run all `visitors` over the documents of a SCIP index in one traversal.
+
+    Returns the visitors, so results can be read from them directly.
+    """
+    index = load_index(scip_json_path, use_cache, path_prefixes=_combined_prefixes(visitors))
+    for doc in index.documents:
+        for visitor in visitors:
+            if visitor.wants(doc.relative_path):
+                visitor.visit_document(index, doc)
+    for visitor in visitors:
+        visitor.finish(index)
+    return visitors
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Interned catalog of SCIP symbols.
+
+Every SCIP symbol string is interned once and given a compact integer ID; its
+parsed fields are stored in a `SymbolRecord` that is built the first time it is
+needed. Sets, joins and graph traversals can then work on integer IDs instead of
+100-byte symbol strings, and each symbol is parsed at most once per catalog. A
+catalog is owned by the index or call graph whose symbols it holds and is freed
+with it; `parse_symbol` parses symbols outside any catalog through a bounded cache.
+
+Symbols follow the SCIP grammar
+`<scheme> <manager> <package> <version> <descriptors>`, for example
+`rust-analyzer cargo curve25519-dalek 4.1.3 scalar/impl#[Scalar][Mul]mul().`
+where rust-analyzer encodes impl blocks as the type `impl` with the implementing
+type and trait as type parameters.
+"""
+
+import re
+from functools import lru_cache
+
+# Characters that end a simple (not backtick-escaped) descriptor name
+_NAME_END = re.compile(r"[/#.:!(\[]")
+# Names that can be written in a symbol without backtick escaping
+_SIMPLE_NAME = re.compile(r"^[A-Za-z0-9_+$-]+$")
+
+
+class SymbolRecord:
+    """Parsed fields of one SCIP symbol."""
+
+    __slots__ = (
+        "id",
+        "symbol",
+        "scheme",
+        "crate",
+        "version",
+        "descriptor",
+        "module",
+        "owner_type",
+        "impl_type",
+        "trait",
+        "name",
+        "kind",
+    )
+
+    def __init__(self, symbol_id, symbol):
+        self.id = symbol_id
+        self.symbol = symbol
+        self.scheme = None
+        self.crate = None
+        self.version = None
+        self.descriptor = None  # everything after the version, e.g. 'scalar/impl#[Scalar]add().'
+        self.module = None  # namespace path, e.g. 'backend/serial/u64/scalar'
+        self.owner_type = None  # type the symbol is declared on, e.g. 'EdwardsPoint'
+        self.impl_type = None  # implementing type of an impl block, e.g. 'Scalar52'
+        self.trait = None  # implemented trait of an impl block, e.g. 'Identity'
+        self.name = None  # last descriptor name, e.g. 'add'
+        self.kind = None  # module, type, method, function, const, constant, macro, local, ...
+
+    @property
+    def is_callable(self):
+        """Check if the symbol is a function or method."""
+        return self.kind in ("method", "function")
+
+    @property
+    def last_segment(self):
+        """Get the descriptor text after the namespace path, e.g. 'impl#[Scalar]add().'."""
+        if self.descriptor is None:
+            return None
+        return split_namespaces(self.descriptor)[1]
+
+    def __repr__(self):
+        return f"SymbolRecord({self.id}, {self.symbol!r}, kind={self.kind!r})"
+
+
+def escape_name(name):
+    """Escape a descriptor name with backticks when SCIP requires it."""
+    if _SIMPLE_NAME.match(name):
+        return name
+    return "`" + name.replace("`", "``") + "`"
+
+
+def _read_escaped(text, i):
+    """Read a backtick-escaped name starting at text[i] == '`'. Returns (name, next_index)."""
+    parts = []
+    i += 1
+    while i < len(text):
+        end = text.find("`", i)
+        if end < 0:
+            parts.append(text[i:])
+            return "".join(parts), len(text)
+        parts.append(text[i:end])
+        if text.startswith("``", end):
+            parts.append("`")
+            i = end + 2
+            continue
+        return "".join(parts), end + 1
+    return "".join(parts), i
+
+
+def _read_until(text, i, closing):
+    """Read a (possibly backtick-escaped) name up to `closing`. Returns (name, next_index)."""
+    if i < len(text) and text[i] == "`":
+        name, i = _read_escaped(text, i)
+    else:
+        end = text.find(closing, i)
+        end = len(text) if end < 0 else end
+        name, i = text[i:end], end
+    if i < len(text) and text[i] == closing:
+        i += 1
+    return name, i
+
+
+def split_namespaces(descriptor):
+    """
+    Split a descriptor into its namespace names and the remaining segment.
+
+    Namespace separators inside backticks or type parameter brackets are ignored.
+    """
+    namespaces = []
+    start = 0
+    depth = 0
+    i = 0
+    while i < len(descriptor):
+        char = descriptor[i]
+        if char == "`":
+            _, i = _read_escaped(descriptor, i)
+            continue
+        if char == "[":
+            depth += 1
+        elif char == "]":
+            depth -= 1
+        elif char == "/" and depth == 0:
+            name = descriptor[start:i]
+            if name.startswith("`") and name.endswith("`"):
+                name, _ = _read_escaped(name, 0)
+            namespaces.append(name)
+            start = i + 1
+        i += 1
+    return namespaces, descriptor[start:]
+
+
+def parse_descriptors(segment):
+    """
+    Parse the descriptors of a symbol segment into (suffix, name) pairs.
+
+    Suffixes: '#' type, '.' term, '()' method, '!' macro, ':' meta,
+    '[]' type parameter, '(' parameter.
+    """
+    descriptors = []
+    i = 0
+    while i < len(segment):
+        char = segment[i]
+        if char == "[":
+            name, i = _read_until(segment, i + 1, "]")
+            descriptors.append(("[]", name))
+            continue
+        if char == "(":
+            name, i = _read_until(segment, i + 1, ")")
+            descriptors.append(("(", name))
+            continue
+        if char == "`":
+            name, i = _read_escaped(segment, i)
+        else:
+            match = _NAME_END.search(segment, i)
+            end = match.start() if match else len(segment)
+            name, i = segment[i:end], end
+        if i >= len(segment):
+            descriptors.append((".", name))
+            break
+        suffix = segment[i]
+        if suffix == "(":
+            # Method: name(disambiguator).
+            end = segment.find(")", i)
+            i = len(segment) if end < 0 else end + 1
+            if i < len(segment) and segment[i] == ".":
+                i += 1
+            descriptors.append(("()", name))
+        elif suffix in "#.!:":
+            descriptors.append((suffix, name))
+            i += 1
+        else:
+            # A '[' directly after a name is read on the next iteration;
+            # skip stray separators so that malformed input always advances
+            descriptors.append((".", name))
+            if not name:
+                i += 1
+    return descriptors
+
+
+def parse_symbol_record(record):
+    """Fill in the parsed fields of a `SymbolRecord` from its symbol string."""
+    symbol = record.symbol
+    if symbol.startswith("local "):
+        record.scheme = "local"
+        record.kind = "local"
+        record.name = symbol[len("local ") :]
+        return record
+
+    parts = symbol.split(" ", 4)
+    if len(parts) < 5:
+        return record
+    record.scheme, _manager, record.crate, record.version, record.descriptor = parts
+
+    namespaces, segment = split_namespaces(record.descriptor)
+    record.module = "/".join(namespaces) or None
+    if not segment:
+        record.kind = "module"
+        record.name = namespaces[-1] if namespaces else None
+        return record
+
+    descriptors = parse_descriptors(segment)
+    types = []
+    in_impl = False
+    type_parameters = []
+    for suffix, name in descriptors[:-1]:
+        if suffix == "#":
+            types.append(name)
+            in_impl = name == "impl"
+            type_parameters = []
+        elif suffix == "[]" and in_impl:
+            type_parameters.append(name)
+
+    last_suffix, last_name = descriptors[-1]
+    if last_suffix == "[]" and in_impl:
+        # An impl block itself, e.g. 'impl#[Scalar][Identity]'
+        type_parameters.append(last_name)
+        last_suffix, last_name = "#", "impl"
+        types = types[:-1]
+
+    if in_impl or (last_suffix == "#" and last_name == "impl"):
+        record.impl_type = type_parameters[0] if type_parameters else None
+        record.trait = type_parameters[1] if len(type_parameters) > 1 else None
+    owner_types = [name for name in types if name != "impl"]
+    record.owner_type = record.impl_type or (owner_types[-1] if owner_types else None)
+
+    record.name = last_name
+    if last_suffix == "()":
+        record.kind = "method" if types else "function"
+    elif last_suffix == "#":
+        record.kind = "impl" if last_name == "impl" else "type"
+    elif last_suffix == ".":
+        record.kind = "const" if types else "constant"
+    elif last_suffix == "!":
+        record.kind = "macro"
+    elif last_suffix == ":":
+        record.kind = "meta"
+    elif last_suffix == "[]":
+        record.kind = "type_parameter"
+    else:
+        record.kind = "parameter"
+    return record
+
+
+class SymbolCatalog:
+    """Intern SCIP symbols as integer IDs with lazily parsed records."""
+
+    def __init__(self, symbols=None):
+        self.symbols = symbols if symbols is not None else []
+        self._ids = None
+        self._records = {}
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def _id_map(self):
+        if self._ids is None:
+            self._ids = {symbol: i for i, symbol in enumerate(self.symbols)}
+        return self._ids
+
+    def intern(self, symbol):
+        """Get the ID of a symbol, adding it to the catalog if needed."""
+        ids = self._id_map()
+        symbol_id = ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = len(self.symbols)
+            ids[symbol] = symbol_id
+            self.symbols.append(symbol)
+        return symbol_id
+
+    def id(self, symbol):
+        """Get the ID of a symbol, or None if it has not been interned."""
+        return self._id_map().get(symbol)
+
+    def symbol(self, symbol_id):
+        """Get the symbol string of an ID."""
+        return self.symbols[symbol_id]
+
+    def record(self, symbol_id):
+        """Get the parsed record of a symbol ID."""
+        record = self._records.get(symbol_id)
+        if record is None:
+            record = parse_symbol_record(SymbolRecord(symbol_id, self.symbols[symbol_id]))
+            self._records[symbol_id] = record
+        return record
+
+    def lookup(self, symbol):
+        """Intern a symbol string and get its parsed record."""
+        return self.record(self.intern(symbol))
+
+
+# Number of records `parse_symbol` keeps; symbol sets that live as long as an
+# index belong in that index's catalog instead
+PARSE_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_symbol(symbol):
+    """
+    Get the parsed record of a symbol string outside any catalog, e.g. a node ID
+    read back from a DOT file. The record has no ID; do not modify it.
+    """
+    return parse_symbol_record(SymbolRecord(None, symbol))
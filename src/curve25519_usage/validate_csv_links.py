@@ -5,16 +5,346 @@ Validate GitHub links in the curve25519_functions.csv file.
 This script checks each GitHub link in the CSV to ensure it doesn't return a 404 error.
 It reports any broken links and provides a summary of the validation results.
 
-Uses parallel processing to speed up validation.
+Links that differ only in their `#L` anchor point at the same page, so every page
+is checked once, with HEAD requests over a bounded number of keep-alive
+connections; a Retry-After from a rate-limited response is honoured.
+
+With `--offline` no request is sent: each link is checked against the local SCIP
+index instead (the file is a document of the index, the line is within it, and a
+definition of the row's function starts at that line).
 """
 
+import argparse
 import csv
-from pathlib import Path
-from typing import Tuple
-import urllib.request
-import urllib.error
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import datetime
+import email.utils
+import http.client
+import json
+import os
+import re
 import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import chain
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from curve25519_usage.definition_index import DefinitionIndex
+from curve25519_usage.generate_functions_csv import parse_github_link
+from curve25519_usage.scip_index import load_index
+
+
+# Seconds to wait at most for one Retry-After, and attempts per URL
+MAX_RETRY_AFTER = 60
+MAX_ATTEMPTS = 4
+MAX_REDIRECTS = 5
+USER_AGENT = "Mozilla/5.0"
+
+# Link check results, kept next to the CSV
+LINK_CACHE_FILE = "link_check_cache.json"
+LINK_CACHE_FORMAT = 1
+CACHED_STATUSES = (200, 404, 410)
+# Seconds a cached result stays fresh
+DEFAULT_MAX_AGE = 24 * 3600
+IMMUTABLE_MAX_AGE = 30 * 24 * 3600
+# Links into a release tag (e.g. curve25519-4.1.3, v1.2) or a commit
+IMMUTABLE_GITHUB_URL = re.compile(
+    r"https://github\.com/[^/]+/[^/]+/(?:tree|blob)/"
+    r"(?:[0-9a-f]{40}|[A-Za-z0-9._-]*[0-9]+\.[0-9]+[A-Za-z0-9._-]*)/"
+)
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Get the delay of a Retry-After header (seconds or an HTTP date), or None."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=datetime.timezone.utc)
+    return max(0.0, (when - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+
+def link_result(status: int) -> Tuple[bool, int, str]:
+    """Get the (success, status_code, error_message) of an HTTP status."""
+    if status == 200:
+        return (True, status, "")
+    return (False, status, f"HTTP Error {status}: {http.client.responses.get(status, '')}")
+
+
+def parse_duration(text: str) -> float:
+    """Parse a duration in seconds, or with an s/m/h/d suffix (e.g. `7d`)."""
+    text = text.strip()
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    factor = units.get(text[-1:].lower())
+    try:
+        return float(text[:-1] if factor else text) * (factor or 1)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid duration: {text!r}")
+
+
+def is_immutable_url(url: str) -> bool:
+    """Check if a GitHub URL points into a release tag or a commit, not a branch."""
+    return IMMUTABLE_GITHUB_URL.match(url) is not None
+
+
+class LinkCheckCache:
+    """
+    Per-URL link check results on disk, with the ETag and Last-Modified of each
+    response.
+
+    An entry is fresh for `max_age` seconds; by default 1 day, and 30 days for
+    URLs into a release tag or commit, whose content does not change. A stale
+    entry with a validator is revalidated with a conditional request, so an
+    unchanged page costs a 304 instead of a full check. Only definite results
+    (200, 404, 410) are cached.
+    """
+
+    def __init__(self, path: Path, max_age: Optional[float] = None, now=time.time):
+        self.path = Path(path)
+        self.max_age = max_age
+        self.now = now
+        self.hits = self.revalidations = self.fetches = 0
+        self._lock = threading.Lock()
+        self._changed = False
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        self.entries = data.get("urls", {}) if data.get("format") == LINK_CACHE_FORMAT else {}
+
+    def entry_max_age(self, url: str) -> float:
+        """Get how long a result for `url` stays fresh, in seconds."""
+        if self.max_age is not None:
+            return self.max_age
+        return IMMUTABLE_MAX_AGE if is_immutable_url(url) else DEFAULT_MAX_AGE
+
+    def _result(self, entry) -> Tuple[bool, int, str]:
+        return link_result(entry["status"])
+
+    def fresh_result(self, url: str) -> Optional[Tuple[bool, int, str]]:
+        """Get the cached result of `url` if it is still fresh."""
+        with self._lock:
+            entry = self.entries.get(url)
+            if entry is None or self.now() - entry["checked"] >= self.entry_max_age(url):
+                return None
+            self.hits += 1
+            return self._result(entry)
+
+    def validators(self, url: str) -> Dict[str, str]:
+        """Get the conditional request headers for revalidating `url`."""
+        with self._lock:
+            entry = self.entries.get(url) or {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def revalidated(self, url: str) -> Tuple[bool, int, str]:
+        """Record a 304 for `url`: the cached result holds for another `max_age`."""
+        with self._lock:
+            entry = self.entries[url]
+            entry["checked"] = self.now()
+            self.revalidations += 1
+            self._changed = True
+            return self._result(entry)
+
+    def store(self, url: str, result: Tuple[bool, int, str], headers) -> None:
+        """Record the result of a full check of `url`."""
+        with self._lock:
+            self.fetches += 1
+            status = result[1]
+            if status not in CACHED_STATUSES:
+                return
+            self.entries[url] = {
+                "status": status,
+                "checked": self.now(),
+                "etag": headers.get("ETag"),
+                "last_modified": headers.get("Last-Modified"),
+            }
+            self._changed = True
+
+    def save(self) -> None:
+        """Write the cache atomically if it changed, ignoring a read-only directory."""
+        if not self._changed:
+            return
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"format": LINK_CACHE_FORMAT, "urls": self.entries}, f, indent=1)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Warning: could not write link check cache {self.path}: {e}")
+        self._changed = False
+
+
+class HttpLinkChecker:
+    """
+    Check URLs over persistent keep-alive connections, one per worker thread and
+    host, with at most `max_workers` requests in flight.
+
+    Each URL gets a HEAD request; servers that do not support HEAD get a GET,
+    whose body is not downloaded (the connection is dropped instead). Redirects
+    are followed, and a 429 or 503 response (or a 403 with Retry-After, GitHub's
+    secondary rate limit) is retried after the delay its Retry-After asks for.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 10,
+        timeout: float = 10,
+        max_attempts: int = MAX_ATTEMPTS,
+        sleep=time.sleep,
+    ):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.sleep = sleep
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def _connection(self, scheme: str, netloc: str):
+        connections = getattr(self._local, "connections", None)
+        if connections is None:
+            connections = self._local.connections = {}
+        key = (scheme, netloc)
+        connection = connections.get(key)
+        if connection is None:
+            if scheme == "https":
+                connection = http.client.HTTPSConnection(netloc, timeout=self.timeout)
+            else:
+                connection = http.client.HTTPConnection(netloc, timeout=self.timeout)
+            connections[key] = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def _drop_connection(self, scheme: str, netloc: str) -> None:
+        connection = self._local.connections.pop((scheme, netloc), None)
+        if connection is not None:
+            connection.close()
+
+    def _send(self, method: str, parts: urllib.parse.SplitResult, headers: Dict[str, str]):
+        target = urllib.parse.urlunsplit(("", "", parts.path or "/", parts.query, ""))
+        connection = self._connection(parts.scheme, parts.netloc)
+        try:
+            connection.request(method, target, headers=dict(headers, **{"User-Agent": USER_AGENT}))
+            return connection.getresponse()
+        except (OSError, http.client.HTTPException):
+            self._drop_connection(parts.scheme, parts.netloc)
+            raise
+
+    def request(
+        self, method: str, url: str, headers: Optional[Dict[str, str]] = None
+    ) -> Tuple[int, http.client.HTTPMessage]:
+        """
+        Send one request on this thread's connection to the URL's host and get
+        (status, headers).
+        """
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"unsupported URL: {url}")
+        headers = headers or {}
+        try:
+            response = self._send(method, parts, headers)
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            # The server closed the kept-alive connection in between; reopen it once
+            response = self._send(method, parts, headers)
+        if method == "HEAD" or response.status in (204, 304):
+            response.read()
+        else:
+            # Do not download the body; the connection cannot be reused then
+            self._drop_connection(parts.scheme, parts.netloc)
+        if response.will_close:
+            self._drop_connection(parts.scheme, parts.netloc)
+        return response.status, response.headers
+
+    def _fetch_once(self, url: str, headers: Dict[str, str]) -> Tuple[int, http.client.HTTPMessage]:
+        """HEAD a URL, falling back to GET, and follow redirects."""
+        for _ in range(MAX_REDIRECTS + 1):
+            status, response_headers = self.request("HEAD", url, headers)
+            if status in (405, 501):
+                status, response_headers = self.request("GET", url, headers)
+            location = response_headers.get("Location")
+            if status in (301, 302, 303, 307, 308) and location:
+                url = urllib.parse.urljoin(url, location)
+                continue
+            return status, response_headers
+        raise ValueError(f"more than {MAX_REDIRECTS} redirects")
+
+    def fetch(
+        self, url: str, headers: Optional[Dict[str, str]] = None
+    ) -> Tuple[int, http.client.HTTPMessage]:
+        """
+        Get the (status, headers) of a URL, waiting out rate limits.
+
+        Raises OSError, ValueError or http.client.HTTPException if it cannot be
+        fetched at all.
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            status, response_headers = self._fetch_once(url, headers or {})
+            delay = retry_after_seconds(response_headers.get("Retry-After"))
+            rate_limited = status in (429, 503) or (status == 403 and delay is not None)
+            if not rate_limited or attempt == self.max_attempts:
+                break
+            self.sleep(min(delay if delay is not None else 2**attempt, MAX_RETRY_AFTER))
+        return status, response_headers
+
+    def check(self, url: str, cache: Optional[LinkCheckCache] = None) -> Tuple[bool, int, str]:
+        """
+        Check if a URL is accessible.
+
+        With a `cache`, a fresh cached result is returned without a request and a
+        stale one is revalidated with a conditional request.
+
+        Returns:
+            Tuple of (success, status_code, error_message)
+        """
+        if cache is not None:
+            result = cache.fresh_result(url)
+            if result is not None:
+                return result
+        validators = cache.validators(url) if cache is not None else {}
+        try:
+            status, headers = self.fetch(url, validators)
+        except (OSError, ValueError, http.client.HTTPException) as e:
+            return (False, 0, f"Error: {str(e)}")
+        if status == 304 and validators:
+            return cache.revalidated(url)
+        result = link_result(status)
+        if cache is not None:
+            cache.store(url, result, headers)
+        return result
+
+    def check_all(self, urls: List[str], cache: Optional[LinkCheckCache] = None):
+        """Check every URL, `max_workers` at a time; yield (url, result) as they finish."""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.check, url, cache): url for url in urls}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+    def close(self) -> None:
+        """Close every connection opened by any worker."""
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
 
 def check_url(url: str, timeout: int = 10) -> Tuple[bool, int, str]:
@@ -28,105 +358,170 @@ def check_url(url: str, timeout: int = 10) -> Tuple[bool, int, str]:
     Returns:
         Tuple of (success, status_code, error_message)
     """
-    try:
-        req = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"})
-        with urllib.request.urlopen(req, timeout=timeout) as response:
-            status_code = response.getcode()
-            return (status_code == 200, status_code, "")
-    except urllib.error.HTTPError as e:
-        return (False, e.code, str(e))
-    except urllib.error.URLError as e:
-        return (False, 0, f"URL Error: {e.reason}")
-    except Exception as e:
-        return (False, 0, f"Error: {str(e)}")
+    with HttpLinkChecker(max_workers=1, timeout=timeout) as checker:
+        return checker.check(url)
 
 
-def check_link_with_metadata(
-    function_name: str, link: str, index: int, total: int
-) -> Tuple[str, str, bool, int, str]:
-    """
-    Check a single link and return results with metadata.
+def page_url(link: str) -> str:
+    """Get a link without its fragment: all `#L<n>` links into one file share a page."""
+    return urllib.parse.urldefrag(link).url
 
-    Args:
-        function_name: Name of the function
-        link: URL to check
-        index: Index of this link (1-based)
-        total: Total number of links
 
-    Returns:
-        Tuple of (function_name, link, success, status_code, error_msg)
+def document_last_line(doc) -> int:
+    """
+    Get the last line of a SCIP document that an occurrence reaches; the index has
+    no line counts, but the definition of a module spans its whole file.
     """
-    success, status_code, error_msg = check_url(link)
-    return (function_name, link, success, status_code, error_msg)
+    last_line = -1
+    for occ in chain(doc.iter_definitions(), doc.iter_references()):
+        last_line = max(last_line, occ.end_line)
+    for extent in doc.iter_enclosing_ranges():
+        if extent is not None:
+            last_line = max(last_line, extent[2])
+    return last_line
 
 
-def validate_csv_links(csv_file: Path, max_workers: int = 10) -> None:
-    """
-    Validate all GitHub links in the CSV file using parallel processing.
+class OfflineLinkChecker:
+    """Check CSV links against the documents and definitions of a SCIP index."""
 
-    Args:
-        csv_file: Path to the CSV file
-        max_workers: Maximum number of parallel workers
-    """
-    print(f"Reading CSV file: {csv_file}")
+    def __init__(self, index):
+        self.index = index
+        self.definitions = DefinitionIndex.from_index(index)
+        self.last_lines = {doc.relative_path: document_last_line(doc) for doc in index.documents}
 
-    # Read all links from the CSV
-    links_to_check = []
+    def check(self, function_name: str, link: str) -> Tuple[bool, str]:
+        """
+        Check one link of the CSV row of `function_name`.
+
+        Returns (success, error_message). Links carry the SCIP line number as
+        `generate_functions_csv` writes it.
+        """
+        parsed = parse_github_link(link)
+        if parsed is None:
+            return (False, "not a curve25519-dalek source link")
+        version, file_path, line_num = parsed
+        last_line = self.last_lines.get(file_path)
+        if last_line is None:
+            return (False, f"{file_path} is not a document of the SCIP index")
+        if line_num > last_line:
+            return (False, f"line {line_num} is past the end of {file_path} (line {last_line})")
+
+        symbol = f"rust-analyzer cargo curve25519-dalek {version} {function_name}"
+        symbol_id = self.index.symbol_id(symbol)
+        spans = self.definitions.spans(symbol_id) if symbol_id is not None else []
+        if not spans:
+            return (False, f"{symbol} is not defined in the SCIP index")
+        for span in spans:
+            if span.relative_path == file_path and span.line == line_num:
+                return (True, "")
+        found = ", ".join(f"{span.relative_path}#L{span.line}" for span in spans)
+        return (False, f"no definition of {function_name} starts at line {line_num} ({found})")
+
+
+def read_links(csv_file: Path) -> List[Tuple[str, str]]:
+    """Get the (function_name, link) of every CSV row that has a link."""
+    links = []
     with open(csv_file, "r") as f:
         reader = csv.DictReader(f)
         for row in reader:
             link = row.get("link", "").strip()
             function_name = row.get("function_name", "")
             if link:  # Only check non-empty links
-                links_to_check.append((function_name, link))
+                links.append((function_name, link))
+    return links
+
+
+def validate_links_offline(
+    links_to_check: List[Tuple[str, str]], checker: OfflineLinkChecker
+) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str, Optional[int], str]]]:
+    """Check links against the SCIP index; returns (valid_links, broken_links)."""
+    valid_links = []
+    broken_links = []
+    for function_name, link in links_to_check:
+        success, error_msg = checker.check(function_name, link)
+        if success:
+            valid_links.append((function_name, link))
+        else:
+            broken_links.append((function_name, link, None, error_msg))
+    return valid_links, broken_links
 
+
+def validate_csv_links(
+    csv_file: Path,
+    max_workers: int = 10,
+    checker: Optional[OfflineLinkChecker] = None,
+    cache: Optional[LinkCheckCache] = None,
+) -> int:
+    """
+    Validate all GitHub links in the CSV file using parallel processing, or
+    against the SCIP index of an offline `checker`.
+
+    Args:
+        csv_file: Path to the CSV file
+        max_workers: Maximum number of parallel workers
+        checker: Check links offline with this checker instead of over HTTP
+        cache: Reuse and record online results in this cache
+
+    Returns:
+        The number of broken links
+    """
+    print(f"Reading CSV file: {csv_file}")
+
+    # Read all links from the CSV
+    links_to_check = read_links(csv_file)
     total_links = len(links_to_check)
     print(f"Found {total_links} links to validate")
-    print(f"Using {max_workers} parallel workers\n")
 
-    # Validate links in parallel
+    if checker is not None:
+        start_time = time.time()
+        valid_links, broken_links = validate_links_offline(links_to_check, checker)
+        print(f"Checked against the SCIP index in {time.time() - start_time:.3f}s")
+        print_summary(total_links, valid_links, broken_links)
+        return len(broken_links)
+
+    # Links that differ only in their #L anchor point at the same page
+    pages = {}
+    for function_name, link in links_to_check:
+        pages.setdefault(page_url(link), []).append((function_name, link))
+    print(f"Checking {len(pages)} unique pages over {max_workers} keep-alive connections\n")
+
     valid_links = []
     broken_links = []
-    completed = 0
-    lock = threading.Lock()
-
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Submit all tasks
-        future_to_link = {
-            executor.submit(check_link_with_metadata, func_name, link, i, total_links): (
-                func_name,
-                link,
-            )
-            for i, (func_name, link) in enumerate(links_to_check, 1)
-        }
-
-        # Process results as they complete
-        for future in as_completed(future_to_link):
-            func_name, link = future_to_link[future]
-            try:
-                function_name, url, success, status_code, error_msg = future.result()
-
-                with lock:
-                    completed += 1
-                    print(f"[{completed}/{total_links}] Checking: {function_name}")
-                    print(f"  URL: {url}")
-
-                    if success:
-                        print(f"  ✓ OK (Status: {status_code})")
-                        valid_links.append((function_name, url))
-                    else:
-                        print(f"  ✗ FAILED (Status: {status_code})")
-                        if error_msg:
-                            print(f"  Error: {error_msg}")
-                        broken_links.append((function_name, url, status_code, error_msg))
-            except Exception as e:
-                with lock:
-                    completed += 1
-                    print(f"[{completed}/{total_links}] Exception checking: {func_name}")
-                    print(f"  Error: {e}")
-                    broken_links.append((func_name, link, 0, str(e)))
-
-    # Print summary
+    start_time = time.time()
+    with HttpLinkChecker(max_workers=max_workers) as http_checker:
+        results = http_checker.check_all(list(pages), cache)
+        for completed, (url, result) in enumerate(results, 1):
+            success, status_code, error_msg = result
+            print(f"[{completed}/{len(pages)}] {url} ({len(pages[url])} links)")
+            if success:
+                print(f"  ✓ OK (Status: {status_code})")
+            else:
+                print(f"  ✗ FAILED (Status: {status_code})")
+                if error_msg:
+                    print(f"  Error: {error_msg}")
+            for function_name, link in pages[url]:
+                if success:
+                    valid_links.append((function_name, link))
+                else:
+                    broken_links.append((function_name, link, status_code, error_msg))
+    print(f"\nChecked {len(pages)} pages in {time.time() - start_time:.1f}s")
+    if cache is not None:
+        print(
+            f"Link cache: {cache.hits} fresh, {cache.revalidations} revalidated, "
+            f"{cache.fetches} fetched"
+        )
+        cache.save()
+
+    print_summary(total_links, valid_links, broken_links)
+    return len(broken_links)
+
+
+def print_summary(
+    total_links: int,
+    valid_links: List[Tuple[str, str]],
+    broken_links: List[Tuple[str, str, Optional[int], str]],
+) -> None:
+    """Print the validation summary and the details of every broken link."""
     print("\n" + "=" * 80)
     print("VALIDATION SUMMARY")
     print("=" * 80)
@@ -145,26 +540,78 @@ def validate_csv_links(csv_file: Path, max_workers: int = 10) -> None:
         for function_name, link, status_code, error_msg in broken_links:
             print(f"\nFunction: {function_name}")
             print(f"  URL: {link}")
-            print(f"  Status: {status_code}")
+            if status_code is not None:
+                print(f"  Status: {status_code}")
             if error_msg:
                 print(f"  Error: {error_msg}")
     else:
         print("\n✓ All links are valid!")
 
 
-def main():
+def main(argv=None):
     """Main function."""
     base_dir = Path(__file__).parent.parent.parent
-    csv_file = base_dir / "outputs" / "curve25519_functions.csv"
+    parser = argparse.ArgumentParser(description="Validate the GitHub links of the functions CSV")
+    parser.add_argument(
+        "--csv", type=Path, default=base_dir / "outputs" / "curve25519_functions.csv"
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Check the links against the local SCIP index instead of over the network",
+    )
+    parser.add_argument(
+        "--scip-json",
+        type=Path,
+        default=base_dir / "data" / "index_scip_curve25519-4.1.3.json",
+        help="SCIP index for --offline",
+    )
+    # Use 10 parallel workers for faster validation
+    parser.add_argument(
+        "--workers", type=int, default=10, help="Concurrent connections when online"
+    )
+    parser.add_argument(
+        "--cache",
+        type=Path,
+        default=None,
+        help=f"Link check cache (default: {LINK_CACHE_FILE} next to the CSV)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        dest="use_cache",
+        action="store_false",
+        help="Check every link over the network without the cache",
+    )
+    parser.add_argument(
+        "--max-age",
+        type=parse_duration,
+        default=None,
+        help=(
+            "How long cached results stay fresh, in seconds or e.g. 12h, 7d (default: 1 day, "
+            "30 days for links into a release tag or commit)"
+        ),
+    )
+    args = parser.parse_args(argv)
+    csv_file = args.csv
 
     if not csv_file.exists():
         print(f"Error: CSV file not found: {csv_file}")
         return 1
 
     try:
-        # Use 10 parallel workers for faster validation
-        validate_csv_links(csv_file, max_workers=10)
-        return 0
+        checker = None
+        if args.offline:
+            if not args.scip_json.exists():
+                print(f"Error: SCIP index not found: {args.scip_json}")
+                return 1
+            checker = OfflineLinkChecker(load_index(args.scip_json))
+        cache = None
+        if args.use_cache and not args.offline:
+            cache = LinkCheckCache(args.cache or csv_file.with_name(LINK_CACHE_FILE), args.max_age)
+        broken = validate_csv_links(
+            csv_file, max_workers=args.workers, checker=checker, cache=cache
+        )
+        return 1 if broken else 0
     except KeyboardInterrupt:
         print("\n\nValidation interrupted by user")
         return 1
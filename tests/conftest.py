@@ -0,0 +1,147 @@
+"""
+Shared fixtures for curve25519_usage tests.
+"""
+
+import http.server
+import json
+import threading
+
+import pytest
+
+from tests.scip_helpers import CURVE, LIBSIGNAL, definition, reference
+
+
+@pytest.fixture
+def scip_data():
+    """
+    A small SCIP index: libsignal `sign` calls `from_hash`, which calls
+    `from_bytes_wide`, which calls `add`. `unused` is never called.
+    """
+    return {
+        "metadata": {"project_root": "file:///nonexistent"},
+        "documents": [
+            {
+                "language": "rust",
+                "relative_path": "curve25519-dalek/src/scalar.rs",
+                "occurrences": [
+                    definition(CURVE + "scalar/impl#[Scalar]from_hash().", 10),
+                    reference(
+                        CURVE + "backend/serial/u64/scalar/impl#[Scalar52]from_bytes_wide().", 12
+                    ),
+                    definition(CURVE + "scalar/impl#[Scalar]unused().", 20),
+                ],
+                "symbols": [
+                    {
+                        "symbol": CURVE + "scalar/impl#[Scalar]from_hash().",
+                        "signature_documentation": {
+                            "text": "pub fn from_hash<D>(hash: D) -> Scalar"
+                        },
+                    },
+                    {
+                        "symbol": CURVE + "scalar/impl#[Scalar]unused().",
+                        "signature_documentation": {"text": "fn unused()"},
+                    },
+                ],
+            },
+            {
+                "language": "rust",
+                "relative_path": "curve25519-dalek/src/backend/serial/u64/scalar.rs",
+                "occurrences": [
+                    definition(CURVE + "backend/serial/u64/scalar/impl#[Scalar52]add().", 5),
+                    definition(
+                        CURVE + "backend/serial/u64/scalar/impl#[Scalar52]from_bytes_wide().", 30
+                    ),
+                    reference(CURVE + "backend/serial/u64/scalar/impl#[Scalar52]add().", 33),
+                ],
+                "symbols": [],
+            },
+            {
+                "language": "rust",
+                "relative_path": "rust/core/src/curve.rs",
+                "occurrences": [
+                    definition(LIBSIGNAL + "curve/sign().", 3),
+                    reference(CURVE + "scalar/impl#[Scalar]from_hash().", 4),
+                ],
+                "symbols": [],
+            },
+            {
+                "language": "rust",
+                "relative_path": "x25519-dalek/benches/x25519.rs",
+                "occurrences": [
+                    definition("rust-analyzer cargo x25519-dalek 2.0.1 bench().", 1),
+                    reference(CURVE + "scalar/impl#[Scalar]unused().", 2),
+                ],
+                "symbols": [],
+            },
+        ],
+    }
+
+
+@pytest.fixture
+def scip_json(tmp_path, scip_data):
+    """The small SCIP index written to a JSON file."""
+    path = tmp_path / "index_scip.json"
+    path.write_text(json.dumps(scip_data))
+    return path
+
+
+class StandInServer:
+    """
+    A local HTTP/1.1 server standing in for GitHub. `routes` maps a path to a
+    function of the request handler returning (status, headers); every request
+    is logged as (method, path, client port, request headers).
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.log = []
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def respond(self, send_body):
+                server.log.append(
+                    (self.command, self.path, self.client_address[1], dict(self.headers))
+                )
+                route = server.routes.get(self.path)
+                status, headers = route(self) if route else (404, {})
+                body = b"x" * 1000
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if send_body:
+                    self.wfile.write(body)
+
+            def do_HEAD(self):
+                self.respond(False)
+
+            def do_GET(self):
+                self.respond(True)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(
+            target=self.httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+        self.thread.start()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}{path}"
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def http_server():
+    """A local stand-in HTTP server, see `StandInServer`."""
+    server = StandInServer()
+    yield server
+    server.close()
@@ -0,0 +1,14 @@
+"""
+Symbol prefixes and occurrence builders for the small SCIP indexes of the tests.
+"""
+
+CURVE = "rust-analyzer cargo curve25519-dalek 4.1.3 "
+LIBSIGNAL = "rust-analyzer cargo libsignal-core 0.1.0 "
+
+
+def definition(symbol, line, col=4):
+    return {"range": [line, col, col + 8], "symbol": symbol, "symbol_roles": 1}
+
+
+def reference(symbol, line, col=8):
+    return {"range": [line, col, col + 8], "symbol": symbol}
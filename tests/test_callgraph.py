@@ -0,0 +1,200 @@
+"""
+Tests for the in-process call graph engine.
+"""
+
+import json
+
+from tests.scip_helpers import CURVE, LIBSIGNAL
+
+from curve25519_usage.callgraph import (
+    BODY_STORE_FILE,
+    CallGraph,
+    SourceReader,
+    body_id,
+    build_call_graph,
+    caller_closure,
+    caller_distances,
+    compact_graph_symbols,
+    function_subgraph,
+    libsignal_distances,
+    load_call_graph,
+    saturation_depth,
+    symbol_display_name,
+    write_body_store,
+    write_function_graph,
+)
+from curve25519_usage.extract_grey_nodes import extract_nodes_from_dot
+from curve25519_usage.scip_index import ScipIndex
+from curve25519_usage.symbol_catalog import SymbolCatalog
+
+ADD = CURVE + "backend/serial/u64/scalar/impl#[Scalar52]add()."
+FROM_BYTES_WIDE = CURVE + "backend/serial/u64/scalar/impl#[Scalar52]from_bytes_wide()."
+FROM_HASH = CURVE + "scalar/impl#[Scalar]from_hash()."
+UNUSED = CURVE + "scalar/impl#[Scalar]unused()."
+SIGN = LIBSIGNAL + "curve/sign()."
+
+
+class TestBuildCallGraph:
+    def test_references_attributed_to_enclosing_function(self, scip_data):
+        graph = build_call_graph(ScipIndex.from_scip_data(scip_data))
+        add, from_bytes_wide, from_hash, sign = map(
+            graph.id, [ADD, FROM_BYTES_WIDE, FROM_HASH, SIGN]
+        )
+        assert list(graph.callers(add)) == [from_bytes_wide]
+        assert list(graph.callers(from_bytes_wide)) == [from_hash]
+        assert list(graph.callers(from_hash)) == [sign]
+        assert list(graph.callees(sign)) == [from_hash]
+
+    def test_nodes_share_index_symbol_ids(self, scip_data):
+        index = ScipIndex.from_scip_data(scip_data)
+        graph = build_call_graph(index)
+        assert graph.catalog is index.catalog
+        assert graph.id(ADD) == index.symbol_id(ADD)
+        assert {ADD, FROM_BYTES_WIDE, FROM_HASH, UNUSED, SIGN} <= graph.symbols()
+
+    def test_libsignal_detection(self, scip_data):
+        graph = build_call_graph(ScipIndex.from_scip_data(scip_data))
+        assert graph.is_libsignal(graph.id(SIGN))
+        assert not graph.is_libsignal(graph.id(FROM_HASH))
+
+    def test_display_name(self):
+        assert symbol_display_name(FROM_HASH) == "from_hash"
+        assert symbol_display_name(SIGN) == "sign"
+
+
+class TestCompressedStorage:
+    def test_from_edges(self):
+        catalog = SymbolCatalog([ADD, FROM_BYTES_WIDE, FROM_HASH, SIGN])
+        edges = [(1, 0), (2, 1), (3, 2), (2, 1), (3, 0)]
+        graph = CallGraph.from_edges(catalog, edges, [(3, "rust/core/src/curve.rs", 3)])
+
+        assert graph.caller_indices.typecode == "I"
+        assert list(graph.callers(0)) == [1, 3]
+        assert list(graph.callees(3)) == [0, 2]
+        assert len(graph.caller_indices) == 4
+        assert graph.definition(3) == ("rust/core/src/curve.rs", 3)
+        assert graph.definition(0) is None
+        assert graph.is_libsignal(3) and not graph.is_libsignal(0)
+
+    def test_nodes_interned_after_build_have_no_edges(self):
+        catalog = SymbolCatalog([ADD, SIGN])
+        graph = CallGraph.from_edges(catalog, [(1, 0)])
+        late = catalog.intern(UNUSED)
+        assert list(graph.callers(late)) == []
+        assert graph.definition(late) is None
+        assert graph.symbols() == {ADD, SIGN}
+
+
+class TestSubgraphs:
+    def test_closure_respects_depth(self, scip_data):
+        graph = build_call_graph(ScipIndex.from_scip_data(scip_data))
+        nodes, edges = caller_closure(graph, graph.id(ADD), 2)
+        assert nodes == set(map(graph.id, [ADD, FROM_BYTES_WIDE, FROM_HASH]))
+        assert (graph.id(FROM_HASH), graph.id(FROM_BYTES_WIDE)) in edges
+
+    def test_libsignal_filter(self, scip_data):
+        graph = build_call_graph(ScipIndex.from_scip_data(scip_data))
+        nodes, edges = function_subgraph(graph, graph.id(ADD), 3)
+        assert {graph.symbol(node) for node in nodes} == {ADD, FROM_BYTES_WIDE, FROM_HASH, SIGN}
+        assert len(edges) == 3
+
+        # Too shallow to reach libsignal, and only called from a bench
+        assert function_subgraph(graph, graph.id(ADD), 2) == (set(), set())
+        assert function_subgraph(graph, graph.id(UNUSED), 5) == (set(), set())
+
+    def test_caller_distances(self, scip_data):
+        graph = build_call_graph(ScipIndex.from_scip_data(scip_data))
+        distances = caller_distances(graph, graph.id(ADD))
+        assert {graph.symbol(node): d for node, d in distances.items()} == {
+            ADD: 0,
+            FROM_BYTES_WIDE: 1,
+            FROM_HASH: 2,
+            SIGN: 3,
+        }
+        assert len(caller_distances(graph, graph.id(ADD), max_depth=1)) == 2
+
+    def test_any_depth_from_one_traversal(self, scip_data):
+        graph = build_call_graph(ScipIndex.from_scip_data(scip_data))
+        add = graph.id(ADD)
+        distances = caller_distances(graph, add)
+        for depth in range(1, 6):
+            assert function_subgraph(graph, add, depth, distances=distances) == (
+                function_subgraph(graph, add, depth)
+            )
+
+    def test_saturation_depth(self, scip_data):
+        graph = build_call_graph(ScipIndex.from_scip_data(scip_data))
+        assert saturation_depth(graph, caller_distances(graph, graph.id(ADD))) == 3
+        assert saturation_depth(graph, caller_distances(graph, graph.id(UNUSED))) == 0
+
+    def test_libsignal_distances_decide_empty_graphs(self, scip_data):
+        graph = build_call_graph(ScipIndex.from_scip_data(scip_data))
+        distances = libsignal_distances(graph)
+        assert distances[graph.id(SIGN)] == 0
+        assert distances[graph.id(ADD)] == 3
+        assert graph.id(UNUSED) not in distances
+        for depth in range(1, 5):
+            _, edges = function_subgraph(graph, graph.id(ADD), depth)
+            assert bool(edges) == (graph.id(ADD) in libsignal_distances(graph, depth))
+
+    def test_written_dot_is_readable(self, scip_json, tmp_path):
+        graph = load_call_graph(scip_json)
+        output_file = tmp_path / "add.dot"
+        result = write_function_graph(graph, ADD, output_file, 20)
+        assert result == (ADD, True, str(output_file), None)
+
+        grey_nodes, sink_node = extract_nodes_from_dot(output_file, preserve_type_info=False)
+        assert sink_node == ("backend/serial/u64/scalar.rs", "add")
+        assert ("scalar.rs", "from_hash") in grey_nodes
+
+    def test_empty_graph_not_written(self, scip_json, tmp_path):
+        graph = load_call_graph(scip_json)
+        output_file = tmp_path / "unused.dot"
+        result = write_function_graph(graph, UNUSED, output_file, 20)
+        assert result == (UNUSED, False, "empty graph", None)
+        assert not output_file.exists()
+
+
+def write_sources(root):
+    """Write source files whose functions start at the definition lines of the fixture."""
+    files = {
+        "curve25519-dalek/src/scalar.rs": {10: "fn from_hash() { from_bytes_wide() }"},
+        "curve25519-dalek/src/backend/serial/u64/scalar.rs": {
+            5: "fn add() { 1 }",
+            30: "fn from_bytes_wide() {\n    add()\n}",
+        },
+        "rust/core/src/curve.rs": {3: "fn sign() { from_hash() }"},
+    }
+    for relative_path, functions in files.items():
+        lines = [""] * 40
+        for line, body in functions.items():
+            lines[line] = body
+        path = root / relative_path
+        path.parent.mkdir(parents=True)
+        path.write_text("\n".join(lines))
+
+
+class TestCompactDot:
+    def test_compact_graph_matches_regular_graph(self, scip_json, tmp_path):
+        write_sources(tmp_path / "src")
+        graph = load_call_graph(scip_json)
+        sources = SourceReader(tmp_path / "src")
+        regular, compact = tmp_path / "regular.dot", tmp_path / "compact.dot"
+        write_function_graph(graph, ADD, regular, 20, sources)
+        write_function_graph(graph, ADD, compact, 20, sources, compact=True)
+
+        text = compact.read_text()
+        assert "tooltip=" in regular.read_text() and "tooltip=" not in text
+        assert "  1 -> 0 [color=gray, style=dashed]\n" in text and "  3 -> 2 [color=blue]\n" in text
+        symbols = [ADD, FROM_BYTES_WIDE, FROM_HASH, SIGN]
+        assert sorted(compact_graph_symbols(text)) == sorted(symbols)
+        for preserve_type_info in (True, False):
+            assert extract_nodes_from_dot(compact, preserve_type_info) == (
+                extract_nodes_from_dot(regular, preserve_type_info)
+            )
+
+        store = tmp_path / BODY_STORE_FILE
+        bodies = write_body_store(store, graph, compact_graph_symbols(text), sources)
+        assert bodies[body_id("fn add() { 1 }")] == "fn add() { 1 }"
+        assert f'body="{body_id(bodies[body_id("fn add() { 1 }")])}"' in text
+        assert json.loads(store.read_text()) == bodies
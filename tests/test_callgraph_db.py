@@ -0,0 +1,90 @@
+"""
+Tests for the SQLite call graph database.
+"""
+
+import sys
+from collections import Counter
+
+import pytest
+
+from tests.scip_helpers import CURVE, LIBSIGNAL
+
+from curve25519_usage import callgraph, extract_grey_nodes
+from curve25519_usage import generate_curve25519_graphs_parallel as generator
+from curve25519_usage.callgraph import function_subgraph, load_call_graph
+from curve25519_usage.callgraph_db import DB_FILE, CallGraphDatabase, main, write_database
+
+ADD = CURVE + "backend/serial/u64/scalar/impl#[Scalar52]add()."
+FROM_HASH = CURVE + "scalar/impl#[Scalar]from_hash()."
+SIGN = LIBSIGNAL + "curve/sign()."
+ADD_FILE = "backend_serial_u64_scalar_impl__Scalar52_add_depth20.dot"
+
+
+def test_graph_membership_matches_function_subgraph(scip_json, tmp_path):
+    graph = load_call_graph(scip_json)
+    path = tmp_path / DB_FILE
+    assert write_database(path, graph, {ADD: ADD_FILE, "missing().": "missing.dot"}, 20) == 1
+
+    nodes, edges = function_subgraph(graph, graph.id(ADD), 20)
+    with CallGraphDatabase(path) as database:
+        assert database.graph_names() == [ADD_FILE]
+        assert database.sink_symbols() == {ADD_FILE: ADD}
+        assert database.graph(ADD) == (
+            {graph.symbol(node) for node in nodes},
+            {(graph.symbol(caller), graph.symbol(callee)) for caller, callee in edges},
+        )
+        # The callee index answers "who calls from_hash" over the whole call graph
+        assert database.query(
+            "SELECT a.symbol FROM edges JOIN nodes a ON a.id = caller "
+            "JOIN nodes b ON b.id = callee WHERE b.symbol = ?",
+            (FROM_HASH,),
+        ) == [(SIGN,)]
+        row = database.query("SELECT file, line, kind, role FROM nodes WHERE symbol = ?", (SIGN,))
+        assert row == [("rust/core/src/curve.rs", 3, "function", "libsignal")]
+
+
+def test_grey_nodes_from_database_match_dot_files(scip_json, tmp_path, capsys):
+    output_dir = tmp_path / "graphs"
+    generator.main(["--scip-json", str(scip_json), "--output-dir", str(output_dir)])
+    from_dot, from_db = tmp_path / "dot.json", tmp_path / "db.json"
+    extract_grey_nodes.main(
+        ["--graphs", str(output_dir), "--output", str(from_dot), "--no-sidecar"]
+    )
+    extract_grey_nodes.main(["--graphs", str(output_dir), "--output", str(from_db), "--db"])
+    assert from_db.read_text() == from_dot.read_text()
+
+    capsys.readouterr()
+    assert main([str(output_dir / DB_FILE), "SELECT count(*) FROM graphs"]) == 0
+    assert capsys.readouterr().out == "3\n"
+
+
+def test_each_graph_is_cut_once(scip_json, tmp_path, monkeypatch):
+    cuts = Counter()
+
+    def cut(graph, sink, *args, **kwargs):
+        cuts[graph.symbol(sink)] += 1
+        return function_subgraph(graph, sink, *args, **kwargs)
+
+    monkeypatch.setattr(callgraph, "function_subgraph", cut)
+    output_dir = tmp_path / "graphs"
+    generator.main(["--scip-json", str(scip_json), "--output-dir", str(output_dir)])
+    assert (output_dir / DB_FILE).exists() and (output_dir / generator.SIDECAR_FILE).exists()
+    assert len(cuts) == 3 and set(cuts.values()) == {1}
+
+
+def test_no_database_for_an_external_worker(scip_json, tmp_path):
+    output_dir = tmp_path / "graphs"
+    argv = ["--scip-json", str(scip_json), "--output-dir", str(output_dir)]
+    generator.main(argv)
+    assert (output_dir / DB_FILE).exists()
+
+    # The same protocol, but not known to cut its graphs from the driver's call graph
+    command = f"{sys.executable} -m curve25519_usage.graph_worker --scip-json {{scip_json}}"
+    generator.main(argv + ["--engine", "worker", "--worker-command", command])
+    assert not (output_dir / DB_FILE).exists()
+    assert not (output_dir / generator.SIDECAR_FILE).exists()
+
+
+def test_missing_database(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        CallGraphDatabase(tmp_path / DB_FILE)
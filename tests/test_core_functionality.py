@@ -8,6 +8,7 @@ Tests core functionality including:
 - Path resolution
 """
 
+import json
 import pytest
 from pathlib import Path
 from curve25519_usage import __version__
@@ -239,6 +240,12 @@ class TestProjectPaths:
         assert (root / "data" / "index_scip_libsignal_deps.json").exists()
 
 
+def scip_document_json(symbols):
+    """Build a minimal SCIP index JSON with one occurrence per symbol."""
+    occurrences = [{"range": [i, 0, 1], "symbol": symbol} for i, symbol in enumerate(symbols)]
+    return json.dumps({"documents": [{"relative_path": "src/lib.rs", "occurrences": occurrences}]})
+
+
 class TestSymbolExtraction:
     """Tests for symbol extraction from SCIP JSON"""
 
@@ -246,12 +253,16 @@ class TestSymbolExtraction:
         """Test extracting curve25519-dalek symbols from SCIP JSON."""
         # Create a minimal SCIP JSON file
         scip_json = tmp_path / "test_scip.json"
-        scip_content = """{"symbol":"rust-analyzer cargo curve25519-dalek 4.1.3 src/scalar.rs/from_hash()."}
-{"symbol":"rust-analyzer cargo curve25519-dalek 4.1.3 src/edwards.rs/double()."}
-{"symbol":"rust-analyzer cargo libsignal 0.1.0 src/lib.rs/func()."}
-{"symbol":"rust-analyzer cargo curve25519-dalek 4.1.3 src/constants.rs/BASEPOINT_TABLE"}
-"""
-        scip_json.write_text(scip_content)
+        scip_json.write_text(
+            scip_document_json(
+                [
+                    "rust-analyzer cargo curve25519-dalek 4.1.3 src/scalar.rs/from_hash().",
+                    "rust-analyzer cargo curve25519-dalek 4.1.3 src/edwards.rs/double().",
+                    "rust-analyzer cargo libsignal 0.1.0 src/lib.rs/func().",
+                    "rust-analyzer cargo curve25519-dalek 4.1.3 src/constants.rs/BASEPOINT_TABLE",
+                ]
+            )
+        )
 
         symbols = search_all_curve25519_symbols(scip_json)
 
@@ -273,12 +284,16 @@ class TestSymbolExtraction:
     def test_search_filters_non_function_symbols(self, tmp_path):
         """Test that search filters out non-function symbols."""
         scip_json = tmp_path / "mixed_scip.json"
-        scip_content = """{"symbol":"rust-analyzer cargo curve25519-dalek 4.1.3 src/scalar.rs/Scalar#"}
-{"symbol":"rust-analyzer cargo curve25519-dalek 4.1.3 src/scalar.rs/from_hash()."}
-{"symbol":"rust-analyzer cargo curve25519-dalek 4.1.3 src/constants.rs/BASEPOINT"}
-{"symbol":"rust-analyzer cargo curve25519-dalek 4.1.3 src/edwards.rs/double()."}
-"""
-        scip_json.write_text(scip_content)
+        scip_json.write_text(
+            scip_document_json(
+                [
+                    "rust-analyzer cargo curve25519-dalek 4.1.3 src/scalar.rs/Scalar#",
+                    "rust-analyzer cargo curve25519-dalek 4.1.3 src/scalar.rs/from_hash().",
+                    "rust-analyzer cargo curve25519-dalek 4.1.3 src/constants.rs/BASEPOINT",
+                    "rust-analyzer cargo curve25519-dalek 4.1.3 src/edwards.rs/double().",
+                ]
+            )
+        )
 
         symbols = search_all_curve25519_symbols(scip_json)
 
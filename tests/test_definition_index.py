@@ -0,0 +1,87 @@
+"""
+Tests for the enclosing-definition interval index.
+"""
+
+import json
+
+from tests.scip_helpers import CURVE, definition, reference
+
+from curve25519_usage.callgraph import build_call_graph
+from curve25519_usage.definition_index import DefinitionIndex, DocumentDefinitions
+from curve25519_usage.scip_index import ScipIndex, load_index
+
+OUTER = CURVE + "scalar/outer()."
+INNER = CURVE + "scalar/outer().inner()."
+AFTER = CURVE + "scalar/after()."
+CALLEE = CURVE + "scalar/callee()."
+OTHER = CURVE + "scalar/other()."
+
+
+def enclosed(symbol, line, enclosing_range):
+    occurrence = definition(symbol, line)
+    occurrence["enclosing_range"] = enclosing_range
+    return occurrence
+
+
+NESTED = {
+    "documents": [
+        {
+            "relative_path": "curve25519-dalek/src/scalar.rs",
+            "occurrences": [
+                enclosed(OUTER, 1, [0, 0, 20, 1]),
+                enclosed(INNER, 5, [5, 4, 9, 5]),
+                reference(CALLEE, 7),  # in inner
+                reference(CALLEE, 12),  # in outer, after inner
+                reference(OTHER, 22),  # between the items
+                enclosed(AFTER, 30, [30, 0, 40, 1]),
+                reference(OTHER, 35),
+            ],
+        }
+    ]
+}
+
+
+def test_innermost_enclosing_range_wins():
+    index = ScipIndex.from_scip_data(NESTED)
+    definitions = DocumentDefinitions(index.documents[0])
+    symbol = index.symbol
+    assert symbol(definitions.enclosing_symbol(7, 8)) == INNER
+    assert symbol(definitions.enclosing_symbol(9, 5)) == OUTER  # the end is exclusive
+    assert symbol(definitions.enclosing_symbol(12, 8)) == OUTER
+    assert definitions.enclosing_symbol(22, 8) is None
+    assert symbol(definitions.enclosing_symbol(35, 8)) == AFTER
+
+    span = definitions.enclosing(7, 8)
+    assert (span.line, span.start, span.end) == (5, (5, 4), (9, 5))
+
+
+def test_without_enclosing_ranges_spans_end_at_the_next_definition(scip_data):
+    index = ScipIndex.from_scip_data(scip_data)
+    definitions = DefinitionIndex.from_index(index, path_prefixes="curve25519-dalek/")
+    path = "curve25519-dalek/src/scalar.rs"
+    from_hash = index.symbol_id(CURVE + "scalar/impl#[Scalar]from_hash().")
+    unused = index.symbol_id(CURVE + "scalar/impl#[Scalar]unused().")
+    assert definitions.enclosing_symbol(path, 9, 0) is None
+    assert definitions.enclosing_symbol(path, 19, 99) == from_hash
+    assert definitions.enclosing_symbol(path, 500, 0) == unused
+    assert definitions.enclosing_symbol("rust/core/src/curve.rs", 4, 8) is None
+
+    (span,) = definitions.spans(from_hash)
+    assert (span.relative_path, span.line, span.start, span.end) == (path, 10, (10, 4), (20, 4))
+    assert definitions.definition(unused).end is None
+
+
+def test_call_graph_attributes_references_to_enclosing_definitions(tmp_path):
+    scip_json = tmp_path / "index.json"
+    scip_json.write_text(json.dumps(NESTED))
+    graph = build_call_graph(load_index(scip_json))
+
+    def callers(symbol):
+        return {graph.symbol(node) for node in graph.callers(graph.id(symbol))}
+
+    assert callers(CALLEE) == {OUTER, INNER}
+    assert callers(OTHER) == {AFTER}
+
+    # The snapshot keeps the enclosing ranges
+    reloaded = load_index(scip_json).documents[0]
+    assert list(reloaded.iter_enclosing_ranges())[1] == (5, 4, 9, 5)
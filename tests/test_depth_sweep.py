@@ -0,0 +1,40 @@
+"""
+Tests for the all-depths sweep.
+"""
+
+import json
+
+from tests.scip_helpers import CURVE
+
+from curve25519_usage.depth_sweep import SWEEP_REPORT_FILE, main
+
+ADD = CURVE + "backend/serial/u64/scalar/impl#[Scalar52]add()."
+
+
+def test_sweep_reports_saturation_and_writes_each_depth(scip_json, tmp_path):
+    output_dir = tmp_path / "sweep"
+    assert (
+        main(["--scip-json", str(scip_json), "--output-dir", str(output_dir), "--depths", "2,3"])
+        == 0
+    )
+
+    report = json.loads((output_dir / SWEEP_REPORT_FILE).read_text())
+    assert report["complete_depth"] == 3
+    assert report["symbols"][ADD] == {"saturation_depth": 3, "max_caller_distance": 3}
+
+    # At depth 2 libsignal does not reach `add` yet
+    assert report["depths"]["2"]["generated_graphs"] == 2
+    assert report["depths"]["3"]["generated_graphs"] == 3
+    assert not (output_dir / "backend_serial_u64_scalar_impl__Scalar52_add_depth2.dot").exists()
+    assert (output_dir / "backend_serial_u64_scalar_impl__Scalar52_add_depth3.dot").exists()
+    assert len(list(output_dir.glob("*_depth3.dot"))) == 3
+    assert not (output_dir / "processing_results.json").exists()
+
+
+def test_single_depth_writes_processing_results(scip_json, tmp_path):
+    output_dir = tmp_path / "sweep"
+    main(["--scip-json", str(scip_json), "--output-dir", str(output_dir), "--depths", "20"])
+
+    results = json.loads((output_dir / "processing_results.json").read_text())
+    assert results["generated_graphs"] == 3
+    assert results["failure_breakdown"] == {"empty graph": 1}
@@ -0,0 +1,94 @@
+"""
+Tests for the streaming DOT reader.
+"""
+
+import io
+
+import pytest
+
+from curve25519_usage import dot_reader
+from curve25519_usage.dot_reader import DotEdge, DotNode, DotSyntaxError, dot_tokens, read_dot
+
+GRAPH = r"""digraph callgraph {
+  rankdir=LR;
+  node [shape=box, style=filled];
+  subgraph cluster_0 {
+    label="curve25519-dalek";
+    subgraph cluster_inner {
+      "a \"quoted\" id" [fillcolor=lightgray, tooltip="x[0] -> y; z]"]
+    }
+    b [label="first line
+second line", fillcolor=green]
+  }
+  // a comment -> not an edge
+  "a \"quoted\" id" -> b
+    -> 3 [color=blue,
+          style=dashed]
+  3 [symbol="crate/path/f()."]
+}
+"""
+
+
+def read(text):
+    return list(read_dot(io.StringIO(text)))
+
+
+def test_statements_with_quoting_subgraphs_and_continuations():
+    quoted = 'a "quoted" id'
+    assert read(GRAPH) == [
+        DotNode(quoted, {"fillcolor": "lightgray", "tooltip": "x[0] -> y; z]"}, "cluster_inner"),
+        DotNode("b", {"label": "first line\nsecond line", "fillcolor": "green"}, "cluster_0"),
+        DotEdge(quoted, "b", {"color": "blue", "style": "dashed"}, None),
+        DotEdge("b", "3", {"color": "blue", "style": "dashed"}, None),
+        DotNode("3", {"symbol": "crate/path/f()."}, None),
+    ]
+
+
+def test_line_fast_path_matches_the_tokenizer(monkeypatch):
+    fast = read(GRAPH)
+    monkeypatch.setattr(dot_reader, "_parse_line", lambda line: None)
+    assert read(GRAPH) == fast
+
+
+def test_tokens_of_a_string_spanning_lines():
+    tokens = list(dot_tokens(['a [label="one\\\n', 'two"]\n']))
+    assert [(kind, value) for kind, value, _ in tokens] == [
+        ("name", "a"),
+        ("punctuation", "["),
+        ("name", "label"),
+        ("punctuation", "="),
+        ("quoted", "onetwo"),
+        ("punctuation", "]"),
+    ]
+    assert tokens[-1][2] == 2
+
+
+def test_html_like_ids_nest_and_span_lines():
+    text = (
+        "digraph {\n"
+        "  a [label=<<b>f</b>(x) &lt; 2>, fillcolor=green]\n"
+        "  b [label=<<table><tr>\n"
+        "    <td>g</td></tr></table>>]\n"
+        "  a -> b\n"
+        "}\n"
+    )
+    assert read(text) == [
+        DotNode("a", {"label": "<b>f</b>(x) &lt; 2", "fillcolor": "green"}, None),
+        DotNode("b", {"label": "<table><tr>\n    <td>g</td></tr></table>"}, None),
+        DotEdge("a", "b", {}, None),
+    ]
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "digraph {\n  a [label=<<b>open</b>]\n}\n",
+        "digraph {\n  a -> b\n",
+        "digraph {\n  a\n}\n}\n",
+        'digraph {\n  "open\n',
+        "digraph {\n  -> b\n}\n",
+    ],
+)
+def test_malformed_input_is_an_error(text):
+    with pytest.raises(DotSyntaxError):
+        read(text)
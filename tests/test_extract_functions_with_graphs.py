@@ -0,0 +1,78 @@
+"""
+Tests for joining the public API to the generated graphs.
+"""
+
+import json
+
+from tests.scip_helpers import CURVE
+
+from curve25519_usage.extract_functions_with_graphs import main
+
+API = {
+    "library": "curve25519-dalek",
+    "modules": {
+        "backend/serial/u64/scalar": {
+            "types": {
+                "Scalar52": {
+                    "methods": [
+                        {"name": "add", "signature": "pub fn add()"},
+                        {"name": "add_assign", "signature": "pub fn add_assign()"},
+                    ]
+                }
+            }
+        },
+        "window": {
+            "types": {
+                "NafLookupTable5<T>": {
+                    "methods": [{"name": "select", "signature": "pub fn select()"}]
+                }
+            }
+        },
+        "scalar": {
+            "functions": [{"name": "clamp_integer", "signature": "pub const fn clamp_integer()"}],
+            "constants": [{"name": "ZERO", "signature": "pub const ZERO"}],
+        },
+    },
+}
+
+
+def run(tmp_path, names, results=None):
+    api_json, graphs, output = tmp_path / "api.json", tmp_path / "graphs", tmp_path / "out.md"
+    api_json.write_text(json.dumps(API))
+    graphs.mkdir(exist_ok=True)
+    for name in names:
+        (graphs / name).write_text("digraph {}\n")
+    if results is not None:
+        (graphs / "processing_results.json").write_text(json.dumps(results))
+    arguments = ["--api-json", str(api_json), "--graphs", str(graphs), "--output", str(output)]
+    assert main(arguments) == 0
+    return [line for line in output.read_text().splitlines() if line.startswith("- ")]
+
+
+def test_graph_names_match_exactly_at_any_depth_suffix(tmp_path):
+    listed = run(
+        tmp_path,
+        [
+            "backend_serial_u64_scalar_impl__Scalar52_add_15.dot",
+            "window_impl__`NafLookupTable5<T>`_select_depth20.dot",
+            "scalar_clamp_integer_5.dot",
+            "scalar_ZERO_depth20.svg",
+        ],
+    )
+    assert listed == ["- `pub fn add()`", "- `pub fn select()`", "- `pub const fn clamp_integer()`"]
+
+
+def test_processing_results_are_joined_on_symbols(tmp_path):
+    failed = "backend/serial/u64/scalar/impl#[Scalar52]add_assign()."
+    results = {
+        "all_symbols": [
+            CURVE + "backend/serial/u64/scalar/impl#[Scalar52]add().",
+            CURVE + "backend/serial/u64/scalar/impl#[Scalar52]add_assign().",
+            CURVE + "window/impl#[`NafLookupTable5<T>`]select().",
+            CURVE + "scalar/ZERO.",
+        ],
+        "failed_symbols": [[failed, "empty graph"]],
+    }
+    # The results win over the file names, which no longer matter
+    listed = run(tmp_path, ["scalar_clamp_integer_depth20.dot"], results)
+    assert listed == ["- `pub fn add()`", "- `pub fn select()`", "- `pub const ZERO`"]
@@ -0,0 +1,86 @@
+"""
+Tests for the single-parse, cached analysis of extract_grey_nodes.
+"""
+
+import json
+import os
+
+from curve25519_usage import extract_grey_nodes
+from curve25519_usage.extract_grey_nodes import ANALYSIS_CACHE_FILE, analyze_graphs
+from curve25519_usage.graph_archive import ARCHIVE_FILE, write_archive
+
+PREFIX = "rust-analyzer cargo curve25519-dalek 4.1.3 src/scalar.rs/"
+
+
+def graph(sink, grey):
+    return (
+        "digraph {\n"
+        f'  "{PREFIX}impl#[Scalar]{sink}()." [fillcolor=green]\n'
+        f'  "{PREFIX}{grey}()." [fillcolor=lightgray]\n'
+        f'  "{PREFIX}{grey}()." -> "{PREFIX}impl#[Scalar]{sink}()."\n'
+        "}\n"
+    )
+
+
+def write_graphs(directory, count=4):
+    directory.mkdir()
+    for i in range(count):
+        (directory / f"g{i}.dot").write_text(graph(f"sink{i}", f"grey{i}"))
+
+
+def test_both_representations_from_one_parse(tmp_path, monkeypatch):
+    graphs = tmp_path / "graphs"
+    write_graphs(graphs, 1)
+    parses = []
+    analyze = extract_grey_nodes.analyze_dot_lines
+    monkeypatch.setattr(
+        extract_grey_nodes,
+        "analyze_dot_lines",
+        lambda lines, name: parses.append(name) or analyze(lines, name),
+    )
+    output = tmp_path / "out.json"
+    extract_grey_nodes.main(["--graphs", str(graphs), "--output", str(output), "--workers", "1"])
+
+    assert len(parses) == 1
+    result = json.loads(output.read_text())
+    sink = {"file": "src/scalar.rs", "function": "impl#[Scalar]sink0"}
+    assert result["unique_sink_nodes"] == [sink]
+    assert result["all_curve25519_functions_no_types"] == [
+        {"file": "src/scalar.rs", "function": "grey0"},
+        {"file": "src/scalar.rs", "function": "sink0"},
+    ]
+
+
+def test_unchanged_graphs_are_not_parsed_again(tmp_path):
+    graphs = tmp_path / "graphs"
+    write_graphs(graphs)
+    first, parsed = analyze_graphs(graphs)
+    assert parsed == 4 and (graphs / ANALYSIS_CACHE_FILE).exists()
+    assert first["g1.dot"] == ([PREFIX + "grey1()."], [PREFIX + "impl#[Scalar]sink1()."])
+
+    assert analyze_graphs(graphs) == (first, 0)
+
+    # A new mtime alone is caught by the content hash; changed content is parsed
+    stat = os.stat(graphs / "g0.dot")
+    os.utime(graphs / "g0.dot", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    (graphs / "g2.dot").write_text(graph("sink2", "other"))
+    (graphs / "g3.dot").unlink()
+    analyses, parsed = analyze_graphs(graphs)
+    assert parsed == 1
+    assert sorted(analyses) == ["g0.dot", "g1.dot", "g2.dot"]
+    assert analyses["g2.dot"][0] == [PREFIX + "other()."]
+    assert analyze_graphs(graphs, use_cache=False)[1] == 3
+
+
+def test_process_pool_and_archive_give_the_same_analysis(tmp_path):
+    graphs = tmp_path / "graphs"
+    write_graphs(graphs)
+    serial, _ = analyze_graphs(graphs, workers=1, use_cache=False)
+    assert analyze_graphs(graphs, workers=2, use_cache=False) == (serial, 4)
+
+    archived = tmp_path / "archived"
+    archived.mkdir()
+    members = [(path.name, None, path.read_text()) for path in sorted(graphs.glob("*.dot"))]
+    write_archive(archived / ARCHIVE_FILE, members)
+    assert analyze_graphs(archived, workers=2) == (serial, 4)
+    assert analyze_graphs(archived / ARCHIVE_FILE) == (serial, 0)
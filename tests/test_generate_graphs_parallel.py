@@ -0,0 +1,105 @@
+"""
+Tests for the parallel graph generator driver.
+"""
+
+import json
+import sys
+
+from tests.scip_helpers import CURVE
+
+from curve25519_usage import generate_curve25519_graphs_parallel as generator
+from curve25519_usage.callgraph import BODY_STORE_FILE, write_function_graph
+from curve25519_usage.depth_sweep import SWEEP_REPORT_FILE
+from curve25519_usage.depth_sweep import main as depth_sweep_main
+
+ADD_FILE = "backend_serial_u64_scalar_impl__Scalar52_add_depth20.dot"
+UNUSED = CURVE + "scalar/impl#[Scalar]unused()."
+# Referenced outside any function, e.g. by an attribute macro: no call graph node
+DERIVE = "rust-analyzer cargo curve25519-dalek-derive 0.1.1 unsafe_target_feature()."
+
+
+def test_unreachable_symbols_skip_the_generator(scip_json, tmp_path, monkeypatch):
+    written = []
+
+    def write(graph, symbol, *args, **kwargs):
+        written.append(symbol)
+        return write_function_graph(graph, symbol, *args, **kwargs)
+
+    monkeypatch.setattr(generator, "write_function_graph", write)
+    output_dir = tmp_path / "graphs"
+    generator.main(["--scip-json", str(scip_json), "--output-dir", str(output_dir)])
+
+    assert len(written) == 3 and UNUSED not in written
+    results = json.loads((output_dir / "processing_results.json").read_text())
+    assert results["generated_graphs"] == 3
+    assert results["failed_symbols"] == [[UNUSED[len(CURVE) :], "empty graph"]]
+
+
+def test_cargo_engine_runs_every_symbol(scip_json, tmp_path, monkeypatch):
+    generated = []
+
+    def generate(args, timeout, usage):
+        generated.append(args[2])
+        return (args[2], False, "empty graph", None)
+
+    monkeypatch.setattr(generator, "generate_single_graph", generate)
+    output_dir = tmp_path / "graphs"
+    argv = ["--scip-json", str(scip_json), "--output-dir", str(output_dir)]
+    generator.main(argv + ["--engine", "cargo", "--rust-analyzer-dir", str(tmp_path)])
+    assert UNUSED in generated and len(generated) == 4
+
+
+def test_external_worker_runs_every_symbol(scip_json, tmp_path):
+    requested = tmp_path / "requested.txt"
+    worker = tmp_path / "worker.py"
+    worker.write_text(
+        "import json, sys\n"
+        "print(json.dumps({'ready': True}), flush=True)\n"
+        "for line in sys.stdin:\n"
+        "    request = json.loads(line)\n"
+        f"    with open({str(requested)!r}, 'a') as f: f.write(request['symbol'] + '\\n')\n"
+        "    response = {'id': request['id'], 'symbol': request['symbol']}\n"
+        "    response.update({'success': False, 'info': 'empty graph'})\n"
+        "    print(json.dumps(response), flush=True)\n"
+    )
+    output_dir = tmp_path / "graphs"
+    argv = ["--scip-json", str(scip_json), "--output-dir", str(output_dir), "--engine", "worker"]
+    generator.main(argv + ["--worker-command", f"{sys.executable} {worker}"])
+    generated = requested.read_text().splitlines()
+    assert UNUSED in generated and len(generated) == 4
+
+
+def test_compact_graphs_share_one_body_store(scip_json, tmp_path):
+    sources = tmp_path / "src"
+    path = sources / "curve25519-dalek/src/backend/serial/u64/scalar.rs"
+    path.parent.mkdir(parents=True)
+    path.write_text("\n" * 5 + "fn add() { 1 }\n")
+    output_dir = tmp_path / "graphs"
+    argv = ["--scip-json", str(scip_json), "--output-dir", str(output_dir)]
+
+    generator.main(argv + ["--compact", "--source-root", str(sources)])
+    bodies = json.loads((output_dir / BODY_STORE_FILE).read_text())
+    assert list(bodies.values()) == ["fn add() { 1 }"]
+    for dot_file in output_dir.glob("*.dot"):
+        assert "tooltip=" not in dot_file.read_text()
+    assert (output_dir / ADD_FILE).read_text().count(f'body="{next(iter(bodies))}"') == 1
+
+    generator.main(argv + ["--force"])
+    assert not (output_dir / BODY_STORE_FILE).exists()
+
+
+def test_every_engine_lists_the_symbols_of_the_index(scip_data, tmp_path):
+    scip_data["documents"][0]["occurrences"].insert(0, {"range": [0, 2, 10], "symbol": DERIVE})
+    scip_json = tmp_path / "index.json"
+    scip_json.write_text(json.dumps(scip_data))
+    expected = generator.search_all_curve25519_symbols(scip_json)
+    assert DERIVE in expected
+
+    output_dir = tmp_path / "graphs"
+    generator.main(["--scip-json", str(scip_json), "--output-dir", str(output_dir)])
+    results = json.loads((output_dir / "processing_results.json").read_text())
+    assert results["all_symbols"] == expected
+
+    depth_sweep_main(["--scip-json", str(scip_json), "--output-dir", str(tmp_path / "sweep")])
+    report = json.loads((tmp_path / "sweep" / SWEEP_REPORT_FILE).read_text())
+    assert sorted(report["symbols"]) == expected
@@ -0,0 +1,95 @@
+"""
+Tests for the packed graph archive.
+"""
+
+import pytest
+
+from tests.scip_helpers import CURVE
+
+from curve25519_usage import generate_curve25519_graphs_parallel as generator
+from curve25519_usage.extract_grey_nodes import extract_nodes_from_dot_text
+from curve25519_usage.graph_archive import (
+    ARCHIVE_FILE,
+    GraphArchive,
+    GraphArchiveError,
+    GraphDirectory,
+    open_graphs,
+    write_archive,
+)
+
+ADD = CURVE + "backend/serial/u64/scalar/impl#[Scalar52]add()."
+ADD_FILE = "backend_serial_u64_scalar_impl__Scalar52_add_depth20.dot"
+
+
+def sample_members(count=5):
+    header = "digraph function_subgraph {\n  rankdir=LR;\n  node [shape=box];\n"
+    return [
+        (f"g{i}.dot", f"symbol{i}().", header + f'  "n{i}" -> "m{i}" [color=blue]\n}}\n')
+        for i in range(count)
+    ]
+
+
+def test_members_are_read_back_individually(tmp_path):
+    path = tmp_path / ARCHIVE_FILE
+    members = sample_members()
+    write_archive(path, members)
+
+    with GraphArchive(path) as archive:
+        assert archive.names() == [name for name, _, _ in members]
+        assert archive.name_for_symbol("symbol3().") == "g3.dot"
+        assert archive.symbol("g3.dot") == "symbol3()."
+        assert archive.read_text("g3.dot") == members[3][2]
+        assert archive.open("g1.dot").readline().startswith("digraph")
+        assert "missing.dot" not in archive
+        with pytest.raises(KeyError):
+            archive.read_text("missing.dot")
+
+
+def test_corruption_is_detected(tmp_path):
+    path = tmp_path / ARCHIVE_FILE
+    write_archive(path, sample_members())
+    data = bytearray(path.read_bytes())
+
+    path.write_bytes(data[:-4])
+    with pytest.raises(GraphArchiveError):
+        GraphArchive(path)
+
+    (tmp_path / "loose.dot").write_text("digraph {}\n")
+    with pytest.raises(GraphArchiveError):
+        GraphArchive(tmp_path / "loose.dot")
+
+
+def test_open_graphs_prefers_archive_in_directory(tmp_path):
+    (tmp_path / "a.dot").write_text("digraph {}\n")
+    assert isinstance(open_graphs(tmp_path), GraphDirectory)
+    assert open_graphs(tmp_path).names() == ["a.dot"]
+
+    write_archive(tmp_path / ARCHIVE_FILE, sample_members(2))
+    with open_graphs(tmp_path) as graphs:
+        assert isinstance(graphs, GraphArchive)
+        assert graphs.names() == ["g0.dot", "g1.dot"]
+
+
+def test_generator_archive_mode(scip_json, tmp_path, monkeypatch):
+    output_dir = tmp_path / "graphs"
+    argv = ["--scip-json", str(scip_json), "--output-dir", str(output_dir)]
+    generator.main(argv)
+    loose = (output_dir / ADD_FILE).read_text()
+
+    generator.main(argv + ["--archive"])
+    assert not list(output_dir.glob("*.dot"))
+    with open_graphs(output_dir) as graphs:
+        assert len(graphs) == 3
+        assert graphs.name_for_symbol(ADD) == ADD_FILE
+        assert graphs.read_text(ADD_FILE) == loose
+        _, sink = extract_nodes_from_dot_text(graphs.read_text(ADD_FILE), ADD_FILE, False)
+        assert sink == ("backend/serial/u64/scalar.rs", "add")
+
+    def fail(*args):
+        raise AssertionError("archived graphs should be reused")
+
+    # Archived graphs count as existing and are unpacked when leaving archive mode
+    monkeypatch.setattr(generator, "write_function_graph", fail)
+    generator.main(argv)
+    assert not (output_dir / ARCHIVE_FILE).exists()
+    assert (output_dir / ADD_FILE).read_text() == loose
@@ -0,0 +1,90 @@
+"""
+Tests for incremental graph regeneration with the content-hash manifest.
+"""
+
+import json
+
+from tests.scip_helpers import CURVE, reference
+
+from curve25519_usage import generate_curve25519_graphs_parallel as generator
+from curve25519_usage.callgraph import build_call_graph
+from curve25519_usage.graph_manifest import MANIFEST_FILE, GraphManifest, InputHasher
+from curve25519_usage.scip_index import ScipIndex
+
+ADD = CURVE + "backend/serial/u64/scalar/impl#[Scalar52]add()."
+UNUSED = CURVE + "scalar/impl#[Scalar]unused()."
+
+
+def symbol_hashes(scip_data, depth=20, settings=None):
+    index = ScipIndex.from_scip_data(scip_data)
+    hasher = InputHasher(index, build_call_graph(index), depth, settings or {})
+    return {symbol: hasher.symbol_hash(symbol) for symbol in (ADD, UNUSED)}
+
+
+class TestInputHasher:
+    def test_hash_is_stable(self, scip_data):
+        assert symbol_hashes(scip_data) == symbol_hashes(scip_data)
+
+    def test_only_documents_reaching_the_symbol_count(self, scip_data):
+        before = symbol_hashes(scip_data)
+        # The bench only calls `unused`
+        scip_data["documents"][3]["occurrences"].append(reference(CURVE + "other().", 3))
+        after = symbol_hashes(scip_data)
+        assert after[ADD] == before[ADD]
+        assert after[UNUSED] != before[UNUSED]
+
+    def test_changed_caller_document(self, scip_data):
+        before = symbol_hashes(scip_data)
+        scip_data["documents"][2]["occurrences"][1]["range"] = [5, 8, 16]
+        assert symbol_hashes(scip_data)[ADD] != before[ADD]
+
+    def test_depth_and_settings_count(self, scip_data):
+        before = symbol_hashes(scip_data)
+        assert symbol_hashes(scip_data, depth=3)[ADD] != before[ADD]
+        assert symbol_hashes(scip_data, settings={"engine": "cargo"})[ADD] != before[ADD]
+
+
+class TestGraphManifest:
+    def test_round_trip(self, tmp_path):
+        output_file = tmp_path / "add.dot"
+        output_file.write_text("digraph {}")
+        manifest = GraphManifest.load(tmp_path)
+        manifest.record("h1", (ADD, True, str(output_file), None))
+        manifest.record("h2", (UNUSED, False, "empty graph"))
+        manifest.save([ADD, UNUSED])
+
+        manifest = GraphManifest.load(tmp_path)
+        assert manifest.reusable_result(ADD, "h1") == (ADD, True, str(output_file), None)
+        assert manifest.reusable_result(UNUSED, "h2") == (UNUSED, False, "empty graph", None)
+        assert manifest.reusable_result(ADD, "changed") is None
+
+        output_file.unlink()
+        assert manifest.reusable_result(ADD, "h1") is None
+
+    def test_unrecorded_entries_survive_interrupted_run(self, tmp_path):
+        manifest = GraphManifest.load(tmp_path)
+        manifest.record("h2", (UNUSED, False, "empty graph"))
+        manifest.save([UNUSED])
+
+        GraphManifest.load(tmp_path).save([ADD, UNUSED])
+        assert GraphManifest.load(tmp_path).reusable_result(UNUSED, "h2") is not None
+
+
+def test_second_run_reuses_unchanged_graphs(scip_json, tmp_path, monkeypatch, capsys):
+    output_dir = tmp_path / "graphs"
+    argv = ["--scip-json", str(scip_json), "--output-dir", str(output_dir)]
+    generator.main(argv)
+    first = json.loads((output_dir / "processing_results.json").read_text())
+
+    def fail(*args):
+        raise AssertionError("unchanged graphs should not be regenerated")
+
+    monkeypatch.setattr(generator, "write_function_graph", fail)
+    capsys.readouterr()
+    generator.main(argv)
+
+    assert "Reusing 4 unchanged results, generating 0" in capsys.readouterr().out
+    second = json.loads((output_dir / "processing_results.json").read_text())
+    for key in ("generated_graphs", "failed_symbols", "failure_breakdown", "all_symbols"):
+        assert second[key] == first[key]
+    assert (output_dir / MANIFEST_FILE).exists()
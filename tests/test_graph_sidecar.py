@@ -0,0 +1,77 @@
+"""
+Tests for the NDJSON graph sidecar.
+"""
+
+import hashlib
+import json
+
+import pytest
+
+from tests.scip_helpers import CURVE, LIBSIGNAL
+
+from curve25519_usage import extract_grey_nodes
+from curve25519_usage import generate_curve25519_graphs_parallel as generator
+from curve25519_usage.callgraph import load_call_graph, write_function_graph
+from curve25519_usage.graph_sidecar import SIDECAR_FILE, read_sidecar, write_sidecar
+
+ADD = CURVE + "backend/serial/u64/scalar/impl#[Scalar52]add()."
+FROM_BYTES_WIDE = CURVE + "backend/serial/u64/scalar/impl#[Scalar52]from_bytes_wide()."
+FROM_HASH = CURVE + "scalar/impl#[Scalar]from_hash()."
+SIGN = LIBSIGNAL + "curve/sign()."
+ADD_FILE = "backend_serial_u64_scalar_impl__Scalar52_add_depth20.dot"
+
+
+def test_records_list_roles_and_edges(scip_json, tmp_path):
+    graph = load_call_graph(scip_json)
+    write_function_graph(graph, ADD, tmp_path / ADD_FILE, 20)
+    (tmp_path / "missing.dot").write_text("digraph {}\n")
+    path = tmp_path / SIDECAR_FILE
+    graphs = {ADD: ADD_FILE, "missing().": "missing.dot", FROM_HASH: "not_written.dot"}
+    assert write_sidecar(path, graph, graphs, 20) == 1
+
+    (record,) = read_sidecar(path)
+    assert record["graph"] == ADD_FILE and record["sink"] == ADD
+    assert record["sha256"] == hashlib.sha256((tmp_path / ADD_FILE).read_bytes()).hexdigest()
+    nodes = [(node["id"], node["role"]) for node in record["nodes"]]
+    assert nodes == [
+        (ADD, "sink"),
+        (FROM_BYTES_WIDE, "curve25519-dalek"),
+        (FROM_HASH, "curve25519-dalek"),
+        (SIGN, "libsignal"),
+    ]
+    edges = {(nodes[caller][0], nodes[callee][0]) for caller, callee in record["edges"]}
+    assert edges == {(FROM_BYTES_WIDE, ADD), (FROM_HASH, FROM_BYTES_WIDE), (SIGN, FROM_HASH)}
+
+
+def test_unsupported_sidecar(tmp_path):
+    path = tmp_path / SIDECAR_FILE
+    path.write_text(json.dumps({"format": 0}) + "\n")
+    with pytest.raises(ValueError):
+        list(read_sidecar(path))
+
+
+def test_grey_nodes_from_sidecar_match_dot_files(scip_json, tmp_path, capsys):
+    output_dir = tmp_path / "graphs"
+    generator.main(["--scip-json", str(scip_json), "--output-dir", str(output_dir)])
+    from_dot, from_sidecar = tmp_path / "dot.json", tmp_path / "sidecar.json"
+    extract_grey_nodes.main(
+        ["--graphs", str(output_dir), "--output", str(from_dot), "--no-sidecar"]
+    )
+    capsys.readouterr()
+    extract_grey_nodes.main(["--graphs", str(output_dir), "--output", str(from_sidecar)])
+    assert "Read 3 graphs from" in capsys.readouterr().out
+    assert from_sidecar.read_text() == from_dot.read_text()
+
+    # A sidecar that does not describe the graphs on disk is not used
+    with open(output_dir / ADD_FILE, "a") as f:
+        f.write("// edited\n")
+    assert extract_grey_nodes.analyze_sidecar(output_dir) is None
+    (output_dir / ADD_FILE).unlink()
+    assert extract_grey_nodes.analyze_sidecar(output_dir) is None
+
+
+def test_archived_graphs_are_hashed(scip_json, tmp_path):
+    output_dir = tmp_path / "graphs"
+    generator.main(["--scip-json", str(scip_json), "--output-dir", str(output_dir), "--archive"])
+    assert len(list(read_sidecar(output_dir / SIDECAR_FILE))) == 3
+    assert len(extract_grey_nodes.analyze_sidecar(output_dir)) == 3
@@ -0,0 +1,124 @@
+"""
+Tests for the persistent batch worker protocol and pool.
+"""
+
+import io
+import json
+import sys
+
+from tests.scip_helpers import CURVE
+
+from curve25519_usage.graph_worker import WorkerPool, serve, stand_in_worker_command
+
+ADD = CURVE + "backend/serial/u64/scalar/impl#[Scalar52]add()."
+UNUSED = CURVE + "scalar/impl#[Scalar]unused()."
+
+
+def python_worker(code):
+    """Command for a scripted worker that answers with the given Python code."""
+    return [sys.executable, "-c", code]
+
+
+class TestServe:
+    def test_answers_each_request_line(self, scip_json, tmp_path):
+        requests = [
+            {"id": 1, "symbol": ADD, "depth": 20, "output": str(tmp_path / "add.dot")},
+            {"id": 2, "symbol": UNUSED, "depth": 20, "output": str(tmp_path / "unused.dot")},
+        ]
+        input_stream = io.StringIO("".join(json.dumps(r) + "\n" for r in requests))
+        output_stream = io.StringIO()
+
+        serve(scip_json, input_stream, output_stream)
+
+        ready, add, unused = [json.loads(line) for line in output_stream.getvalue().splitlines()]
+        assert ready["ready"]
+        assert (add["id"], add["success"], add["info"]) == (1, True, str(tmp_path / "add.dot"))
+        assert (unused["id"], unused["success"], unused["info"]) == (2, False, "empty graph")
+        assert (tmp_path / "add.dot").exists()
+
+    def test_bad_request_does_not_stop_worker(self, scip_json, tmp_path):
+        input_stream = io.StringIO('not json\n{"id": 3, "symbol": "x"}\n')
+        output_stream = io.StringIO()
+
+        serve(scip_json, input_stream, output_stream)
+
+        responses = [json.loads(line) for line in output_stream.getvalue().splitlines()[1:]]
+        assert [r["info"] for r in responses] == ["bad request", "bad request"]
+
+
+class TestWorkerPool:
+    def test_stand_in_workers(self, scip_json, tmp_path):
+        pool = WorkerPool(stand_in_worker_command(scip_json), num_workers=2)
+        jobs = [(ADD, 20, tmp_path / "add.dot"), (UNUSED, 20, tmp_path / "unused.dot")]
+
+        results = sorted(pool.imap_unordered(jobs))
+
+        assert results == [
+            (ADD, True, str(tmp_path / "add.dot"), None),
+            (UNUSED, False, "empty graph", None),
+        ]
+
+    def test_crashed_worker_is_replaced(self, tmp_path):
+        # Answers the first request of each process, then exits
+        code = (
+            "import json, sys\n"
+            "print(json.dumps({'ready': True}), flush=True)\n"
+            "request = json.loads(sys.stdin.readline())\n"
+            "if request['symbol'] == 'crash': sys.exit(1)\n"
+            "print(json.dumps({'id': request['id'], 'symbol': request['symbol'],"
+            " 'success': True, 'info': 'ok'}), flush=True)\n"
+        )
+        pool = WorkerPool(python_worker(code), num_workers=1)
+
+        results = list(pool.imap_unordered([("crash", 1, "a"), ("next", 1, "b")]))
+
+        assert results[0][:2] == ("crash", False)
+        assert results[0][2].startswith("exception: worker exited")
+        assert results[1] == ("next", True, "ok", None)
+
+    def test_request_timeout(self):
+        code = "import time; print('{\"ready\": true}', flush=True); time.sleep(30)"
+        pool = WorkerPool(python_worker(code), num_workers=1, timeout=0.5)
+
+        assert list(pool.imap_unordered([("slow", 1, "a")])) == [
+            ("slow", False, "timeout", "Worker exceeded 0.5 second timeout")
+        ]
+
+    def test_partial_line_times_out(self):
+        code = (
+            "import sys, time\n"
+            "print('{\"ready\": true}', flush=True)\n"
+            "sys.stdin.readline()\n"
+            "print('{\"id\": 0', end='', flush=True)\n"
+            "time.sleep(30)\n"
+        )
+        pool = WorkerPool(python_worker(code), num_workers=1, timeout=0.5)
+
+        assert list(pool.imap_unordered([("slow", 1, "a")])) == [
+            ("slow", False, "timeout", "Worker exceeded 0.5 second timeout")
+        ]
+
+    def test_lines_arriving_together(self):
+        # The greeting and both responses in one write, before any request is read
+        code = (
+            "import json, sys\n"
+            "lines = [{'ready': True}] + [\n"
+            "    {'id': i, 'symbol': s, 'success': True, 'info': 'ok'} for i, s in enumerate('ab')\n"
+            "]\n"
+            "sys.stdout.write(''.join(json.dumps(line) + '\\n' for line in lines))\n"
+            "sys.stdout.flush()\n"
+            "sys.stdin.read()\n"
+        )
+        pool = WorkerPool(python_worker(code), num_workers=1, timeout=2)
+
+        results = list(pool.imap_unordered([("a", 1, "a"), ("b", 1, "b")]))
+
+        assert results == [("a", True, "ok", None), ("b", True, "ok", None)]
+
+    def test_startup_failure_fails_all_jobs(self):
+        pool = WorkerPool(python_worker("import sys; sys.exit(3)"), num_workers=2)
+
+        results = list(pool.imap_unordered([("a", 1, "a"), ("b", 1, "b"), ("c", 1, "c")]))
+
+        assert len(results) == 3
+        assert all(not success and "failed to start" in info for _, success, info, _ in results)
@@ -0,0 +1,101 @@
+"""
+Tests for the DOT to SVG rendering stage, with a stand-in for Graphviz dot.
+"""
+
+import sys
+
+from curve25519_usage.graph_archive import ARCHIVE_FILE, GraphDirectory, open_graphs, write_archive
+from curve25519_usage.render_graphs import main, render_tasks, rendered_hash, source_hash
+
+FAKE_DOT = """#!{python}
+import sys, time
+source = sys.stdin.read()
+with open({log!r}, "a") as log:
+    log.write(f"{{len(source)}}\\n")
+if "slow" in source:
+    time.sleep(5)
+if "broken" in source:
+    sys.exit("syntax error")
+sys.stdout.write("<svg>" + str(len(source)) + "</svg>\\n")
+"""
+
+
+def fake_dot(tmp_path):
+    """Write a dot stand-in that logs the size of every source it renders."""
+    log = tmp_path / "dot.log"
+    script = tmp_path / "dot"
+    script.write_text(FAKE_DOT.format(python=sys.executable, log=str(log)))
+    script.chmod(0o755)
+    return str(script), log
+
+
+def graph(size):
+    return "digraph {\n" + "  a -> b;\n" * size + "}\n"
+
+
+def render(graphs, dot, *extra):
+    return main(["--graphs", str(graphs), "--dot", dot, "--workers", "1"] + list(extra))
+
+
+def test_largest_first_then_only_changed(tmp_path):
+    dot, log = fake_dot(tmp_path)
+    graphs = tmp_path / "graphs"
+    graphs.mkdir()
+    for name, size in [("small", 1), ("large", 50), ("medium", 10)]:
+        (graphs / f"{name}.dot").write_text(graph(size))
+
+    assert render(graphs, dot) == 0
+    sizes = [int(line) for line in log.read_text().split()]
+    assert sizes == sorted(sizes, reverse=True)
+    svg = graphs / "medium.svg"
+    assert rendered_hash(svg) == source_hash(graph(10))
+
+    log.write_text("")
+    assert render(graphs, dot) == 0
+    assert log.read_text() == ""
+
+    (graphs / "medium.dot").write_text(graph(11))
+    assert render(graphs, dot) == 0
+    assert log.read_text().split() == [str(len(graph(11)))]
+
+
+def test_timeouts_and_errors_are_reported(tmp_path, capsys):
+    dot, _ = fake_dot(tmp_path)
+    graphs = tmp_path / "graphs"
+    graphs.mkdir()
+    (graphs / "slow.dot").write_text("digraph { slow }\n")
+    (graphs / "broken.dot").write_text("digraph { broken }\n")
+    (graphs / "fine.dot").write_text(graph(2))
+
+    assert render(graphs, dot, "--timeout", "1") == 1
+    out = capsys.readouterr().out
+    assert "timeout: 1" in out and "error: 1: 1" in out
+    assert not (graphs / "slow.svg").exists()
+    assert rendered_hash(graphs / "fine.svg") is not None
+
+
+def test_renders_archive_members(tmp_path):
+    dot, _ = fake_dot(tmp_path)
+    graphs = tmp_path / "graphs"
+    graphs.mkdir()
+    write_archive(graphs / ARCHIVE_FILE, [("a_depth20.dot", None, graph(3))])
+
+    assert render(graphs, dot) == 0
+    assert rendered_hash(graphs / "a_depth20.svg") == source_hash(graph(3))
+
+
+def test_tasks_are_sized_without_reading_graphs(tmp_path, monkeypatch):
+    graphs = tmp_path / "graphs"
+    graphs.mkdir()
+    (graphs / "a.dot").write_text(graph(1))
+    (graphs / "b.dot").write_text(graph(5))
+    monkeypatch.setattr(GraphDirectory, "read_text", None)
+
+    with open_graphs(graphs) as opened:
+        tasks = render_tasks(opened, tmp_path / "svg")
+
+    assert [task.payload for task in tasks] == [
+        ("a.dot", tmp_path / "svg" / "a.svg"),
+        ("b.dot", tmp_path / "svg" / "b.svg"),
+    ]
+    assert [task.estimate for task in tasks] == [len(graph(1)), len(graph(5))]
@@ -0,0 +1,103 @@
+"""
+Tests for per-symbol resource accounting.
+"""
+
+import json
+import subprocess
+import sys
+
+import pytest
+
+from tests.scip_helpers import CURVE
+
+from curve25519_usage import generate_curve25519_graphs_parallel as generator
+from curve25519_usage.resource_usage import (
+    ProcessUsage,
+    distribution,
+    dot_stats,
+    format_report,
+    run_measured,
+    top_symbols,
+)
+
+ADD = CURVE + "backend/serial/u64/scalar/impl#[Scalar52]add()."
+
+
+def test_run_measured_reports_child_usage():
+    allocate = "x = bytearray(64 * 1024 * 1024); import sys; print('out'); sys.exit(3)"
+    returncode, stdout, _, usage = run_measured([sys.executable, "-c", allocate])
+    assert returncode == 3
+    assert stdout == "out\n"
+    assert usage["peak_rss_kb"] > 64 * 1024
+    assert usage["cpu_seconds"] > 0
+
+
+def test_process_usage_reports_growth_not_the_running_peak():
+    pytest.importorskip("resource")
+    usage = ProcessUsage()
+    usage.start()
+    block = bytearray(256 * 1024 * 1024)
+    grown = usage.stop()
+    del block
+    usage.start()
+    steady = usage.stop()
+    assert "peak_rss_kb" not in grown
+    assert grown["rss_growth_kb"] > 0
+    assert steady["rss_growth_kb"] < 16 * 1024
+
+
+def test_run_measured_timeout():
+    with pytest.raises(subprocess.TimeoutExpired):
+        run_measured([sys.executable, "-c", "import time; time.sleep(10)"], timeout=0.2)
+
+
+def test_dot_stats_ignores_arrows_in_tooltips(tmp_path):
+    dot = tmp_path / "g.dot"
+    dot.write_text(
+        "digraph function_subgraph {\n"
+        "  subgraph cluster_0 {\n"
+        '    "a" [label="a", tooltip="fn a() -> u8"]\n'
+        '    "b \\"q\\"" [label="b"]\n'
+        "  }\n"
+        '  "a" -> "b \\"q\\"" [color=blue]\n'
+        "}\n"
+    )
+    assert dot_stats(dot) == {"dot_bytes": dot.stat().st_size, "nodes": 2, "edges": 1}
+    assert dot_stats(tmp_path / "missing.dot") == {}
+
+
+def test_distribution_and_ranking():
+    assert distribution([4, 1, 3, 2]) == {
+        "count": 4,
+        "total": 10,
+        "mean": 2.5,
+        "p50": 2,
+        "p90": 4,
+        "p99": 4,
+        "max": 4,
+    }
+    records = {"a": {"wall_seconds": 1.0}, "b": {"wall_seconds": 3.0}, "c": {}}
+    assert top_symbols(records, "wall_seconds", 1) == [("b", 3.0)]
+    assert "Top 2 symbols by wall_seconds" in format_report(records)
+    assert "by rss_growth_kb" not in format_report({"a": {"rss_growth_kb": 0}})
+
+
+def test_processing_results_record_symbol_resources(scip_json, tmp_path, capsys):
+    output_dir = tmp_path / "graphs"
+    generator.main(
+        ["--scip-json", str(scip_json), "--output-dir", str(output_dir), "--report", "2"]
+    )
+    assert "Top 2 symbols by dot_bytes" in capsys.readouterr().out
+
+    results = json.loads((output_dir / "processing_results.json").read_text())
+    record = results["symbol_resources"][ADD]
+    assert record["success"]
+    assert record["nodes"] == 4 and record["edges"] == 3
+    assert record["dot_bytes"] > 0
+    assert {"wall_seconds", "cpu_seconds"} <= set(record)
+    assert "nodes" not in results["symbol_resources"][CURVE + "scalar/impl#[Scalar]unused()."]
+
+    # Unchanged symbols keep the resources of the run that generated them
+    generator.main(["--scip-json", str(scip_json), "--output-dir", str(output_dir)])
+    rerun = json.loads((output_dir / "processing_results.json").read_text())
+    assert rerun["symbol_resources"][ADD] == record
@@ -0,0 +1,81 @@
+"""
+Tests for the results journal and resumable generation runs.
+"""
+
+import json
+
+import pytest
+
+from curve25519_usage import generate_curve25519_graphs_parallel as generator
+from curve25519_usage.callgraph import write_function_graph
+from curve25519_usage.graph_manifest import MANIFEST_FILE
+from curve25519_usage.run_journal import JOURNAL_FILE, RunJournal, journal_result, read_journal
+
+
+class TestRunJournal:
+    def test_latest_entry_wins(self, tmp_path):
+        path = tmp_path / JOURNAL_FILE
+        with RunJournal(path) as journal:
+            journal.append("h1", ("a", False, "timeout", "slow"))
+            journal.append("h1", ("b", False, "empty graph"))
+            journal.append("h2", ("a", True, "a.dot"))
+
+        entries = read_journal(path)
+        assert list(entries) == ["b", "a"]
+        assert journal_result(entries["a"]) == ("a", True, "a.dot", None)
+        assert entries["a"]["input_hash"] == "h2"
+
+    def test_truncated_line_of_killed_run_is_ignored(self, tmp_path):
+        path = tmp_path / JOURNAL_FILE
+        with RunJournal(path) as journal:
+            journal.append("h1", ("a", False, "empty graph"))
+        with open(path, "a") as f:
+            f.write('{"symbol": "b", "succ')
+
+        with RunJournal(path, resume=True) as journal:
+            journal.append("h1", ("c", False, "empty graph"))
+        assert list(read_journal(path)) == ["a", "c"]
+
+    def test_new_run_starts_a_new_journal(self, tmp_path):
+        path = tmp_path / JOURNAL_FILE
+        with RunJournal(path) as journal:
+            journal.append("h1", ("a", False, "empty graph"))
+        RunJournal(path).close()
+        assert read_journal(path) == {}
+
+
+def recording_writer(calls, interrupt_after=None):
+    """Wrap write_function_graph to record symbols and optionally simulate Ctrl-C."""
+
+    def write(graph, symbol, *args, **kwargs):
+        if len(calls) == interrupt_after:
+            raise KeyboardInterrupt
+        calls.append(symbol)
+        return write_function_graph(graph, symbol, *args, **kwargs)
+
+    return write
+
+
+def test_resume_skips_journaled_symbols(scip_json, tmp_path, monkeypatch):
+    output_dir = tmp_path / "graphs"
+    # Every symbol goes through the writer, including the unreachable one
+    argv = ["--scip-json", str(scip_json), "--output-dir", str(output_dir)]
+    argv.append("--no-reachability-filter")
+
+    first_run = []
+    monkeypatch.setattr(generator, "write_function_graph", recording_writer(first_run, 2))
+    with pytest.raises(KeyboardInterrupt):
+        generator.main(argv)
+    assert len(read_journal(output_dir / JOURNAL_FILE)) == 2
+
+    # Only the journal survives, e.g. after the process was killed
+    (output_dir / MANIFEST_FILE).unlink()
+    resumed_run = []
+    monkeypatch.setattr(generator, "write_function_graph", recording_writer(resumed_run))
+    generator.main(argv + ["--resume"])
+
+    assert len(resumed_run) == 2
+    assert not set(resumed_run) & set(first_run)
+    results = json.loads((output_dir / "processing_results.json").read_text())
+    assert results["generated_graphs"] == 3
+    assert results["failure_breakdown"] == {"empty graph": 1}
@@ -0,0 +1,104 @@
+"""
+Tests for the cost-aware scheduler.
+"""
+
+import threading
+
+from curve25519_usage.scheduler import (
+    MAX_TIMEOUT,
+    MIN_TIMEOUT,
+    RETRY_FACTOR,
+    Scheduler,
+    Task,
+    available_cpus,
+    estimate_durations,
+    history_timeout,
+)
+
+
+def test_single_worker_runs_longest_first():
+    tasks = [Task(name, None, estimate) for name, estimate in [("a", 1), ("b", 30), ("c", 5)]]
+    order = [
+        task.key for task, _, _ in Scheduler(1).run(tasks, lambda: lambda t: (t.key, True, ""))
+    ]
+    assert order == ["b", "c", "a"]
+
+
+def test_timeout_is_retried_once_with_larger_budget():
+    budgets = []
+    lock = threading.Lock()
+
+    def runner(task):
+        with lock:
+            budgets.append((task.key, task.timeout))
+        if task.key == "slow":
+            return (task.key, False, "timeout", "too slow")
+        return (task.key, True, f"{task.key}.dot")
+
+    tasks = [Task("slow", None, 1.0, timeout=40), Task("fast", None, 0.5, timeout=40)]
+    results = {task.key: result for task, result, _ in Scheduler(2).run(tasks, lambda: runner)}
+
+    assert sorted(budgets) == [("fast", 40), ("slow", 40), ("slow", 40 * RETRY_FACTOR)]
+    assert results["slow"][2] == "timeout"
+    assert results["fast"][1]
+
+
+def test_runner_exception_becomes_failed_result_and_runner_is_closed():
+    closed = []
+
+    class Runner:
+        def __call__(self, task):
+            raise RuntimeError("boom")
+
+        def close(self):
+            closed.append(True)
+
+    [(_, result, _)] = Scheduler(4).run([Task("a", None)], Runner)
+    assert result == ("a", False, "exception: boom", "boom")
+    assert closed == [True]
+
+
+def test_runner_that_cannot_be_built_does_not_hang_the_run():
+    def broken():
+        raise OSError("cannot start worker")
+
+    tasks = [Task(name, None) for name in "abc"]
+    results = [result for _, result, _ in Scheduler(2).run(tasks, broken)]
+    assert sorted(results) == [
+        (name, False, "exception: cannot start worker", "cannot start worker") for name in "abc"
+    ]
+
+    # Threads that have a runner take over the tasks of the ones that do not
+    built = []
+    lock = threading.Lock()
+
+    def flaky():
+        with lock:
+            built.append(True)
+            if len(built) == 1:
+                raise OSError("cannot start worker")
+        return lambda task: (task.key, True, "")
+
+    results = [result for _, result, _ in Scheduler(2).run(tasks, flaky)]
+    assert sorted(results) == [(name, True, "") for name in "abc"]
+
+
+def test_history_timeout():
+    assert history_timeout(None, 120) == 120
+    assert history_timeout(0.01) == MIN_TIMEOUT
+    assert history_timeout(60) == 240
+    assert history_timeout(10**6) == MAX_TIMEOUT
+
+
+def test_estimates_without_history_scale_with_closure_size():
+    history = {"a": 10.0, "b": None}
+    estimates = estimate_durations(["a", "b", "c"], history, {"a": 100, "b": 50, "c": 400})
+    assert estimates == {"a": 10.0, "b": 5.0, "c": 40.0}
+
+
+def test_available_cpus_follows_cgroup_quota(tmp_path):
+    (tmp_path / "cpu.max").write_text("150000 100000\n")
+    assert available_cpus(tmp_path) == min(2, available_cpus(tmp_path / "missing"))
+
+    (tmp_path / "cpu.max").write_text("max 100000\n")
+    assert available_cpus(tmp_path) == available_cpus(tmp_path / "missing")
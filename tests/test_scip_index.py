@@ -0,0 +1,126 @@
+"""
+Tests for the compiled SCIP index and its snapshot cache.
+"""
+
+import json
+
+import pytest
+
+from tests.scip_helpers import CURVE
+from curve25519_usage import scip_index
+from curve25519_usage.scip_index import ScipIndex, load_index, snapshot_path
+
+
+class TestScipIndex:
+    def test_symbols_are_interned(self, scip_data):
+        index = ScipIndex.from_scip_data(scip_data)
+        from_hash = CURVE + "scalar/impl#[Scalar]from_hash()."
+        symbol_id = index.symbol_id(from_hash)
+        assert index.symbol(symbol_id) == from_hash
+        assert index.symbols.count(from_hash) == 1
+
+    def test_definitions_and_references(self, scip_data):
+        index = ScipIndex.from_scip_data(scip_data)
+        doc = next(index.iter_documents("curve25519-dalek/src/scalar.rs"))
+        definitions = [index.symbol(occ.symbol_id) for occ in doc.iter_definitions()]
+        references = list(doc.iter_references())
+        assert definitions == [
+            CURVE + "scalar/impl#[Scalar]from_hash().",
+            CURVE + "scalar/impl#[Scalar]unused().",
+        ]
+        assert len(references) == 1
+        assert (references[0].start_line, references[0].end_line) == (12, 12)
+
+    def test_symbol_information(self, scip_data):
+        index = ScipIndex.from_scip_data(scip_data)
+        doc = next(index.iter_documents("curve25519-dalek/src/scalar.rs"))
+        assert doc.symbol_information[0].signature.startswith("pub fn from_hash")
+
+    def test_document_prefix_filter(self, scip_data):
+        index = ScipIndex.from_scip_data(scip_data)
+        paths = [doc.relative_path for doc in index.iter_documents(("rust/", "x25519-dalek/"))]
+        assert paths == ["rust/core/src/curve.rs", "x25519-dalek/benches/x25519.rs"]
+
+
+class TestSnapshotCache:
+    def test_snapshot_written_next_to_json(self, scip_json):
+        load_index(scip_json)
+        assert snapshot_path(scip_json).exists()
+
+    def test_snapshot_reused(self, scip_json, monkeypatch):
+        expected = load_index(scip_json).symbols
+
+        def fail(*args):
+            raise AssertionError("SCIP JSON should not be parsed again")
+
+        monkeypatch.setattr(ScipIndex, "from_json", fail)
+        assert load_index(scip_json).symbols == expected
+
+    def test_snapshot_rebuilt_when_json_changes(self, scip_json, scip_data):
+        load_index(scip_json)
+        scip_data["documents"] = scip_data["documents"][:1]
+        scip_json.write_text(json.dumps(scip_data))
+
+        index = load_index(scip_json)
+        assert len(index.documents) == 1
+
+    def test_touched_json_with_same_content_reuses_snapshot(self, scip_json, monkeypatch):
+        load_index(scip_json)
+        scip_json.write_text(scip_json.read_text())
+
+        monkeypatch.setattr(ScipIndex, "from_json", pytest.fail)
+        assert len(load_index(scip_json).documents) == 4
+
+    def test_stale_format_rebuilt(self, scip_json, monkeypatch):
+        load_index(scip_json)
+        monkeypatch.setattr(scip_index, "SNAPSHOT_FORMAT", scip_index.SNAPSHOT_FORMAT + 1)
+        assert len(load_index(scip_json).documents) == 4
+        assert scip_index.read_snapshot_header(snapshot_path(scip_json))["format"] == (
+            scip_index.SNAPSHOT_FORMAT
+        )
+
+    def test_unreadable_snapshot_is_a_cache_miss(self, scip_json):
+        load_index(scip_json)
+        path = snapshot_path(scip_json)
+        snapshot = path.read_bytes()
+        # A foreign pickle naming a module that does not exist, then a truncated body
+        for broken in (b"cno_such_module\nThing\n.", snapshot[: len(snapshot) - 20]):
+            path.write_bytes(broken)
+            assert len(load_index(scip_json).documents) == 4
+        assert path.read_bytes() == snapshot
+
+    def test_snapshots_are_written_through_private_temporary_files(self, scip_json, monkeypatch):
+        index = load_index(scip_json, use_cache=False)
+        path = snapshot_path(scip_json)
+        replaced = []
+        monkeypatch.setattr(scip_index.os, "replace", lambda src, dst: replaced.append(src))
+        scip_index.save_snapshot(index, path, "sha", (1, 2))
+        scip_index.save_snapshot(index, path, "sha", (1, 2))
+        assert len(set(replaced)) == 2
+
+    def test_cached_load_only_keeps_matching_documents(self, scip_json, monkeypatch):
+        add = CURVE + "backend/serial/u64/scalar/impl#[Scalar52]add()."
+        loaded = []
+
+        class CountedDocument(scip_index.ScipDocument):
+            __slots__ = ()
+
+            def __init__(self, relative_path, *args):
+                loaded.append(relative_path)
+                super().__init__(relative_path, *args)
+
+        monkeypatch.setattr(scip_index, "ScipDocument", CountedDocument)
+        # Rebuilding the snapshot streams every document, reading it only the matching one
+        for expected_loads in (4, 1):
+            loaded.clear()
+            index = load_index(scip_json, path_prefixes="rust/")
+            assert [doc.relative_path for doc in index.documents] == ["rust/core/src/curve.rs"]
+            assert index.symbol_id(add) is not None
+            assert len(loaded) == expected_loads
+        assert len(load_index(scip_json).documents) == 4
+
+
+def test_uncached_load_only_keeps_matching_documents(scip_json):
+    index = load_index(scip_json, use_cache=False, path_prefixes="rust/")
+    assert [doc.relative_path for doc in index.documents] == ["rust/core/src/curve.rs"]
+    assert not snapshot_path(scip_json).exists()
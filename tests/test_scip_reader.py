@@ -0,0 +1,60 @@
+"""
+Tests for the streaming SCIP JSON reader.
+"""
+
+import json
+
+import pytest
+
+from curve25519_usage import scip_reader
+from curve25519_usage.scip_reader import iter_documents, read_metadata
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1 << 20])
+def test_documents_match_json_load(scip_json, scip_data, chunk_size):
+    docs = list(iter_documents(scip_json, chunk_size=chunk_size))
+    assert docs == scip_data["documents"]
+
+
+def test_prefix_filter(scip_json):
+    docs = list(iter_documents(scip_json, "curve25519-dalek/src/backend/"))
+    assert [doc["relative_path"] for doc in docs] == [
+        "curve25519-dalek/src/backend/serial/u64/scalar.rs"
+    ]
+
+
+def test_skipped_documents_are_not_decoded(scip_json, monkeypatch):
+    decoded = []
+    real_loads = json.loads
+
+    def recording_loads(text):
+        value = real_loads(text)
+        if isinstance(value, dict):
+            decoded.append(value.get("relative_path"))
+        return value
+
+    monkeypatch.setattr(scip_reader.json, "loads", recording_loads)
+    list(iter_documents(scip_json, ("rust/",)))
+    assert decoded == ["rust/core/src/curve.rs"]
+
+
+def test_strings_with_structural_characters(tmp_path):
+    doc = {
+        "relative_path": "a/b.rs",
+        "symbols": [{"documentation": ['he said "}]{[," \\ and left', "relative_path"]}],
+        "occurrences": [],
+    }
+    path = tmp_path / "tricky.json"
+    path.write_text(json.dumps({"documents": [doc], "external_symbols": [{"x": 1}]}))
+    assert list(iter_documents(path, "a/", chunk_size=3)) == [doc]
+
+
+def test_metadata(scip_json, scip_data):
+    assert read_metadata(scip_json) == scip_data["metadata"]
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "empty.json"
+    path.write_text("")
+    assert list(iter_documents(path)) == []
+    assert read_metadata(path) == {}
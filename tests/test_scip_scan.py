@@ -0,0 +1,65 @@
+"""
+Tests for the single-pass SCIP scan and its visitors.
+"""
+
+from tests.scip_helpers import CURVE
+from curve25519_usage import scip_scan
+from curve25519_usage.extract_public_api_from_scip import PublicApiVisitor
+from curve25519_usage.generate_curve25519_graphs_parallel import (
+    FunctionSymbolVisitor,
+    search_all_curve25519_symbols,
+)
+from curve25519_usage.generate_functions_csv import DefinitionLocationVisitor, parse_scip_index
+from curve25519_usage.refresh_scip_outputs import refresh_scip_outputs
+from curve25519_usage.scip_scan import ScipVisitor, scan_index
+
+
+class RecordingVisitor(ScipVisitor):
+    def __init__(self, path_prefixes=None):
+        self.path_prefixes = path_prefixes
+        self.paths = []
+        self.finished = False
+
+    def visit_document(self, index, doc):
+        self.paths.append(doc.relative_path)
+
+    def finish(self, index):
+        self.finished = True
+
+
+def test_visitors_only_see_their_documents(scip_json):
+    everything = RecordingVisitor()
+    libsignal = RecordingVisitor("rust/")
+    scan_index(scip_json, [everything, libsignal])
+    assert len(everything.paths) == 4
+    assert libsignal.paths == ["rust/core/src/curve.rs"]
+    assert everything.finished and libsignal.finished
+
+
+def test_index_loaded_once(scip_json, monkeypatch):
+    calls = []
+    real_load_index = scip_scan.load_index
+
+    def counting_load_index(*args, **kwargs):
+        calls.append(args)
+        return real_load_index(*args, **kwargs)
+
+    monkeypatch.setattr(scip_scan, "load_index", counting_load_index)
+    visitors = [PublicApiVisitor(), DefinitionLocationVisitor(), FunctionSymbolVisitor()]
+    scan_index(scip_json, visitors)
+    assert len(calls) == 1
+
+
+def test_combined_scan_matches_individual_extractors(scip_json):
+    public_api, locations, functions = refresh_scip_outputs(scip_json)
+
+    assert functions == search_all_curve25519_symbols(scip_json)
+    assert {s: (v["file"], v["line"]) for s, v in locations.items()} == parse_scip_index(scip_json)
+    assert public_api["modules"]["scalar"]["types"]["Scalar"]["methods"][0]["name"] == "from_hash"
+
+
+def test_function_symbols_include_references(scip_json):
+    # `from_bytes_wide` is only referenced in the fixture's first document
+    symbols = search_all_curve25519_symbols(scip_json)
+    assert CURVE + "backend/serial/u64/scalar/impl#[Scalar52]from_bytes_wide()." in symbols
+    assert all("curve25519-dalek" in s for s in symbols)
@@ -0,0 +1,68 @@
+"""
+Tests for the interned SCIP symbol catalog.
+"""
+
+from tests.scip_helpers import CURVE, LIBSIGNAL
+
+from curve25519_usage.symbol_catalog import PARSE_CACHE_SIZE, SymbolCatalog, parse_symbol
+
+
+class TestSymbolCatalog:
+    def test_intern_is_stable(self):
+        catalog = SymbolCatalog()
+        first = catalog.intern(CURVE + "scalar/Scalar#")
+        second = catalog.intern(LIBSIGNAL + "curve/sign().")
+        assert catalog.intern(CURVE + "scalar/Scalar#") == first
+        assert (first, second) == (0, 1)
+        assert catalog.symbol(second) == LIBSIGNAL + "curve/sign()."
+        assert catalog.id("unknown") is None
+
+    def test_records_are_parsed_once(self):
+        catalog = SymbolCatalog([CURVE + "scalar/Scalar#"])
+        assert catalog.record(0) is catalog.record(0)
+        assert catalog.lookup(CURVE + "scalar/Scalar#").id == 0
+
+
+class TestParseSymbol:
+    def test_inherent_method(self):
+        record = parse_symbol(CURVE + "backend/serial/u64/scalar/impl#[Scalar52]from_bytes_wide().")
+        assert (record.scheme, record.crate, record.version) == (
+            "rust-analyzer",
+            "curve25519-dalek",
+            "4.1.3",
+        )
+        assert record.module == "backend/serial/u64/scalar"
+        assert (record.impl_type, record.trait) == ("Scalar52", None)
+        assert (record.name, record.kind) == ("from_bytes_wide", "method")
+        assert record.is_callable
+
+    def test_trait_impl_with_escaped_names(self):
+        record = parse_symbol(
+            CURVE + "ristretto/impl#[CompressedRistretto][`TryFrom<&[u8]>`]try_from()."
+        )
+        assert record.impl_type == "CompressedRistretto"
+        assert record.trait == "TryFrom<&[u8]>"
+        assert record.name == "try_from"
+
+    def test_type_members_and_functions(self):
+        method = parse_symbol(CURVE + "edwards/EdwardsPoint#compress().")
+        assert (method.owner_type, method.name, method.kind) == (
+            "EdwardsPoint",
+            "compress",
+            "method",
+        )
+
+        assert parse_symbol(CURVE + "edwards/EdwardsPoint#").kind == "type"
+        assert parse_symbol(CURVE + "scalar/clamp_integer().").kind == "function"
+        assert parse_symbol(CURVE + "constants/ED25519_BASEPOINT_POINT.").kind == "constant"
+        assert parse_symbol(CURVE + "scalar/Scalar#ZERO.").kind == "const"
+
+    def test_impl_block_and_local(self):
+        block = parse_symbol(CURVE + "scalar/impl#[Scalar][Identity]")
+        assert (block.kind, block.impl_type, block.trait) == ("impl", "Scalar", "Identity")
+        assert parse_symbol("local 12").kind == "local"
+
+    def test_symbols_outside_a_catalog_are_not_kept(self):
+        record = parse_symbol(CURVE + "scalar/clamp_integer().")
+        assert record.id is None
+        assert parse_symbol.cache_info().maxsize == PARSE_CACHE_SIZE
@@ -0,0 +1,175 @@
+"""
+Tests for CSV link validation.
+"""
+
+import csv
+
+from curve25519_usage.generate_functions_csv import generate_github_link, parse_github_link
+from curve25519_usage.scip_index import load_index
+from curve25519_usage.validate_csv_links import (
+    IMMUTABLE_MAX_AGE,
+    LINK_CACHE_FILE,
+    HttpLinkChecker,
+    LinkCheckCache,
+    OfflineLinkChecker,
+    is_immutable_url,
+    main,
+    parse_duration,
+    retry_after_seconds,
+)
+
+FROM_HASH = "scalar/impl#[Scalar]from_hash()."
+SCALAR = "curve25519-dalek/src/scalar.rs"
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["function_name", "link"])
+        writer.writeheader()
+        writer.writerows({"function_name": name, "link": link} for name, link in rows)
+
+
+def test_parse_github_link_inverts_generate_github_link():
+    link = generate_github_link(SCALAR, 10)
+    assert parse_github_link(link) == ("4.1.3", SCALAR, 10)
+    assert parse_github_link(link.replace("#L10", "")) is None
+    assert parse_github_link("https://example.com/scalar.rs#L10") is None
+
+
+def test_offline_checks(scip_json):
+    checker = OfflineLinkChecker(load_index(scip_json))
+    assert checker.check(FROM_HASH, generate_github_link(SCALAR, 10)) == (True, "")
+
+    def error(function_name, link):
+        success, message = checker.check(function_name, link)
+        assert not success
+        return message
+
+    assert "no definition" in error(FROM_HASH, generate_github_link(SCALAR, 11))
+    assert "scalar.rs#L10" in error(FROM_HASH, generate_github_link(SCALAR, 11))
+    assert "not a document" in error(FROM_HASH, generate_github_link("src/nowhere.rs", 10))
+    assert "past the end" in error(FROM_HASH, generate_github_link(SCALAR, 500))
+    assert "not defined" in error(FROM_HASH, generate_github_link(SCALAR, 10, "9.9.9"))
+    assert "not a curve25519-dalek" in error(FROM_HASH, "https://example.com/")
+
+
+def test_offline_main(scip_json, tmp_path, capsys):
+    csv_file = tmp_path / "functions.csv"
+    write_csv(csv_file, [(FROM_HASH, generate_github_link(SCALAR, 10)), ("unlinked().", "")])
+    arguments = ["--csv", str(csv_file), "--offline", "--scip-json", str(scip_json)]
+    assert main(arguments) == 0
+    assert "Valid links: 1 (100%)" in capsys.readouterr().out
+
+    write_csv(csv_file, [(FROM_HASH, generate_github_link(SCALAR, 3))])
+    assert main(arguments) == 1
+    out = capsys.readouterr().out
+    assert "Broken links: 1" in out and "Status:" not in out
+
+
+def ok(handler):
+    return 200, {}
+
+
+def test_online_pages_are_checked_once_over_kept_alive_connections(http_server, tmp_path):
+    http_server.routes["/scalar.rs"] = ok
+    http_server.routes["/edwards.rs"] = ok
+    csv_file = tmp_path / "functions.csv"
+    rows = [(f"f{line}().", http_server.url(f"/scalar.rs#L{line}")) for line in range(10)]
+    rows.append(("g().", http_server.url("/edwards.rs#L3")))
+    rows.append(("h().", http_server.url("/missing.rs#L1")))
+    write_csv(csv_file, rows)
+
+    assert main(["--csv", str(csv_file), "--workers", "1"]) == 1
+    assert sorted((method, path) for method, path, _, _ in http_server.log) == [
+        ("HEAD", "/edwards.rs"),
+        ("HEAD", "/missing.rs"),
+        ("HEAD", "/scalar.rs"),
+    ]
+    assert len({port for _, _, port, _ in http_server.log}) == 1
+
+
+def test_get_fallback_redirects_and_retry_after(http_server):
+    http_server.routes["/no-head.rs"] = lambda handler: (
+        405 if handler.command == "HEAD" else 200,
+        {},
+    )
+    http_server.routes["/moved.rs"] = lambda handler: (301, {"Location": "/no-head.rs"})
+    responses = iter([(429, {"Retry-After": "7"}), (200, {})])
+    http_server.routes["/limited.rs"] = lambda handler: next(responses)
+
+    sleeps = []
+    with HttpLinkChecker(max_workers=2, sleep=sleeps.append) as checker:
+        assert checker.check(http_server.url("/moved.rs")) == (True, 200, "")
+        assert checker.check(http_server.url("/limited.rs")) == (True, 200, "")
+        assert checker.check(http_server.url("/gone.rs"))[:2] == (False, 404)
+    assert sleeps == [7]
+    requests = [(method, path) for method, path, _, _ in http_server.log]
+    assert requests[:3] == [
+        ("HEAD", "/moved.rs"),
+        ("HEAD", "/no-head.rs"),
+        ("GET", "/no-head.rs"),
+    ]
+
+    assert retry_after_seconds("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    assert retry_after_seconds(None) is None
+
+
+def etag_route(etag):
+    def route(handler):
+        if handler.headers.get("If-None-Match") == etag:
+            return 304, {"ETag": etag}
+        return 200, {"ETag": etag}
+
+    return route
+
+
+def test_cached_results_are_reused_then_revalidated(http_server, tmp_path):
+    http_server.routes["/scalar.rs"] = etag_route('"v1"')
+    http_server.routes["/flaky.rs"] = lambda handler: (500, {})
+    csv_file = tmp_path / "functions.csv"
+    write_csv(
+        csv_file,
+        [("f().", http_server.url("/scalar.rs#L1")), ("g().", http_server.url("/flaky.rs#L1"))],
+    )
+    arguments = ["--csv", str(csv_file), "--workers", "1"]
+
+    assert main(arguments) == 1
+    assert (tmp_path / LINK_CACHE_FILE).exists()
+    assert len(http_server.log) == 2
+
+    # Fresh: only the uncached failure is checked again
+    del http_server.log[:]
+    assert main(arguments) == 1
+    assert [path for _, path, _, _ in http_server.log] == ["/flaky.rs"]
+
+    # Stale: a conditional request, answered with 304
+    del http_server.log[:]
+    assert main(arguments + ["--max-age", "0"]) == 1
+    (request,) = [entry for entry in http_server.log if entry[1] == "/scalar.rs"]
+    assert request[3]["If-None-Match"] == '"v1"'
+
+    assert main(arguments + ["--no-cache"]) == 1
+
+
+def test_cache_lifetimes(tmp_path):
+    tag_url = "https://github.com/o/r/tree/curve25519-4.1.3/src/scalar.rs"
+    branch_url = "https://github.com/o/r/tree/main/src/scalar.rs"
+    assert is_immutable_url(tag_url)
+    assert is_immutable_url(tag_url.replace("curve25519-4.1.3", "a" * 40))
+    assert not is_immutable_url(branch_url)
+    assert parse_duration("7d") == 7 * 86400 and parse_duration("90") == 90
+
+    clock = [0.0]
+    cache = LinkCheckCache(tmp_path / LINK_CACHE_FILE, now=lambda: clock[0])
+    for url in (tag_url, branch_url):
+        cache.store(url, (True, 200, ""), {"ETag": '"x"'})
+    clock[0] = 2 * 86400
+    assert cache.fresh_result(tag_url) == (True, 200, "")
+    assert cache.fresh_result(branch_url) is None
+    assert cache.validators(branch_url) == {"If-None-Match": '"x"'}
+    clock[0] = IMMUTABLE_MAX_AGE
+    assert cache.fresh_result(tag_url) is None
+
+    cache.save()
+    reloaded = LinkCheckCache(tmp_path / LINK_CACHE_FILE, max_age=10**9, now=lambda: clock[0])
+    assert reloaded.fresh_result(branch_url) == (True, 200, "")